@@ -0,0 +1,14 @@
+# Пакет фейерверков. Импорт ничего не запускает и не инициализирует pygame:
+# игра создается явно (Game(spec).run()) или через точку входа python -m classes
+from .specs import ConfigError, GameSpec, FireworkSpec, ParticleSpec, compile_config
+from .config_loader import load_config, find_presets, preset_path
+
+# Класс игры загружается при первом обращении, вместе с pygame и numpy
+def __getattr__(name):
+    if name == 'Game':
+        from .game import Game
+        return Game
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+__all__ = ['ConfigError', 'GameSpec', 'FireworkSpec', 'ParticleSpec', 'compile_config',
+           'load_config', 'find_presets', 'preset_path', 'Game']
@@ -0,0 +1,5 @@
+import sys
+from .main import main
+
+# Запуск пакета: python -m classes [команда] [параметры]
+sys.exit(main())
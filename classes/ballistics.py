@@ -0,0 +1,137 @@
+import sys
+import math
+import time
+import argparse
+import pygame
+import numpy as np
+
+# Движение частиц взрыва - баллистика с постоянной гравитацией: за шаг положение сдвигается на скорость,
+# затем к вертикальной скорости прибавляется гравитация. Поэтому состояние через n шагов после взрыва
+# вычисляется сразу по начальному состоянию, без прохода по всем промежуточным шагам:
+#   x_n = x0 + n * vx,  y_n = y0 + n * vy0 + g * n * (n - 1) / 2,  vy_n = vy0 + n * g
+# Функции работают и с числами, и с массивами NumPy
+
+# Положение через n шагов после взрыва: (x, y)
+def position(x0, y0, speed_x, speed_y, gravity, n):
+    return x0 + n * speed_x, y0 + n * speed_y + gravity * (n * (n - 1) / 2)
+
+# Вертикальная скорость через n шагов после взрыва
+def speed_y_at(speed_y, gravity, n):
+    return speed_y + n * gravity
+
+# Прозрачность частицы с оставшимся временем жизни lifetime (как в Particle: 255 до начала затухания)
+def fade_alpha(lifetime, fade_start):
+    if lifetime > fade_start:
+        return 255
+    return max(0, 255 - int(255 * ((fade_start - lifetime) / fade_start)))
+
+# То же для массива времен жизни (как в ParticleSystem)
+def fade_alphas(lifetimes, fade_start):
+    fade_progress = (fade_start - lifetimes) / fade_start
+    alphas = np.maximum(0, 255 - (255 * fade_progress).astype(np.int32))
+    return np.where(lifetimes <= fade_start, alphas, 255)
+
+# Через сколько шагов добавляется точка следа: счетчик растет на 1 за шаг и сбрасывается при line_spacing
+def trail_period(line_spacing):
+    return max(1, math.ceil(line_spacing))
+
+# Номера шагов (от взрыва, с 1), на которых добавлены точки следа, еще лежащие в кольце вместимости capacity
+# через n шагов: каждый period-й шаг, не больше capacity последних
+def trail_steps(n, line_spacing, capacity):
+    period = trail_period(line_spacing)
+    last = n // period
+    first = max(1, last - capacity + 1)
+    return [index * period for index in range(first, last + 1)]
+
+# Координаты и длина точки следа, добавленной на шаге m: середина между положениями до и после шага,
+# длина зависит от скорости после шага (как в Particle._add_line_point)
+def trail_point(x0, y0, speed_x, speed_y, gravity, m, line_max_length):
+    x_before, y_before = position(x0, y0, speed_x, speed_y, gravity, m - 1)
+    x_after, y_after = position(x0, y0, speed_x, speed_y, gravity, m)
+    speed = abs(speed_x) + abs(speed_y_at(speed_y, gravity, m))
+    if isinstance(speed, np.ndarray):
+        speed_factor = np.minimum(1.0, speed / 8)
+    else:
+        speed_factor = min(1.0, speed / 8)
+    return (x_before + x_after) / 2, (y_before + y_after) / 2, line_max_length * (0.5 + 0.5 * speed_factor)
+
+# Состояние шоу для сравнения (команда seek и tests/): по каждому фейерверку положения частиц, их прозрачность и точки следов,
+# плюс кадр после отрисовки
+def snapshot(game):
+    fireworks = []
+    for firework in game.fireworks:
+        if not firework.exploded:
+            fireworks.append((np.array([[firework.x], [firework.y]]), np.array([255]), np.zeros((0, 4))))
+        elif firework.particle_system is not None:
+            system = firework.particle_system
+            fireworks.append((np.stack([system.x, system.y]), system.fade_alpha.copy(), system.trail_points()))
+        else:
+            particles = firework.particles
+            trail = np.array([point for particle in particles for point in particle.line]).reshape(-1, 4)
+            fireworks.append((np.array([[particle.x for particle in particles], [particle.y for particle in particles]]),
+                              np.full(len(particles), firework.burst.fade_alpha), trail))
+    game.render()
+    return fireworks, pygame.surfarray.array3d(game.screen)
+
+# Расхождения двух состояний snapshot: (ошибка положения, ошибка точек следа, несовпадений, отличающихся пикселей)
+def compare(expected, actual):
+    position_error = trail_error = 0.0
+    mismatches = abs(len(expected[0]) - len(actual[0]))
+    for (positions, fades, trail), (other_positions, other_fades, other_trail) in zip(expected[0], actual[0]):
+        if positions.shape != other_positions.shape or trail.shape != other_trail.shape:
+            mismatches += 1
+            continue
+        if len(positions[0]):
+            position_error = max(position_error, float(np.abs(positions - other_positions).max()))
+        mismatches += int((fades != other_fades).sum())
+        if len(trail):
+            trail_error = max(trail_error, float(np.abs(trail[:, :3] - other_trail[:, :3]).max()))
+            mismatches += int((trail[:, 3] != other_trail[:, 3]).sum())
+    pixels = int((expected[1] != actual[1]).any(axis=-1).sum())
+    return position_error, trail_error, mismatches, pixels
+
+# Проверка перемотки: шоу, пройденное по шагам, и то же шоу после Game.seek (вперед и назад) должны совпадать
+def main(argv=None):
+    from .game import Game
+    from .config_loader import add_config_arguments, load_config_from_args
+
+    parser = argparse.ArgumentParser(description='Точность и скорость перемотки шоу по сравнению с пошаговой симуляцией')
+    add_config_arguments(parser)
+    parser.add_argument('--steps', type=int, nargs='+', default=[120, 600, 1800], help='Шаги, к которым выполняется перемотка')
+    parser.add_argument('--seed', type=int, default=1, help='Зерно генератора случайных чисел')
+    parser.add_argument('--tolerance', type=float, default=1e-6, help='Допустимая ошибка положения в пикселях')
+    args = parser.parse_args(argv)
+
+    spec = load_config_from_args(args)
+    # Обе игры используют общий модуль random, поэтому выполняются по очереди: сначала по шагам
+    targets = sorted(set(args.steps))
+    game = Game.from_config(spec, headless=True, seed=args.seed)
+    expected = {}
+    stepped_time = {}
+    start = time.perf_counter()
+    for target in targets:
+        while game.steps < target:
+            game.update()
+        stepped_time[target] = time.perf_counter() - start
+        expected[target] = snapshot(game)
+        start = time.perf_counter() - stepped_time[target]
+
+    # Перемотка вперед по тем же шагам, затем назад к первому
+    game = Game.from_config(spec, headless=True, seed=args.seed)
+    failed = False
+    previous = 0
+    for target in targets + [targets[0]]:
+        start = time.perf_counter()
+        game.seek(target)
+        seek_time = time.perf_counter() - start
+        position_error, trail_error, mismatches, pixels = compare(expected[target], snapshot(game))
+        steps_time = stepped_time[target] - (stepped_time.get(previous, 0.0) if target > previous else 0.0)
+        print(f'Шаг {previous} -> {target}: по шагам {steps_time * 1000:.1f} мс, перемотка {seek_time * 1000:.1f} мс; '
+              f'ошибка положения {position_error:.1e}, следа {trail_error:.1e}, несовпадений {mismatches}, пикселей {pixels}')
+        failed |= position_error > args.tolerance or trail_error > args.tolerance or mismatches > 0
+        previous = target
+    print('Перемотка совпадает с пошаговой симуляцией' if not failed else 'РАСХОЖДЕНИЕ с пошаговой симуляцией')
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
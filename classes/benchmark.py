@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import pygame
+import numpy as np
+from .game import Game
+from .config_loader import load_config, find_presets
+
+# Фазы кадра в порядке выполнения
+PHASES = ('spawn', 'physics', 'trails', 'draw', 'flip')
+
+# Среднее и перцентили времени фазы в миллисекундах
+def summarize(samples):
+    values = np.array(samples) * 1000
+    return {
+        'mean_ms': float(values.mean()),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+    }
+
+# Прогон одного пресета: фиксированное число кадров с фиксированным зерном
+def run_preset(path, frames, seed, particle_backend=None):
+    spec = load_config(path)
+    if spec is None:
+        raise ValueError(f'Не удалось загрузить пресет {path}')
+    overrides = {'seed': seed}
+    if particle_backend is not None:
+        overrides['particle_backend'] = particle_backend
+    game = Game.from_config(spec, **overrides)
+
+    # Каждая фаза кадра замеряется отдельно
+    phase_steps = (game.update_spawn, game.update_physics, game.update_trails, game.render, game.present)
+    timings = {phase: [] for phase in PHASES}
+    frame_times = []
+    max_particles = 0
+    for _ in range(frames):
+        frame_start = time.perf_counter()
+        for phase, step in zip(PHASES, phase_steps):
+            start = time.perf_counter()
+            step()
+            timings[phase].append(time.perf_counter() - start)
+        frame_times.append(time.perf_counter() - frame_start)
+        max_particles = max(max_particles, sum(firework.particle_count() for firework in game.fireworks))
+
+    result = {phase: summarize(samples) for phase, samples in timings.items()}
+    result['frame'] = summarize(frame_times)
+    result['max_particles'] = max_particles
+    return result
+
+# Прогон всех выбранных пресетов
+def run_benchmark(preset_names, frames, seed, particle_backend=None):
+    presets = find_presets()
+    results = {}
+    for name in preset_names:
+        if name not in presets:
+            raise ValueError(f'Неизвестный пресет {name}, доступны: {", ".join(presets)}')
+        results[name] = run_preset(presets[name], frames, seed, particle_backend)
+        print(f"{name}: кадр {results[name]['frame']['mean_ms']:.2f} мс в среднем, "
+              f"p95 {results[name]['frame']['p95_ms']:.2f} мс, p99 {results[name]['frame']['p99_ms']:.2f} мс")
+    return {
+        'meta': {
+            'frames': frames,
+            'seed': seed,
+            'particle_backend': particle_backend or 'numpy',
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+        },
+        'presets': results,
+    }
+
+# Параметры прогона, при различии которых результаты сравнивать нельзя
+COMPARABLE_META = ('frames', 'seed', 'particle_backend')
+
+# Параметры прогона, которыми базовый результат отличается от текущего: список (имя, было, стало)
+def meta_mismatch(meta, baseline):
+    base_meta = baseline.get('meta', {})
+    return [(key, base_meta.get(key), meta[key]) for key in COMPARABLE_META if base_meta.get(key) != meta[key]]
+
+# Сравнение с сохраненным базовым результатом: список регрессий.
+# Замедление считается регрессией, только если оно больше threshold и больше min_delta мс - иначе
+# шум таймера на фазах в тысячные доли миллисекунды выглядел бы как замедление в разы
+def compare(current, baseline, threshold, min_delta=0.05):
+    regressions = []
+    for name, phases in current['presets'].items():
+        base_phases = baseline.get('presets', {}).get(name)
+        if base_phases is None:
+            continue
+        for phase in PHASES + ('frame',):
+            for metric in ('mean_ms', 'p95_ms'):
+                new_value = phases[phase][metric]
+                old_value = base_phases.get(phase, {}).get(metric)
+                if not old_value:
+                    continue
+                change = new_value / old_value - 1
+                if change > threshold and new_value - old_value > min_delta:
+                    regressions.append((name, phase, metric, old_value, new_value, change))
+    return regressions
+
+# Вывод таблицы результатов
+def print_table(results):
+    header = f"{'пресет':<14}{'фаза':<10}{'среднее':>10}{'p95':>10}{'p99':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, phases in results['presets'].items():
+        for phase in PHASES + ('frame',):
+            stats = phases[phase]
+            print(f"{name:<14}{phase:<10}{stats['mean_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замер производительности фейерверков на пресетах из config/')
+    parser.add_argument('--presets', nargs='*', help='Имена пресетов (по умолчанию все)')
+    parser.add_argument('--frames', type=int, default=600, help='Количество кадров на пресет')
+    parser.add_argument('--seed', type=int, default=1, help='Зерно генератора случайных чисел')
+    parser.add_argument('--backend', choices=('numpy', 'objects'), help='Способ хранения частиц')
+    parser.add_argument('--output', default='benchmark_results.json', help='Файл для результатов в JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='Сравнить с сохраненным результатом')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Допустимое замедление (0.10 = 10%%)')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='Допустимое замедление в мс (меньшие изменения - шум)')
+    args = parser.parse_args(argv)
+
+    # Базовый результат читается до замера: файл результатов по умолчанию может быть им же
+    baseline = None
+    if args.compare:
+        if os.path.realpath(args.compare) == os.path.realpath(args.output):
+            parser.error(f'--compare {args.compare} совпадает с --output и был бы перезаписан, укажите другой --output')
+        with open(args.compare, 'r', encoding='UTF-8') as f:
+            baseline = json.load(f)
+        # Результаты с другим числом кадров, зерном или способом хранения частиц не сравнимы
+        meta = {'frames': args.frames, 'seed': args.seed, 'particle_backend': args.backend or 'numpy'}
+        mismatch = meta_mismatch(meta, baseline)
+        if mismatch:
+            details = ', '.join(f'{key} {old_value!r} -> {new_value!r}' for key, old_value, new_value in mismatch)
+            parser.error(f'--compare {args.compare} получен с другими параметрами прогона: {details}')
+
+    # Окно не открываем, но display.flip выполняется через фиктивный видеодрайвер
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    preset_names = args.presets or list(find_presets())
+    results = run_benchmark(preset_names, args.frames, args.seed, args.backend)
+    print_table(results)
+
+    with open(args.output, 'w', encoding='UTF-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f'Результаты сохранены в {args.output}')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for name, phase, metric, old_value, new_value, change in regressions:
+            print(f'РЕГРЕССИЯ {name}/{phase} {metric}: {old_value:.3f} -> {new_value:.3f} мс (+{change:.1%})')
+        if regressions:
+            return 1
+        print(f'Регрессий относительно {args.compare} нет')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
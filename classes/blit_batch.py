@@ -0,0 +1,39 @@
+# Класс - пакетный вывод спрайтов.
+# Подставляется вместо экрана в draw(): blit() только запоминает пару (спрайт, позиция),
+# а flush() отправляет накопленное одним вызовом Surface.blits вместо тысяч отдельных blit
+class BlitBatch:
+    # Инициализация (параметры берутся из раздела 'blit_batch' конфигурации)
+    def __init__(self, screen, batch_size=8192, group_by_sprite=False):
+        self.screen = screen
+        self.batch_size = batch_size # Сколько спрайтов копить до отправки
+        # Группировка одинаковых спрайтов подряд: меньше переключений источника,
+        # но меняет порядок наложения полупрозрачных кругов
+        self.group_by_sprite = group_by_sprite
+        self.items = []
+
+        # Статистика
+        self.drawn = 0 # Всего выведено спрайтов
+        self.calls = 0 # Сколько раз вызван Surface.blits
+
+    # Запоминание спрайта (тот же вызов, что Surface.blit)
+    def blit(self, sprite, position):
+        self.items.append((sprite, position))
+        if len(self.items) >= self.batch_size and not self.group_by_sprite:
+            self.flush()
+
+    # Запоминание готового списка пар (спрайт, позиция) (тот же вызов, что Surface.blits)
+    def blits(self, items, doreturn=False):
+        self.items.extend(items)
+        if len(self.items) >= self.batch_size and not self.group_by_sprite:
+            self.flush()
+
+    # Вывод всех накопленных спрайтов на экран
+    def flush(self):
+        if not self.items:
+            return
+        if self.group_by_sprite:
+            self.items.sort(key=lambda item: id(item[0]))
+        self.screen.blits(self.items, doreturn=False)
+        self.drawn += len(self.items)
+        self.calls += 1
+        self.items.clear()
@@ -0,0 +1,398 @@
+import sys
+import json
+import time
+import heapq
+import random
+import asyncio
+import argparse
+import dataclasses
+import threading
+import functools
+from collections import deque
+from .config_loader import find_presets, load_config
+
+# Команда запуска фейерверка, уже проверенная сервером.
+# x, y - точка запуска, spec - FireworkSpec пресета (None - текущие параметры игры), preset - имя пресета
+# (для записи ввода), color - цвет (None - случайный), due - момент запуска по time.monotonic, sent - время отправки клиентом
+class LaunchCommand:
+    __slots__ = ('x', 'y', 'spec', 'preset', 'color', 'due', 'sent')
+
+    def __init__(self, x, y, spec=None, color=None, due=0.0, sent=None, preset=None):
+        self.x = x
+        self.y = y
+        self.spec = spec
+        self.preset = preset
+        self.color = color
+        self.due = due
+        self.sent = sent
+
+    # Порядок в куче отложенных команд
+    def __lt__(self, other):
+        return self.due < other.due
+
+# Класс - очередь команд между потоком сервера и игровым циклом.
+# Сервер только добавляет в deque (append и popleft атомарны, блокировок нет),
+# игра раз в шаг забирает все накопленное и запускает то, чему пришло время.
+# Запусков за шаг не больше launches_per_step: всплеск команд растягивается на несколько шагов
+# вместо одного долгого кадра
+class CommandQueue:
+    # Инициализация (параметры берутся из раздела 'commands' конфигурации)
+    def __init__(self, max_pending=100000, launches_per_step=200):
+        self.incoming = deque()
+        self.delayed = [] # Куча отложенных команд (только поток игры)
+        self.ready = deque() # Команды, которым пора, но не поместившиеся в прошлые шаги (только поток игры)
+        self.max_pending = max_pending # Больше команд в очереди - новые отбрасываются, а не копятся
+        self.launches_per_step = launches_per_step
+
+        # Счетчики
+        self.received = 0
+        self.dropped = 0
+        self.launched = 0
+        self.latencies = deque(maxlen=100000) # Задержки от отправки клиентом до запуска в игре, с
+
+    # Добавление команд (поток сервера). Возвращает количество принятых
+    # Место считается по всем еще не запущенным командам (входящие, отложенные и ждущие своего шага):
+    # received пишет только сервер, launched - только игра, поэтому разность верна без блокировок
+    def push(self, commands):
+        room = self.max_pending - self.pending()
+        if room < len(commands):
+            self.dropped += len(commands) - max(room, 0)
+            commands = commands[:max(room, 0)]
+        self.incoming.extend(commands)
+        self.received += len(commands)
+        return len(commands)
+
+    # Команды, которые нужно выполнить на этом шаге (поток игры)
+    def drain(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        incoming = self.incoming
+        delayed = self.delayed
+        ready = self.ready
+        while incoming:
+            command = incoming.popleft()
+            if command.due <= now:
+                ready.append(command)
+            else:
+                heapq.heappush(delayed, command)
+        while delayed and delayed[0].due <= now:
+            ready.append(heapq.heappop(delayed))
+
+        commands = [ready.popleft() for _ in range(min(len(ready), self.launches_per_step))]
+        for command in commands:
+            if command.sent is not None:
+                self.latencies.append(now - command.sent)
+        self.launched += len(commands)
+        return commands
+
+    # Количество еще не запущенных команд
+    def pending(self):
+        return self.received - self.launched
+
+    # Статистика
+    def stats(self):
+        latencies = sorted(self.latencies)
+        result = {
+            'received': self.received,
+            'dropped': self.dropped,
+            'launched': self.launched,
+            'pending': self.pending(),
+        }
+        if latencies:
+            result['latency_p50_ms'] = latencies[len(latencies) // 2] * 1000
+            result['latency_p99_ms'] = latencies[int(len(latencies) * 0.99)] * 1000
+            result['latency_max_ms'] = latencies[-1] * 1000
+        return result
+
+# Ошибка в команде (ответ клиенту)
+class CommandError(ValueError):
+    pass
+
+# Класс - сервер команд на локальном сокете (TCP или Unix) в отдельном потоке asyncio.
+# Протокол: одна строка JSON - одна команда {"x": 500, "y": 800, "preset": "fast", "color": [255, 0, 0],
+# "delay": 0.5} или список таких команд (пакет). Разбор и проверка выполняются в потоке сервера,
+# игровой цикл получает готовые LaunchCommand. Ответ приходит только на ошибку: {"error": "..."}
+class CommandServer:
+    # Инициализация (параметры берутся из раздела 'commands' конфигурации)
+    # port=0 - свободный порт, path - путь Unix сокета вместо TCP,
+    # max_line - наибольшая длина строки протокола в байтах (пакет из тысяч команд - это сотни КБ)
+    def __init__(self, queue, host='127.0.0.1', port=7777, path=None, default_y=None, max_line=2 ** 24):
+        self.queue = queue
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_line = max_line
+        self.default_y = default_y # Высота запуска, если y не указан (низ экрана)
+        self.errors = 0
+        self.clients = 0
+        self.writers = set() # Подключенные клиенты (для отключения при остановке)
+
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='firework-commands', daemon=True)
+
+    # Запуск потока сервера (возвращается, когда сокет уже слушает)
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        if self.server is None:
+            raise OSError(f'Не удалось открыть сокет команд {self.address()}')
+        return self
+
+    # Адрес сокета для клиентов
+    def address(self):
+        return self.path if self.path is not None else f'{self.host}:{self.port}'
+
+    # Цикл asyncio в своем потоке
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._listen())
+        except OSError as e:
+            print(f'Сокет команд {self.address()}: {e}')
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    # Открытие сокета
+    async def _listen(self):
+        if self.path is not None:
+            self.server = await asyncio.start_unix_server(self._client, path=self.path, limit=self.max_line)
+        else:
+            self.server = await asyncio.start_server(self._client, self.host, self.port, limit=self.max_line)
+            self.port = self.server.sockets[0].getsockname()[1] # Фактический порт (для port=0)
+
+    # Обслуживание одного клиента: строки читаются и разбираются, пока клиент не отключится
+    async def _client(self, reader, writer):
+        self.clients += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                try:
+                    line = await self._readline(reader)
+                    if not line:
+                        break
+                    self.queue.push(self.parse(line))
+                except CommandError as e:
+                    self.errors += 1
+                    writer.write(json.dumps({'error': str(e)}, ensure_ascii=False).encode() + b'\n')
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    # Чтение одной строки протокола (b'' - клиент отключился).
+    # Слишком длинная строка пропускается до конца и становится ошибкой, соединение остается открытым
+    async def _readline(self, reader):
+        try:
+            return await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            return e.partial # Последняя строка без перевода строки
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        while True:
+            await reader.readexactly(consumed) # Данные остаются в буфере - отбрасываем прочитанное
+            try:
+                await reader.readuntil(b'\n')
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+        raise CommandError(f'строка длиннее {self.max_line} байт, разбейте пакет на несколько строк')
+
+    # Разбор строки протокола в список команд
+    def parse(self, line):
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise CommandError(f'некорректный JSON: {e}') from None
+        items = data if isinstance(data, list) else [data]
+        now = time.monotonic()
+        return [self._command(item, now) for item in items]
+
+    # Проверка одной команды
+    def _command(self, item, now):
+        if not isinstance(item, dict):
+            raise CommandError(f'ожидается объект команды, получено {item!r}')
+        unknown = set(item) - {'x', 'y', 'preset', 'color', 'delay', 'sent'}
+        if unknown:
+            raise CommandError(f'неизвестные поля {", ".join(sorted(unknown))}')
+        x = _coordinate(item, 'x', None)
+        y = _coordinate(item, 'y', self.default_y)
+
+        color = item.get('color')
+        if color is not None:
+            if (not isinstance(color, list) or len(color) != 3
+                    or not all(isinstance(c, int) and not isinstance(c, bool) and 0 <= c <= 255 for c in color)):
+                raise CommandError(f'color: ожидается [r, g, b] от 0 до 255, получено {color!r}')
+            color = tuple(color)
+
+        delay = item.get('delay', 0)
+        if isinstance(delay, bool) or not isinstance(delay, (int, float)) or delay < 0:
+            raise CommandError(f'delay: ожидается неотрицательное число секунд, получено {delay!r}')
+        sent = item.get('sent')
+        if sent is not None and (isinstance(sent, bool) or not isinstance(sent, (int, float))):
+            raise CommandError(f'sent: ожидается время time.monotonic, получено {sent!r}')
+
+        preset = item.get('preset')
+        spec = None
+        if preset is not None:
+            spec = preset_firework(preset) if isinstance(preset, str) else None
+            if spec is None:
+                raise CommandError(f'preset: неизвестный пресет {preset!r}')
+        return LaunchCommand(x, y, spec, color, now + delay, sent, preset)
+
+    # Остановка сервера и потока
+    def close(self):
+        if self.loop is None or not self.thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    # Закрытие сокета и отключение клиентов (в потоке сервера)
+    async def _shutdown(self):
+        self.server.close()
+        for writer in list(self.writers):
+            writer.transport.abort() # Чтение у клиента завершится, и его обработчик выйдет сам
+        await self.server.wait_closed()
+
+# Параметры фейерверков пресета по имени (None - пресета нет). Файл читается один раз:
+# в потоке сервера при разборе команд и в игре при воспроизведении записанных команд
+@functools.lru_cache(maxsize=None)
+def preset_firework(name):
+    path = find_presets().get(name)
+    game_spec = load_config(path) if path is not None else None
+    return game_spec.firework if game_spec is not None else None
+
+# Координата команды (число; без значения - default, если он есть)
+def _coordinate(item, name, default):
+    value = item.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CommandError(f'{name}: ожидается число, получено {value!r}')
+    return value
+
+# Подключение клиента к адресу сервера ('host:port' или путь Unix сокета)
+async def _connect(address):
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        return await asyncio.open_connection(host, int(port))
+    return await asyncio.open_unix_connection(address)
+
+# Локальный клиент вместо пульта: пакеты случайных запусков с заданной частотой
+async def run_client(address, rate, batch, duration, width=1000, height=800, presets=()):
+    reader, writer = await _connect(address)
+    interval = batch / rate
+    sent = 0
+    start = time.monotonic()
+    next_send = start
+    while time.monotonic() - start < duration:
+        now = time.monotonic()
+        commands = []
+        for _ in range(batch):
+            command = {'x': random.randint(20, width - 20), 'y': height, 'sent': now}
+            if presets:
+                command['preset'] = random.choice(presets)
+            commands.append(command)
+        writer.write(json.dumps(commands).encode() + b'\n')
+        await writer.drain()
+        sent += batch
+        next_send += interval
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    writer.close()
+    await writer.wait_closed()
+    return sent, time.monotonic() - start
+
+# Поток с клиентом (для замера в одном процессе с игрой)
+def _client_thread(address, rate, batch, duration, result):
+    result.extend(asyncio.run(run_client(address, rate, batch, duration)))
+
+# Замер: игра без окна с сервером команд и клиент, отправляющий rate запусков в секунду.
+# Показывает пропускную способность, задержку от отправки до запуска и сколько времени кадра
+# уходит на очередь команд по сравнению со всем кадром
+def benchmark(spec, rate, batch, duration, launches_per_step=200):
+    from .game import Game
+
+    # Фейерверк взрывается сразу одной короткоживущей частицей: замеряется путь команды, а не симуляция
+    firework = dataclasses.replace(spec.firework, particles_count_range=(1, 1), particles_lifetime_range=(1, 1),
+                                   min_explosion_height=spec.height - 10, max_explosion_height_offset=5)
+    game = Game(spec.replace(firework=firework), headless=True)
+    queue = CommandQueue(launches_per_step=launches_per_step)
+    server = CommandServer(queue, port=0, default_y=game.height).start()
+
+    result = []
+    client = threading.Thread(target=_client_thread, args=(server.address(), rate, batch, duration, result))
+    drain_times = []
+    launch_times = []
+    frame_times = []
+    start = time.perf_counter()
+    client.start()
+    while client.is_alive() or queue.pending():
+        # Тот же шаг, что Game.update с очередью команд, но с замером каждой части
+        frame_start = time.perf_counter()
+        commands = queue.drain()
+        drained = time.perf_counter()
+        for command in commands:
+            game.create_firework_at_pos((command.x, command.y), command.spec, command.color)
+        launched = time.perf_counter()
+        game.update()
+        game.render()
+        finished = time.perf_counter()
+        drain_times.append(drained - frame_start)
+        launch_times.append(launched - drained)
+        frame_times.append(finished - frame_start)
+        # Темп кадров как у игры, но без ожидания clock.tick при отставании
+        rest = 1 / game.sim_fps - (finished - frame_start)
+        if rest > 0:
+            time.sleep(rest)
+    elapsed = time.perf_counter() - start
+    server.close()
+
+    sent, client_time = result
+    stats = queue.stats()
+    print(f'Клиент: отправлено {sent} команд за {client_time:.2f} с ({sent / client_time:.0f} команд/с, пакеты по {batch})')
+    print(f"Игра: принято {stats['received']}, запущено {stats['launched']}, отброшено {stats['dropped']}, "
+          f"ошибок {server.errors} за {elapsed:.2f} с ({stats['launched'] / elapsed:.0f} запусков/с)")
+    if 'latency_p50_ms' in stats:
+        print(f"Задержка от отправки до запуска: p50 {stats['latency_p50_ms']:.2f} мс, "
+              f"p99 {stats['latency_p99_ms']:.2f} мс, максимум {stats['latency_max_ms']:.2f} мс")
+    print(f'Кадров {len(frame_times)}:')
+    for name, samples in (('очередь', drain_times), ('запуски', launch_times), ('кадр', frame_times)):
+        samples.sort()
+        print(f'  {name:<8} p50 {samples[len(samples) // 2] * 1000:7.3f} мс, p99 {samples[int(len(samples) * 0.99)] * 1000:7.3f} мс, '
+              f'максимум {samples[-1] * 1000:7.3f} мс')
+    return stats
+
+def main(argv=None):
+    from .config_loader import add_config_arguments, load_config_from_args
+    from .specs import GameSpec
+
+    parser = argparse.ArgumentParser(description='Клиент сокета команд и замер пропускной способности')
+    parser.add_argument('mode', choices=('client', 'bench'), help='client - слать запуски в игру, bench - замер в одном процессе')
+    parser.add_argument('--address', default='127.0.0.1:7777', help='Адрес сервера: host:port или путь Unix сокета')
+    parser.add_argument('--rate', type=float, default=1000, help='Запусков в секунду')
+    parser.add_argument('--batch', type=int, default=50, help='Команд в одном пакете')
+    parser.add_argument('--duration', type=float, default=5, help='Длительность, с')
+    parser.add_argument('--per-step', type=int, default=200, help='Не больше запусков за шаг (bench)')
+    parser.add_argument('--presets', nargs='*', default=[], help='Случайный пресет для каждого запуска (client)')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.mode == 'client':
+        sent, elapsed = asyncio.run(run_client(args.address, args.rate, args.batch, args.duration, presets=args.presets))
+        print(f'Отправлено {sent} команд за {elapsed:.2f} с ({sent / elapsed:.0f} команд/с)')
+        return 0
+
+    spec = load_config_from_args(args) or GameSpec()
+    benchmark(spec, args.rate, args.batch, args.duration, args.per_step)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import glob
+import json
+from .specs import ConfigError, compile_config
+
+# Папка с пресетами config/config_<имя>.json (рядом с пакетом, не зависит от текущей папки)
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+
+# Пресет по умолчанию
+DEFAULT_PRESET = 'base'
+
+# Поиск всех пресетов: {имя: путь к файлу}
+def find_presets(config_dir=CONFIG_DIR):
+    presets = {}
+    for path in sorted(glob.glob(os.path.join(config_dir, 'config_*.json'))):
+        name = os.path.basename(path)[len('config_'):-len('.json')]
+        presets[name] = path
+    return presets
+
+# Путь к файлу пресета по имени
+def preset_path(name, config_dir=CONFIG_DIR):
+    return os.path.join(config_dir, f'config_{name}.json')
+
+# Замена параметров словаря конфигурации по строкам вида 'firework.particles_count_range=[50, 80]'.
+# Значение разбирается как JSON, а если это не JSON - берется строкой
+def apply_overrides(config, overrides):
+    for override in overrides:
+        path, separator, text = override.partition('=')
+        if not separator or not path:
+            raise ConfigError(f'{override}: ожидается замена вида параметр=значение')
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = text
+        section = config
+        *parents, name = path.split('.')
+        for parent in parents:
+            section = section.setdefault(parent, {})
+            if not isinstance(section, dict):
+                raise ConfigError(f'{override}: {parent} не является разделом конфигурации')
+        section[name] = value
+    return config
+
+# Загружает конфигурацию из JSON файла и один раз компилирует ее в проверенную GameSpec
+# overrides - замены параметров (см. apply_overrides), проверяются вместе со всем файлом
+def load_config(name, overrides=()):
+    try:
+        # Попытка открыть и прочитать конфигурационный файл
+        with open(name, 'r', encoding='UTF-8') as f:
+            spec = compile_config(apply_overrides(json.load(f), overrides))
+        print(f'Конфигурация загружена из {name}')
+        return spec
+    except FileNotFoundError:
+        # Обработка случая, когда файл не найден
+        print(f'Файл {name} не найден. Используются значения по умолчанию.')
+        return None
+    except ConfigError as e:
+        # Ошибка в значениях: путь к параметру и причина
+        print(f'Ошибка в конфигурации {name}: {e}')
+        print('Используются значения по умолчанию.')
+        return None
+    except Exception as e:
+        # Обработка всех других ошибок (невалидный JSON, и т.д.)
+        print(f'Ошибка при чтении {name}: {e}')
+        print('Используются значения по умолчанию.')
+        return None
+
+# Общие параметры командной строки для выбора конфигурации: пресет или файл и замены параметров
+def add_config_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--preset', default=DEFAULT_PRESET, help=f'Пресет из папки config (по умолчанию {DEFAULT_PRESET})')
+    group.add_argument('--config', help='Файл конфигурации вместо пресета')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='ПАРАМЕТР=ЗНАЧЕНИЕ',
+                        help='Замена параметра, например --set firework_interval=10 --set particle.gravity=0.1')
+
+# Конфигурация по параметрам командной строки из add_config_arguments
+def load_config_from_args(args):
+    return load_config(args.config or preset_path(args.preset), args.overrides)
@@ -0,0 +1,48 @@
+import pygame
+
+# Класс - область видимости сцены (экран плюс запас по краям) и счетчики отсечения.
+# Круги за ее пределами не рисуются, а частицы, которые уже никогда в нее не вернутся,
+# удаляются досрочно вместе со своими следами
+class Viewport:
+    # Инициализация (параметры берутся из раздела 'culling' конфигурации)
+    def __init__(self, width, height, margin=50):
+        self.left = -margin
+        self.top = -margin
+        self.right = width + margin
+        self.bottom = height + margin
+        self.rect = pygame.Rect(self.left, self.top, self.right - self.left, self.bottom - self.top)
+
+        # Счетчики
+        self.culled = 0 # Частиц, не нарисованных на последнем кадре
+        self.total_culled = 0 # Частиц, не нарисованных за все кадры
+        self.retired = 0 # Частиц, удаленных досрочно
+
+    # Начало отрисовки кадра
+    def begin_frame(self):
+        self.culled = 0
+
+    # Учет не нарисованных частиц
+    def cull(self, count):
+        self.culled += count
+        self.total_culled += count
+
+    # Пересекается ли прямоугольник с областью видимости
+    def overlaps(self, rect):
+        return self.rect.colliderect(rect)
+
+    # Лежит ли точка внутри области видимости
+    def contains(self, x, y):
+        return self.left <= x <= self.right and self.top <= y <= self.bottom
+
+    # Уйдет ли тело из точки (x, y) со скоростью (speed_x, speed_y) навсегда.
+    # По горизонтали сил нет, по вертикали действует только постоянная гравитация
+    def escaped(self, x, y, speed_x, speed_y, gravity):
+        if x < self.left and speed_x <= 0 or x > self.right and speed_x >= 0:
+            return True
+        if y > self.bottom and speed_y >= 0 and gravity >= 0:
+            return True
+        return y < self.top and speed_y <= 0 and gravity <= 0
+
+    # Статистика
+    def stats(self):
+        return {'culled': self.culled, 'total_culled': self.total_culled, 'retired': self.retired}
@@ -0,0 +1,76 @@
+# Класс - отрисовка только измененных областей экрана.
+# Запоминает прямоугольники фейерверков на прошлом кадре: на новом кадре заливаются фоном
+# и выводятся на дисплей только они и новые прямоугольники. Если изменена большая часть
+# экрана, дешевле перерисовать и вывести его целиком
+class DirtyRectRenderer:
+    # Инициализация (параметры берутся из раздела 'dirty_rects' конфигурации)
+    def __init__(self, screen, background, full_redraw_coverage=0.5, max_rects=200):
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+        self.background = background
+        self.full_redraw_coverage = full_redraw_coverage # Доля площади экрана, начиная с которой кадр рисуется целиком
+        self.max_rects = max_rects # Больше прямоугольников - тоже перерисовка целиком
+
+        self.previous = None # Прямоугольники прошлого кадра (None - прошлый кадр неизвестен)
+        self.rects = None # Что выводить на дисплей в этом кадре (None - весь экран)
+
+        # Статистика
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.updated_area = 0 # Сумма выведенных площадей в пикселях
+
+    # Следующий кадр будет нарисован целиком (например, после смены экрана)
+    def invalidate(self):
+        self.previous = None
+
+    # Отрисовка кадра: draw() рисует все фейерверки поверх подготовленного фона
+    def render(self, fireworks, draw):
+        current = []
+        for firework in fireworks:
+            rect = firework.bounds()
+            if rect is not None:
+                rect = rect.clip(self.screen_rect)
+                if rect.width and rect.height:
+                    current.append(rect)
+
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        if self.previous is None:
+            dirty = None
+        else:
+            dirty = current + self.previous
+            area = sum(rect.width * rect.height for rect in dirty)
+            if area >= screen_area * self.full_redraw_coverage or len(dirty) > self.max_rects:
+                dirty = None
+
+        if dirty is None:
+            self.screen.fill(self.background)
+            self.full_frames += 1
+            self.updated_area += screen_area
+        else:
+            # Стираем следы прошлого кадра и места новых фейерверков.
+            # Все фейерверки лежат внутри current, поэтому перерисовка всех восстанавливает задетое стиранием
+            for rect in dirty:
+                self.screen.fill(self.background, rect)
+            self.partial_frames += 1
+            self.updated_area += area
+        draw()
+
+        self.previous = current
+        self.rects = dirty
+
+    # Добавление области, нарисованной поверх кадра (например, панели производительности)
+    def mark(self, rect):
+        if self.previous is not None:
+            self.previous.append(rect)
+        if self.rects is not None:
+            self.rects.append(rect)
+
+    # Статистика
+    def stats(self):
+        frames = self.full_frames + self.partial_frames
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        return {
+            'full_frames': self.full_frames,
+            'partial_frames': self.partial_frames,
+            'mean_coverage': self.updated_area / (frames * screen_area) if frames else 0.0,
+        }
@@ -0,0 +1,31 @@
+import sys
+import argparse
+from .game import Game
+from .frame_writer import FrameWriteError
+from .config_loader import add_config_arguments, load_config_from_args
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Экспорт шоу в последовательность PNG или сырой RGB')
+    parser.add_argument('output', help='Папка для PNG или файл для сырого RGB')
+    add_config_arguments(parser)
+    parser.add_argument('--frames', type=int, default=600, help='Количество кадров')
+    parser.add_argument('--format', choices=('png', 'raw'), default='png', help='Формат кадров')
+    parser.add_argument('--size', help='Выходное разрешение, например 1920x1080 (по умолчанию - размер сцены)')
+    parser.add_argument('--seed', type=int, help='Зерно генератора случайных чисел')
+    parser.add_argument('--workers', type=int, default=2, help='Количество потоков записи')
+    parser.add_argument('--queue', type=int, default=32, help='Размер очереди кадров')
+    args = parser.parse_args(argv)
+    if args.frames < 1:
+        parser.error(f'--frames: ожидается хотя бы один кадр, получено {args.frames}')
+
+    spec = load_config_from_args(args)
+    game = Game.from_config(spec, headless=True, seed=args.seed)
+    size = tuple(int(value) for value in args.size.split('x')) if args.size else None
+    try:
+        game.export(args.output, args.frames, args.format, size, args.workers, args.queue)
+    except FrameWriteError:
+        return 1 # Причина уже напечатана
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
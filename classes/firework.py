@@ -1,15 +1,34 @@
+import time
 import pygame
 import random
-from particle import Particle
+from .particle import Particle, BurstGroup
+from .particle_system import ParticleSystem, generate_burst, default_rng
+from .sprite_cache import default_cache, line_max_radius, circle_bounds
+from .trail import reuse_trail
+from .specs import FireworkSpec
 
-# Класс - фейерверк
+# Параметры фейерверка по умолчанию
+DEFAULT_SPEC = FireworkSpec()
+
+# Класс - фейерверк.
+# Без __dict__: постоянные параметры следа читаются из общей спецификации self.spec
 class Firework:
+    __slots__ = ('x', 'y', 'initial_x', 'initial_y', 'particles', 'burst', 'particle_system', 'particle_backend',
+                 'particle_pool', 'line_counter', 'line', 'initial_speed_y', 'speed_y', 'diagonal',
+                 'direction', 'initial_speed_x', 'speed_x', 'explosion_height', 'color', 'exploded',
+                 'flying_step', 'old_x', 'old_y', 'profiler', 'point_trails', 'viewport', 'rng', 'random_source', 'spec')
+    
     # Инициализация
-    def __init__(self, x, y, diagonal=False, config=None):
-        # Инициализация конфигурации
-        if config is None:
-            config = {}
-        config_firework = config.get('firework', {})
+    def __init__(self, x, y, diagonal=False, spec=None, particle_backend='numpy', particle_pool=None, random_source=None):
+        self.reset(x, y, diagonal, spec, particle_backend, particle_pool, random_source)
+    
+    # Заполнение параметров фейерверка (вызывается и при повторном использовании объекта из пула)
+    # spec - проверенные параметры фейерверка и его частиц (FireworkSpec),
+    # random_source - свой генератор random.Random фейерверка (None - общий модуль random)
+    def reset(self, x, y, diagonal=False, spec=None, particle_backend='numpy', particle_pool=None, random_source=None):
+        # Параметры по умолчанию, если спецификация не передана
+        if spec is None:
+            spec = DEFAULT_SPEC
         
         # Позиция и движение
         self.x = x
@@ -18,36 +37,42 @@ class Firework:
         self.initial_x = x  # Сохраняем начальную позицию X для диагональных фейерверков
         
         # Списки для визуальных эффектов
-        self.particles = [] # Список частиц (объектов класса Particle)
-        self.line = []  # След фейерверка (x, y, size, alpha)
+        self.particles = [] # Список частиц (объектов класса Particle) для объектного режима
+        self.burst = None # Общее состояние частиц взрыва (BurstGroup) для объектного режима
+        self.particle_system = None # Система частиц NumPy для режима 'numpy'
+        self.particle_backend = particle_backend # Способ хранения частиц: 'numpy' или 'objects'
+        self.particle_pool = particle_pool # Пул объектов Particle (None - частицы создаются заново)
         
         # Параметры следа
-        self.max_line_length = config_firework.get('line_max_length', 30) # Максимальная длина хвоста
+        # (длина хвоста, интервал и скорость исчезновения точек, базовый размер - в spec)
         self.line_counter = 0 # Счетчик для создания новых точек следа
-        self.line_spacing = config_firework.get('line_spacing', 2.5) # Интервал между точками следа
-        self.line_fade_speed = config_firework.get('line_fade_speed', 8) # Скорость исчезновения точек
-        self.base_size = config_firework.get('base_size', 2.6) # Базовый размер точек следа
+        # След фейерверка (x, y, size, alpha) - кольцевой буфер фиксированной вместимости
+        self.line = reuse_trail(getattr(self, 'line', None), spec.line_capacity, spec.line_fade_speed)
+        
+        # Случайные параметры запуска и взрыва разыгрываются из своего генератора, если он задан
+        self.random_source = random_source
+        rand = random if random_source is None else random_source
         
         # Физические параметры
-        initial_speed_y_range = config_firework.get('initial_speed_y_range', [-7, -2])
-        self.initial_speed_y = random.uniform(initial_speed_y_range[0], initial_speed_y_range[1])
+        initial_speed_y_range = spec.initial_speed_y_range
+        self.initial_speed_y = rand.uniform(initial_speed_y_range[0], initial_speed_y_range[1])
         self.speed_y = self.initial_speed_y
         
         # Для диагональных фейерверков - движение под углом
         self.diagonal = diagonal
         if self.diagonal:
             # Случайное направление: влево (-1) или вправо (1)
-            self.direction = random.choice([-1, 1])
-            diagonal_speed_x_range = config_firework.get('diagonal_speed_x_range', [1, 3])
-            self.initial_speed_x = random.uniform(diagonal_speed_x_range[0], diagonal_speed_x_range[1]) * self.direction
+            self.direction = rand.choice([-1, 1])
+            diagonal_speed_x_range = spec.diagonal_speed_x_range
+            self.initial_speed_x = rand.uniform(diagonal_speed_x_range[0], diagonal_speed_x_range[1]) * self.direction
             self.speed_x = self.initial_speed_x # Горизонтальная скорость для диагонального движения
         else:
             # Вертикальные фейерверки - движение только вверх
             self.speed_x = 0
         
         # Определение высоты взрыва
-        min_explosion_height = config_firework.get('min_explosion_height', 50) # Минимальная высота взрыва
-        max_explosion_height_offset = config_firework.get('max_explosion_height_offset', 50) # Отступ от верха
+        min_explosion_height = spec.min_explosion_height # Минимальная высота взрыва
+        max_explosion_height_offset = spec.max_explosion_height_offset # Отступ от верха
         max_explosion_height = self.initial_y - max_explosion_height_offset # Максимальная высота взрыва
 
         # Если исходная позиция слишком низкая, то взрываемся посередине
@@ -56,22 +81,43 @@ class Firework:
             self.explosion_height = (min_explosion_height + self.initial_y) // 2
         else:
             # Случайная высота взрыва в допустимом диапазоне
-            self.explosion_height = random.randint(min_explosion_height, max_explosion_height)
+            self.explosion_height = rand.randint(min_explosion_height, max_explosion_height)
             
         # Визуальные параметры
-        self.color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        self.color = (rand.randint(0, 255), rand.randint(0, 255), rand.randint(0, 255))
         self.exploded = False # Флаг на взрыв
-        self.config = config # Полная конфигурация
-        self.config_firework = config_firework # Конфигурация конкретно для фейерверков
+        self.flying_step = False # Летел ли фейерверк в последнем шаге физики
+        self.old_x, self.old_y = x, y # Позиция до последнего перемещения
+        self.profiler = None # Профилировщик кадра (задается игрой, если профилирование включено)
+        self.point_trails = True # Вести точки следов (False - следы рисует буфер послесвечения игры)
+        self.viewport = None # Область видимости для отсечения (задается игрой)
+        self.rng = None # Генератор NumPy для частиц взрыва (задается игрой, None - общий генератор без зерна)
+        self.spec = spec # Параметры фейерверка и его частиц
     
     # Основное обновление состояния фейерверка на каждом кадре
     def update(self):
-        if not self.exploded:
+        self.update_physics()
+        self.update_trails()
+    
+    # Движение фейерверка или частиц взрыва
+    def update_physics(self):
+        # Запоминаем, летел ли фейерверк в этом кадре - от этого зависит, какой след обновлять
+        self.flying_step = not self.exploded
+        if self.flying_step:
             # Обновление полета до взрыва
             self._update_flying()
         else:
             # Обновление взрыва и частиц
             self._update_explosion()
+    
+    # Обслуживание следов после движения
+    def update_trails(self):
+        if self.flying_step:
+            if self.point_trails:
+                self._add_line_point(self.old_x, self.old_y) # Добавление новой точки следа
+                self._update_line() # Обновление существующих точек следа (уменьшение прозрачности)
+        else:
+            self._update_explosion_trails()
             
     # Обновление полета (до взрыва)
     def _update_flying(self):
@@ -87,21 +133,27 @@ class Firework:
             if self.diagonal:
                 self.speed_x = self.initial_speed_x * (0.5 + 0.5 * slowdown_factor) # Это гарантирует, что скорость никогда не упадет ниже 50% от начальной
         
-        self._add_line_point() # Добавление новой точки следа
-        self._update_line() # Обновление существующих точек следа (уменьшение прозрачности)
+        # Точка следа ставится в позиции до перемещения
+        self.old_x, self.old_y = self.x, self.y
         self.y += self.speed_y # Перемещение фейерверка
         if self.diagonal:
             self.x += self.speed_x # Перемещение по X для диагональных фейерверков
         
         # Проверка достижения точки взрыва
         if self.y <= self.explosion_height:
-            self.explode()
+            if self.profiler is None:
+                self.explode()
+            else:
+                # Взрыв - самый дорогой момент жизни фейерверка, замеряем его отдельно
+                start = time.perf_counter()
+                self.explode()
+                self.profiler.record_explode(time.perf_counter() - start)
     
     # Добавление новой точки в след
-    def _add_line_point(self):
+    def _add_line_point(self, x, y):
         self.line_counter += 1
         # Создаем новую точку следа через определенные интервалы
-        if self.line_counter >= self.line_spacing:
+        if self.line_counter >= self.spec.line_spacing:
             # Длина следа зависит от текущей скорости - чем быстрее, тем длиннее хвост
             if self.diagonal:
                 speed_factor = (abs(self.speed_y) + abs(self.speed_x)) / (abs(self.initial_speed_y) + abs(self.initial_speed_x))
@@ -109,91 +161,199 @@ class Firework:
                 speed_factor = abs(self.speed_y / self.initial_speed_y)
             
             # Текущая длина хвоста с учетом скорости
-            current_line_length = self.max_line_length * (0.6 + 0.4 * speed_factor) # гарантирует, что хвост никогда не исчезнет полностью
-            self.line.append((self.x, self.y, current_line_length, 255))  # Новая точка с максимальной альфой
+            current_line_length = self.spec.line_max_length * (0.6 + 0.4 * speed_factor) # гарантирует, что хвост никогда не исчезнет полностью
+            self.line.append(x, y, current_line_length, 255)  # Новая точка с максимальной альфой
             self.line_counter = 0 # Сбрасываем счетчик
     
     # Обновление точек следа - уменьшение прозрачности и удаление невидимых точек
     def _update_line(self):
-        # Уменьшение альфа-канала всех точек
-        for i in range(len(self.line)):
-            x, y, size, alpha = self.line[i]
-            # Уменьшаем прозрачность, но не ниже 0
-            self.line[i] = (x, y, size, max(0, alpha - self.line_fade_speed))
-        
-        # Удаление полностью прозрачных точек (альфа = 0)
-        self.line = [(x, y, size, alpha) for x, y, size, alpha in self.line if alpha > 0]
+        # Прозрачность вычисляется по возрасту точки, полностью прозрачные точки удаляются из буфера
+        self.line.advance()
     
-    # Обновление взрыва (после детонации)
+    # Движение частиц взрыва (после детонации)
     def _update_explosion(self):
-        for particle in self.particles[:]: # Проходим по копии списка частиц для безопасного удаления
-            particle.update()
+        if self.particle_system is not None:
+            # Все частицы обновляются одним векторизованным шагом
+            self.particle_system.update_physics()
+            if self.viewport is not None:
+                self.viewport.retired += self.particle_system.retire_outside(self.viewport)
+            return
+        
+        # Время жизни и затухание - один раз на весь взрыв, у частиц только движение
+        self.burst.update_physics()
+        for particle in self.particles:
+            particle.update_physics()
+            if self.viewport is not None and particle.retire_outside(self.viewport):
+                self.viewport.retired += 1
+    
+    # Следы частиц взрыва и удаление "мертвых" частиц
+    def _update_explosion_trails(self):
+        if self.particle_system is not None:
+            self.particle_system.update_trails(self.point_trails)
+            return
+        
+        # Новая точка и прозрачность всех точек следов - один раз на весь взрыв
+        if self.point_trails:
+            self.burst.update_trail()
+        
+        # Один проход без копии списка: живые частицы сдвигаются к началу, "мертвые" возвращаются в пул
+        particles = self.particles
+        alive_count = 0
+        for particle in particles:
+            if self.point_trails:
+                particle.update_trail()
             
-            # Удаляем "мертвые" частицы (у которых закончилось время жизни)
-            if not particle.is_alive():
-                self.particles.remove(particle)
+            if particle.is_alive():
+                particles[alive_count] = particle
+                alive_count += 1
+            elif self.particle_pool is not None:
+                self.particle_pool.release(particle)
+        del particles[alive_count:]
     
     # Взрыв
     def explode(self):
         self.exploded = True
         
         # Выбираем кол-во частиц
-        particles_count_range = self.config_firework.get('particles_count_range', [100, 200])
-        number_particles = random.randint(particles_count_range[0], particles_count_range[1])
+        rand = random if self.random_source is None else self.random_source
+        particles_count_range = self.spec.particles_count_range
+        number_particles = rand.randint(particles_count_range[0], particles_count_range[1])
         
         # Создание частиц взрыва с одинаковым временем жизни
-        particles_lifetime_range = self.config_firework.get('particles_lifetime_range', [40, 80])
-        particle_lifetime = random.randint(particles_lifetime_range[0], particles_lifetime_range[1])
-        
-        # Создаем указанное количество частиц
-        for _ in range(number_particles):
-            # Передаем полный конфиг, Particle сам выберет нужные настройки
-            particle = Particle(self.x, self.y, self.color, self.config)
-            # Устанавливаем одинаковое время жизни для всех частиц этого взрыва
-            particle.lifetime = particle_lifetime
-            particle.max_lifetime = particle_lifetime
+        particles_lifetime_range = self.spec.particles_lifetime_range
+        particle_lifetime = rand.randint(particles_lifetime_range[0], particles_lifetime_range[1])
+        
+        # Начальные состояния всех частиц разыгрываются одним пакетом
+        rng = self.rng if self.rng is not None else default_rng
+        
+        # Режим по умолчанию - все частицы взрыва в одной системе массивов
+        if self.particle_backend == 'numpy':
+            self.particle_system = ParticleSystem(self.x, self.y, self.color, number_particles, particle_lifetime, self.spec.particle, rng)
+            return
+        
+        # Объектный режим: тот же пакет раздается частицам (tolist - числа Python вместо скаляров NumPy).
+        # Общие для взрыва спецификация, цвет и время жизни хранятся один раз в группе
+        self.burst = BurstGroup(self.x, self.y, self.color, particle_lifetime, self.spec.particle)
+        speed_x, speed_y, sizes, _ = generate_burst(rng, self.spec.particle, number_particles, particle_lifetime)
+        for state in zip(speed_x.tolist(), speed_y.tolist(), sizes.tolist()):
+            if self.particle_pool is not None:
+                particle = self.particle_pool.acquire(self.burst, state)
+            else:
+                particle = Particle(self.burst, state)
             self.particles.append(particle)
         
+    # Шагов после взрыва
+    def explosion_age(self):
+        if self.particle_system is not None:
+            return self.particle_system.age
+        return self.burst.age
+    
+    # Через сколько шагов исчезнут все частицы взрыва
+    def explosion_steps_left(self):
+        if self.particle_system is not None:
+            return int(self.particle_system.lifetime.max()) if len(self.particle_system) else 0
+        return self.burst.lifetime if self.particles else 0
+    
+    # Состояние взрыва через age >= 1 шагов после него, вычисленное сразу по начальному состоянию частиц
+    # (быстрая перемотка, см. ballistics): промежуточные шаги не выполняются. Последний шаг выполняется
+    # обычным образом, чтобы отсечение и удаление частиц прошли так же, как при пошаговой симуляции
+    def seek_explosion(self, age):
+        if self.particle_system is not None:
+            self.particle_system.seek(age - 1, self.point_trails)
+        else:
+            self.burst.seek(age - 1, self.point_trails)
+            for particle in self.particles:
+                if particle.is_alive():
+                    particle.seek(self.point_trails)
+        self.flying_step = False
+        self._update_explosion()
+        self._update_explosion_trails()
+    
     # Проверка "жив" ли фейерверк
     def is_alive(self):
-        return not self.exploded or len(self.particles) > 0
+        return not self.exploded or self.particle_count() > 0
+    
+    # Количество живых частиц взрыва
+    def particle_count(self):
+        if self.particle_system is not None:
+            return len(self.particle_system)
+        return len(self.particles)
+    
+    # Количество точек следа (самого фейерверка или всех его частиц)
+    def trail_point_count(self):
+        if not self.exploded:
+            return len(self.line)
+        if self.particle_system is not None:
+            return self.particle_system.line_count * len(self.particle_system)
+        # У всех частиц взрыва одинаковое количество точек следа
+        return len(self.burst.schedule) * len(self.particles)
     
     # Основной метод отрисовки фейерверка
-    def draw(self, screen):
+    # alpha - доля шага физики для интерполяции положения частиц между кадрами симуляции
+    # trail_step - рисуется каждая trail_step-я точка следа (снижение качества под нагрузкой)
+    def draw(self, screen, alpha=1.0, trail_step=1):
         if not self.exploded:
             # Рисуем след полета
-            self._draw_line(screen)
+            self._draw_line(screen, trail_step)
         else:
             # Рисуем взрыв
-            self._draw_explosion(screen)
+            self._draw_explosion(screen, alpha, trail_step)
+    
+    # Отрисовка только самого фейерверка или частиц взрыва, без следов (для буфера послесвечения)
+    def draw_heads(self, screen, alpha=1.0):
+        if not self.exploded:
+            default_cache.draw_circle(screen, self.color, line_max_radius(self.spec.base_size), 255, self.x, self.y)
+        elif self.particle_system is not None:
+            self.particle_system.draw_heads(screen, alpha)
+        else:
+            for particle in self.particles:
+                particle.draw_head(screen, alpha)
     
     # Отрисовка следа (хвоста) фейерверка
-    def _draw_line(self, screen):
-        for x, y, size, alpha in self.line:
+    def _draw_line(self, screen, trail_step=1):
+        # Радиус ограничен размером поверхности следа int(base_size * 2 + 2)
+        max_radius = line_max_radius(self.spec.base_size)
+        for x, y, size, alpha in self.line.points(trail_step):
             if alpha > 0: # Рисуем только видимые точки
-                # Расчет размера и прозрачности точки
-                circle_size = max(1, size / 8)
-                
-                # Создание поверхности с альфа-каналом для прозрачности
-                max_surface_size = int(self.base_size * 2 + 2)
-                circle_surface = pygame.Surface((max_surface_size, max_surface_size), pygame.SRCALPHA)
-                # Цвет точки с учетом текущей прозрачности
-                circle_color = (*self.color, int(alpha))
-                
-                # Отрисовка точки на временной поверхности
-                center_x, center_y = max_surface_size // 2, max_surface_size // 2
-                pygame.draw.circle(circle_surface, circle_color, (center_x, center_y), circle_size)
-                # Копируем точку на основной экран с правильными координатами
-                screen.blit(circle_surface, (x - center_x, y - center_y))
+                # Расчет размера точки и отрисовка готового спрайта из кэша
+                circle_size = min(max(1, size / 8), max_radius)
+                default_cache.draw_circle(screen, self.color, circle_size, alpha, x, y)
     
     # Отрисовка взрыва - отрисовка всех частиц
-    def _draw_explosion(self, screen):
+    def _draw_explosion(self, screen, alpha=1.0, trail_step=1):
+        if self.particle_system is not None:
+            self.particle_system.draw(screen, alpha, trail_step, self.viewport)
+            return
+        
         for particle in self.particles:
-            particle.draw(screen)
+            particle.draw(screen, alpha, trail_step)
+    
+    # Прямоугольник экрана, который фейерверк закрашивает при отрисовке (None - рисовать нечего)
+    def bounds(self):
+        if not self.exploded:
+            box = self.line.bounds()
+            return None if box is None else circle_bounds(*box, line_max_radius(self.spec.base_size))
+        if self.particle_system is not None:
+            return self.particle_system.bounds()
+        rects = [rect for rect in (particle.bounds() for particle in self.particles) if rect is not None]
+        return rects[0].unionall(rects[1:]) if rects else None
+    
+    # Добавление всех кругов фейерверка в список кругов кадра (PointBuffer) вместо прямой отрисовки
+    def collect_points(self, points, alpha=1.0, trail_step=1):
+        if not self.exploded:
+            max_radius = line_max_radius(self.spec.base_size)
+            for x, y, size, line_alpha in self.line.points(trail_step):
+                if line_alpha > 0:
+                    points.add(x, y, min(max(1, size / 8), max_radius), self.color, line_alpha)
+        elif self.particle_system is not None:
+            self.particle_system.collect_points(points, alpha, trail_step)
+        else:
+            for particle in self.particles:
+                particle.collect_points(points, alpha, trail_step)
 
 if __name__ == "__main__":        
     # Инициализация pygame и создание окна
-    pygame.init()
+    pygame.display.init()
     width, height = 800, 600
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption('Фейерверк')
@@ -0,0 +1,140 @@
+import os
+import time
+import zlib
+import queue
+import struct
+import threading
+import pygame
+import numpy as np
+
+# Упаковка блока PNG: длина, тип, данные, CRC
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+# Кодирование кадра RGB в PNG. zlib.compress отпускает GIL, поэтому кодирование
+# в рабочих потоках идет параллельно с симуляцией
+def encode_png(data, width, height, compression=6):
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(height, width * 3)
+    filtered = np.zeros((height, width * 3 + 1), dtype=np.uint8) # Первый байт строки - фильтр 0 (без фильтра)
+    filtered[:, 1:] = rows
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0) # 8 бит на канал, RGB
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(filtered.tobytes(), compression)) + _png_chunk(b'IEND', b''))
+
+# Ошибка записи кадра в рабочем потоке (исходная ошибка - в __cause__)
+class FrameWriteError(RuntimeError):
+    pass
+
+# Класс - фоновая запись кадров.
+# Главный поток только копирует пиксели кадра в ограниченную очередь, кодирование и запись
+# на диск выполняют рабочие потоки
+class FrameWriter:
+    # Инициализация
+    def __init__(self, output, fmt='png', workers=2, queue_size=32):
+        self.output = output
+        self.fmt = fmt
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.bytes_written = 0
+        self.wait_time = 0.0 # Сколько главный поток ждал места в очереди
+        self.lock = threading.Lock()
+        self.error = None # Первая ошибка записи (FrameWriteError) - передается главному потоку
+
+        if fmt == 'png':
+            os.makedirs(output, exist_ok=True)
+            self.file = None
+        elif fmt == 'raw':
+            # Сырой RGB пишется в один файл строго по порядку - поэтому один рабочий поток
+            directory = os.path.dirname(output)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(output, 'wb')
+            workers = 1
+        else:
+            raise ValueError(f'Неизвестный формат {fmt}, доступны png и raw')
+
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    # Постановка кадра в очередь на запись.
+    # Ожидание места идет короткими порциями: ошибка записи или остановка всех потоков не оставят главный поток ждать вечно
+    def submit(self, index, surface):
+        self._check()
+        width, height = surface.get_size()
+        data = pygame.image.tobytes(surface, 'RGB')
+        start = time.perf_counter()
+        while True:
+            try:
+                self.queue.put((index, data, width, height), timeout=0.1)
+                break
+            except queue.Full:
+                self._check()
+        self.wait_time += time.perf_counter() - start
+
+    # Ошибка записи или остановившиеся потоки - исключение в главном потоке
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+        if not any(thread.is_alive() for thread in self.threads):
+            raise FrameWriteError('Все потоки записи кадров остановлены')
+
+    # Рабочий поток: кодирование и запись кадров.
+    # После первой ошибки кадры только выбираются из очереди, чтобы главный поток не ждал места в ней
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            index = item[0]
+            try:
+                self._write(*item)
+            except Exception as error:
+                with self.lock:
+                    if self.error is None:
+                        self.error = FrameWriteError(f'Кадр {index} не записан: {error}')
+                        self.error.__cause__ = error
+
+    # Кодирование и запись одного кадра
+    def _write(self, index, data, width, height):
+        if self.fmt == 'png':
+            encoded = encode_png(data, width, height)
+            with open(os.path.join(self.output, f'frame_{index:06d}.png'), 'wb') as f:
+                f.write(encoded)
+        else:
+            encoded = data
+            self.file.write(data)
+        with self.lock:
+            self.written += 1
+            self.bytes_written += len(encoded)
+
+    # Количество кадров в очереди
+    def pending(self):
+        return self.queue.qsize()
+
+    # Завершение записи: дождаться всех кадров (ошибка записи передается вызывающему)
+    def close(self):
+        self._stop()
+        if self.error is not None:
+            raise self.error
+
+    # Прерывание записи: кадры в очереди отбрасываются, ошибка не передается
+    def abort(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self._stop()
+
+    # Остановка рабочих потоков и закрытие файла
+    def _stop(self):
+        for thread in self.threads:
+            if thread.is_alive():
+                self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.file is not None:
+            self.file.close()
@@ -1,43 +1,184 @@
+import os
+import time
 import pygame
 import random
-from firework import Firework
+import numpy as np
+from .firework import Firework
+from .particle import Particle, LINE_MAX_ALPHA
+from .pool import ObjectPool
+from .sprite_cache import default_cache
+from .profiler import FrameProfiler
+from .sim_clock import FixedStepClock
+from .quality import QualityGovernor, scale_spec
+from .frame_writer import FrameWriter, FrameWriteError
+from .sharded import ShardedSimulation
+from .dirty_rects import DirtyRectRenderer
+from .blit_batch import BlitBatch
+from .raster import Rasterizer
+from .persistence import PersistenceBuffer, fade_factor
+from .culling import Viewport
+from .scene_points import PointBuffer
+from .specs import GameSpec, compile_config
+from .commands import CommandQueue, CommandServer, preset_firework
+from .render_thread import RenderThread, latency_text
+from .replay import InputRecorder, InputReplay, new_seed, CLICK, KEY, QUALITY, COMMAND
 
 # Класс - Игра
 class Game:
+    # Создание игры по конфигурации: словарь JSON (проверяется и компилируется в GameSpec) или готовая GameSpec.
+    # kwargs - параметры самой игры (caption, headless, seed, record, replay) и замены полей спецификации (width, workers, ...)
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        game_kwargs = {name: kwargs.pop(name) for name in ('caption', 'headless', 'seed', 'record', 'replay') if name in kwargs}
+        spec = compile_config(config)
+        if kwargs:
+            spec = spec.replace(**kwargs)
+        return cls(spec, **game_kwargs)
+    
     # Инициализация параметров игры
-    def __init__(self, width=1000, height=800, caption='Фейерверки', background=(0, 0, 0), firework_interval=30, diagonal=False, margin_x=20, fps=60, config=None):
-        # Устанавливаем конфиг по умолчанию если не передан
-        if config is None:
-            config = {} 
-        
-        # Инициализация pygame
-        pygame.init()
-        
-        # Настройки графического окна
-        self.width = width
-        self.height = height
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption(caption)
-        self.background = background
+    # spec - проверенная конфигурация (GameSpec), все параметры игры берутся из нее
+    # record - файл для записи ввода, replay - файл записи ввода для воспроизведения
+    def __init__(self, spec=None, caption='Фейерверки', headless=False, seed=None, record=None, replay=None):
+        # Устанавливаем конфигурацию по умолчанию если не передана
+        if spec is None:
+            spec = GameSpec()
+        self.spec = spec
+        
+        # Воспроизведение записи ввода: зерно берется из записи, клики и клавиши - из файла.
+        # Запись без зерна нельзя повторить, поэтому для нее зерно выбирается заранее
+        self.replay = InputReplay(replay) if replay is not None else None
+        if self.replay is not None:
+            seed = self.replay.seed
+        elif record is not None and seed is None:
+            seed = new_seed()
+        
+        # Фиксируем генераторы случайных чисел: random - запуски фейерверков,
+        # NumPy - пакетная генерация частиц взрыва (один генератор игры на все фейерверки)
+        self.seed = seed
+        if seed is not None:
+            random.seed(seed)
+        self.rng = np.random.default_rng(seed)
+        self.steps = 0 # Количество выполненных шагов симуляции (время событий в записи ввода)
+        self.recorder = InputRecorder(record, seed) if record is not None else None
+        
+        # Симуляция в рабочих процессах (0 - в главном процессе). Процессы запускаются до инициализации SDL,
+        # чтобы не наследовать состояние SDL; параметры - в разделе 'sharding' конфигурации
+        self.shards = None
+        if spec.workers:
+            self.shards = ShardedSimulation(spec.workers, seed=seed, particle_backend=spec.particle_backend, **spec.section('sharding'))
+        
+        # Без окна (сборочные машины) используем фиктивный видеодрайвер SDL
+        self.headless = headless
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        
+        # Настройки графического окна (в режиме без окна рисуем на поверхность в памяти).
+        # Из подсистем SDL нужен только дисплей, и только когда есть окно: pygame.init запускал бы
+        # еще звук, джойстики и т.д., которые игра не использует, и замедлял запуск
+        self.width = spec.width
+        self.height = spec.height
+        if headless:
+            self.screen = pygame.Surface((self.width, self.height))
+        else:
+            pygame.display.init()
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption(caption)
+        self.background = spec.background
         self.clock = pygame.time.Clock()
         
         # Список активных фейерверков
         self.fireworks = []
         
+        # Пулы объектов для повторного использования фейерверков и частиц (размеры можно задать заранее)
+        pool_sizes = spec.section('pools')
+        self.firework_pool = ObjectPool(Firework, 'fireworks', pool_sizes.get('fireworks', 0))
+        self.particle_pool = ObjectPool(Particle, 'particles', pool_sizes.get('particles', 0))
+        
         # Таймер для фейерверков
         self.firework_timer = 0
-        self.firework_interval = firework_interval
+        self.firework_interval = spec.firework_interval
         
         # Режим движения фейерверков (диагональный или вертикальный)
-        self.diagonal = diagonal
+        self.diagonal = spec.diagonal
         
         # Флаг работы главного цикла
         self.running = True
         
         # Дополнительные настройки
-        self.margin_x = margin_x
-        self.fps = fps
-        self.config = config # Конфигурация из файл
+        self.margin_x = spec.margin_x
+        self.fps = spec.fps # Частота отрисовки
+        self.sim_fps = spec.sim_fps # Частота шагов физики (не зависит от частоты отрисовки)
+        self.particle_backend = spec.particle_backend # Хранение частиц: 'numpy' (по умолчанию) или 'objects' для сравнения
+        
+        # Кэш спрайтов кругов (размер и шаг квантования альфы настраиваются в конфигурации)
+        self.sprite_cache = default_cache
+        self.sprite_cache.configure(**spec.section('sprite_cache'))
+        
+        # Часы симуляции с фиксированным шагом (ограничения догоняющих шагов - в разделе 'timestep')
+        self.sim_clock = FixedStepClock(spec.sim_fps, **spec.section('timestep'))
+        
+        # Регулятор качества под бюджет времени кадра (политика - в разделе 'quality' конфигурации)
+        self.quality = QualityGovernor(spec.fps, **spec.section('quality'))
+        self.spawn_spec = spec.firework # Параметры новых фейерверков с учетом уровня качества
+        
+        # Профилирование фаз кадра (None - выключено и почти ничего не стоит)
+        self.profiler_settings = spec.section('profiler')
+        profiler_enabled = self.profiler_settings.pop('enabled', False)
+        self.profiler = FrameProfiler(**self.profiler_settings) if profiler_enabled else None
+        
+        # Отсечение невидимого: круги вне экрана с запасом не рисуются, улетевшие навсегда частицы удаляются
+        # (раздел 'culling' конфигурации, включено по умолчанию)
+        culling_settings = spec.section('culling')
+        culling_enabled = culling_settings.pop('enabled', True)
+        self.viewport = Viewport(self.width, self.height, **culling_settings) if culling_enabled else None
+        
+        # Режим следов: 'points' - точки следа у каждой частицы, 'persistence' - общий затухающий буфер,
+        # на который рисуются только частицы (стоимость следов не зависит от их длины)
+        self.trail_mode = spec.trail_mode
+        self.persistence = None
+        if spec.trail_mode == 'persistence':
+            line_fade_speed = spec.firework.particle.line_fade_speed
+            self.persistence = PersistenceBuffer((self.width, self.height), fade_factor(line_fade_speed, LINE_MAX_ALPHA))
+        
+        # Пакетный вывод спрайтов через Surface.blits (раздел 'blit_batch' конфигурации, включен по умолчанию)
+        batch_settings = spec.section('blit_batch')
+        batch_enabled = batch_settings.pop('enabled', True)
+        self.blit_batch = BlitBatch(self.screen, **batch_settings) if batch_enabled else None
+        
+        # Программная растеризация кругов на NumPy вместо blit каждого спрайта (раздел 'raster' конфигурации, выключена по умолчанию).
+        # Буфер послесвечения и перерисовка областей выводят кадр сами и имеют приоритет
+        self.rasterizer = None
+        if spec.section('raster').get('enabled', False):
+            self.rasterizer = Rasterizer((self.width, self.height), self.background)
+            self.raster_points = PointBuffer() # Список кругов кадра, переиспользуется между кадрами
+        
+        # Перерисовка только измененных областей (включается в разделе 'dirty_rects' конфигурации)
+        dirty_settings = spec.section('dirty_rects')
+        dirty_enabled = dirty_settings.pop('enabled', False)
+        self.dirty_renderer = DirtyRectRenderer(self.screen, self.background, **dirty_settings) if dirty_enabled else None
+        
+        # Запуски от внешнего пульта через локальный сокет (раздел 'commands' конфигурации, выключен по умолчанию).
+        # Сервер работает в своем потоке и только складывает команды в очередь, игра забирает их раз в шаг
+        command_settings = spec.section('commands')
+        self.commands = None
+        self.command_server = None
+        self.command_specs = {} # Параметры пресетов команд с учетом уровня качества
+        if command_settings.pop('enabled', False):
+            self.commands = CommandQueue(command_settings.pop('max_pending', 100000), command_settings.pop('launches_per_step', 200))
+            self.command_server = CommandServer(self.commands, default_y=self.height, **command_settings).start()
+            print(f'Команды принимаются на {self.command_server.address()}')
+        
+        # Отрисовка в отдельном потоке (раздел 'render_thread' конфигурации, выключена по умолчанию):
+        # шаг собирает круги кадра в снимок, поток рисует последний готовый снимок и выводит его на дисплей.
+        # Рабочие процессы, буфер послесвечения и перерисовка областей рисуют прямо на экран, поэтому с ними поток не работает
+        thread_settings = spec.section('render_thread')
+        self.render_thread = None
+        if thread_settings.pop('enabled', False):
+            if self.shards is not None or self.persistence is not None or self.dirty_renderer is not None:
+                print('Поток отрисовки выключен: не совместим с workers, trail_mode persistence и dirty_rects')
+            else:
+                self.render_thread = RenderThread(self.screen, self.background, self.present, rasterizer=self.rasterizer,
+                                                  **thread_settings).start()
     
     # Обработка всех событий
     def handle_events(self):
@@ -48,62 +189,539 @@ class Game:
             
             # Нажатие клавиши на клавиатуре
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE: # Клавища ESC - выход
-                    self.running = False
+                if self.recorder is not None:
+                    self.recorder.key(self.steps, event.key)
+                self.handle_key(event.key)
             
-            # Нажатие кнопки мыши
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Левая кнопка мыши
-                    self.create_firework_at_pos(event.pos)
+            # Нажатие кнопки мыши (при воспроизведении клики берутся только из записи)
+            if event.type == pygame.MOUSEBUTTONDOWN and self.replay is None:
+                if self.recorder is not None:
+                    self.recorder.click(self.steps, event.button, event.pos)
+                self.handle_click(event.button, event.pos)
+    
+    # Нажатие клавиши (из очереди событий или из записи ввода)
+    def handle_key(self, key):
+        if key == pygame.K_ESCAPE: # Клавища ESC - выход
+            self.running = False
+        if key == pygame.K_F3: # Клавиша F3 - панель производительности
+            self.toggle_hud()
+    
+    # Нажатие кнопки мыши (из очереди событий или из записи ввода)
+    def handle_click(self, button, pos):
+        if button == 1:  # Левая кнопка мыши
+            self.create_firework_at_pos(pos)
+    
+    # Выполнение событий записи ввода, привязанных к текущему шагу
+    def _replay_events(self):
+        for _, kind, button, a, b in self.replay.due(self.steps):
+            if kind == CLICK:
+                self.handle_click(button, (a, b))
+            elif kind == KEY:
+                self.handle_key(a)
+            elif kind == QUALITY:
+                self.quality.set_level(a)
+                self._update_spawn_spec()
+            elif kind == COMMAND:
+                self._replay_command(a)
+    
+    # Запуск по записанной команде пульта (a - параметры команды из записи)
+    def _replay_command(self, command):
+        spec = None
+        if command['preset'] is not None:
+            spec = preset_firework(command['preset'])
+            if spec is None:
+                raise ValueError(f"{self.replay.path}: неизвестный пресет команды {command['preset']!r}")
+        color = tuple(command['color']) if command['color'] is not None else None
+        self.create_firework_at_pos((command['x'], command['y']), spec, color)
     
     # Создание фейерверка в указанной позиции
-    def create_firework_at_pos(self, pos):
+    # spec - параметры пресета (None - параметры игры), color - цвет (None - случайный)
+    def create_firework_at_pos(self, pos, spec=None, color=None):
         x, y = pos
-        new_firework = Firework(x, y, self.diagonal, self.config)
-        self.fireworks.append(new_firework)
+        spec = self.spawn_spec if spec is None else self._command_spec(spec)
+        if self.shards is not None:
+            self.shards.launch(x, y, self.diagonal, spec, color)
+            return
+        new_firework = self.firework_pool.acquire(x, y, self.diagonal, spec, self.particle_backend, self.particle_pool)
+        if color is not None:
+            new_firework.color = color
+        self._add_firework(new_firework)
+    
+    # Параметры пресета команды с учетом уровня качества (пересчитываются один раз на уровень)
+    def _command_spec(self, spec):
+        if self.quality.level == 0:
+            return spec
+        scaled = self.command_specs.get(spec)
+        if scaled is None:
+            scaled = self.command_specs[spec] = scale_spec(spec, self.quality.settings)
+        return scaled
+    
+    # Запуск фейерверков по командам, которым пришло время (запуски попадают в запись ввода)
+    def _launch_commands(self):
+        for command in self.commands.drain():
+            if self.recorder is not None:
+                self.recorder.command(self.steps, command.x, command.y, command.preset, command.color)
+            self.create_firework_at_pos((command.x, command.y), command.spec, command.color)
     
     # Создание случайного фейерверка
     def spawn_random_firework(self):
-        new_firework = Firework(random.randint(self.margin_x, self.width - self.margin_x), self.height, self.diagonal, self.config)
-        self.fireworks.append(new_firework)
+        x = random.randint(self.margin_x, self.width - self.margin_x)
+        if self.shards is not None:
+            self.shards.launch(x, self.height, self.diagonal, self.spawn_spec)
+            return
+        new_firework = self.firework_pool.acquire(x, self.height, self.diagonal,
+                                                  self.spawn_spec, self.particle_backend, self.particle_pool)
+        self._add_firework(new_firework)
+    
+    # Добавление фейерверка в список активных
+    def _add_firework(self, firework):
+        firework.profiler = self.profiler
+        firework.point_trails = self.persistence is None
+        firework.viewport = self.viewport
+        firework.rng = self.rng
+        self.fireworks.append(firework)
+    
+    # Включение и выключение панели производительности (при необходимости включает профилирование)
+    def toggle_hud(self):
+        if self.profiler is None:
+            self.profiler = FrameProfiler(**self.profiler_settings)
+            for firework in self.fireworks:
+                firework.profiler = self.profiler
+        self.profiler.toggle_hud()
     
     # Обновление состояния игры на каждом кадре
     def update(self):
+        self.update_spawn()
+        self.update_physics()
+        self.update_trails()
+    
+    # Запуск новых фейерверков по таймеру
+    def update_spawn(self):
+        # Клики и клавиши из записи выполняются перед тем же шагом, что и при записи
+        if self.replay is not None:
+            self._replay_events()
+        
+        # Команды внешнего пульта (очередь заполняет поток сервера, здесь она только опустошается).
+        # При воспроизведении запуски по командам берутся только из записи
+        if self.commands is not None and self.replay is None:
+            self._launch_commands()
+        
         # Увеличиваем таймер и создаем фейерверк при достижении интервала
         self.firework_timer += 1
         if self.firework_timer >= self.firework_interval:
             self.spawn_random_firework()
             self.firework_timer = 0 # Сбрасываем таймер
-        
-        # Обновляем все фейерверки и удаляем "мертвые"
-        for firework in self.fireworks[:]: # Испольуем копию списка, чтобы безопасно удалять фейерверки
-            firework.update()
+        self.steps += 1
+    
+    # Движение всех фейерверков и частиц
+    def update_physics(self):
+        if self.shards is not None: # Шаг целиком выполняют рабочие процессы
+            self.shards.step(self.quality.settings['trail_draw_step'])
+            return
+        for firework in self.fireworks:
+            firework.update_physics()
+    
+    # Обслуживание следов и удаление "мертвых" фейерверков
+    def update_trails(self):
+        # Один проход: живые фейерверки сдвигаются к началу списка, "мертвые" возвращаются в пул
+        if self.shards is not None: # Следы и удаление обслуживают рабочие процессы
+            return
+        fireworks = self.fireworks
+        alive_count = 0
+        for firework in fireworks:
+            firework.update_trails()
             
+            if firework.is_alive():
+                fireworks[alive_count] = firework
+                alive_count += 1
+            else:
+                self.firework_pool.release(firework)
+        del fireworks[alive_count:]
+        
+        # Следы в буфере послесвечения: затухание и отпечатки частиц после шага
+        if self.persistence is not None:
+            self.persistence.stamp(fireworks)
+    
+    # Перемотка шоу к шагу step. Запуски выполняются как обычно (тот же расход случайных чисел, те же события
+    # записи ввода), летящие фейерверки двигаются по шагам, а взрывы только отсчитывают шаги и один раз
+    # вычисляются в конце сразу по начальному состоянию частиц (см. ballistics). Назад - шоу начинается заново
+    # с того же зерна (клики без записи ввода и команды пульта не повторяются). Перемотка не записывается во ввод
+    def seek(self, step):
+        if self.shards is not None:
+            raise ValueError('Перемотка недоступна при симуляции в рабочих процессах')
+        if step < self.steps:
+            self.restart()
+        
+        skipped = {} # Фейерверк -> сколько шагов его взрыва еще не вычислено
+        while self.steps < step:
+            self.update_spawn()
+            fireworks = self.fireworks
+            alive_count = 0
+            for firework in fireworks:
+                if firework.exploded:
+                    skipped[firework] = skipped.get(firework, 0) + 1
+                    alive = skipped[firework] < firework.explosion_steps_left()
+                else:
+                    firework.update_physics()
+                    firework.update_trails()
+                    alive = firework.is_alive()
+                
+                if alive:
+                    fireworks[alive_count] = firework
+                    alive_count += 1
+                else:
+                    skipped.pop(firework, None)
+                    self._release_firework(firework)
+            del fireworks[alive_count:]
+        
+        # Итоговое состояние взрывов и удаление отсеченных целиком
+        for firework, steps in skipped.items():
+            firework.seek_explosion(firework.explosion_age() + steps)
+        alive = [firework for firework in self.fireworks if firework.is_alive()]
+        for firework in self.fireworks:
             if not firework.is_alive():
-                self.fireworks.remove(firework)
+                self.firework_pool.release(firework)
+        self.fireworks[:] = alive
+        
+        # Накопленные между кадрами буферы относятся к прежнему моменту шоу
+        if self.persistence is not None:
+            self.persistence.clear()
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.invalidate()
+    
+    # Перемотка на steps шагов вперед
+    def skip(self, steps):
+        self.seek(self.steps + steps)
+    
+    # Возврат шоу к началу: те же зерно и запись ввода, все фейерверки и частицы возвращаются в пулы
+    def restart(self):
+        if self.seed is None:
+            raise ValueError('Шоу без зерна нельзя начать заново')
+        random.seed(self.seed)
+        self.rng = np.random.default_rng(self.seed)
+        for firework in self.fireworks:
+            self._release_firework(firework)
+        self.fireworks.clear()
+        self.steps = 0
+        self.firework_timer = 0
+        if self.replay is not None:
+            self.replay.rewind()
+        if self.quality.level != 0:
+            self.quality.set_level(0)
+            self._update_spawn_spec()
+    
+    # Возврат фейерверка и его частиц в пулы
+    def _release_firework(self, firework):
+        for particle in firework.particles:
+            self.particle_pool.release(particle)
+        firework.particles.clear()
+        self.firework_pool.release(firework)
     
     # Отрисовка всех элементов игры на экране
-    def draw(self):
+    # alpha - доля шага физики для интерполяции между двумя последними состояниями,
+    # stamp - момент опроса ввода в этом кадре (для замера задержки до экрана в потоке отрисовки)
+    def draw(self, alpha=1.0, stamp=None):
+        if self.render_thread is not None:
+            self.publish_frame(alpha, stamp)
+            return
+        self.render(alpha)
+        self.present()
+    
+    # Сборка кругов кадра в свободный снимок и передача его потоку отрисовки
+    def publish_frame(self, alpha=1.0, stamp=None):
+        snapshot = self.render_thread.acquire()
+        snapshot.step = self.steps
+        snapshot.stamp = time.perf_counter() if stamp is None else stamp
+        self._collect_fireworks(snapshot.points, alpha)
+        self.render_thread.publish(snapshot)
+    
+    # Отрисовка кадра на поверхность экрана
+    def render(self, alpha=1.0):
+        # Следы и частицы уже в буфере послесвечения - выводим его поверх фона
+        if self.persistence is not None and self.shards is None:
+            self.screen.fill(self.background)
+            self.persistence.draw(self.screen)
+            return
+        
+        # Заливка и перерисовка только областей, задетых фейерверками на этом и прошлом кадре
+        if self.dirty_renderer is not None and self.shards is None:
+            self.dirty_renderer.render(self.fireworks, lambda: self._draw_fireworks(alpha))
+            return
+        
+        # Все круги кадра одним списком растеризуются в NumPy и выводятся одним blit (фон растеризатор рисует сам)
+        if self.rasterizer is not None:
+            if self.shards is not None:
+                points = self.shards.points()
+            else:
+                self.raster_points.clear()
+                self._collect_fireworks(self.raster_points, alpha)
+                points = self.raster_points.view()
+            self.rasterizer.render(self.screen, points)
+            return
+        
         # Заливаем фон
         self.screen.fill((self.background))
         
-        # Отрисовываем все активные фейерверки
+        # Отрисовываем все активные фейерверки (под нагрузкой - не все точки следа)
+        if self.shards is not None: # Круги последнего готового шага из общей памяти процессов
+            self.shards.draw(self.blit_batch or self.screen)
+            if self.blit_batch is not None:
+                self.blit_batch.flush()
+            return
+        self._draw_fireworks(alpha)
+    
+    # Отрисовка всех активных фейерверков (под нагрузкой - не все точки следа)
+    def _draw_fireworks(self, alpha=1.0):
+        trail_step = self.quality.settings['trail_draw_step']
+        # Фейерверки "рисуют" в пакет, на экран все уходит несколькими вызовами Surface.blits
+        target = self.screen if self.blit_batch is None else self.blit_batch
+        viewport = self.viewport
+        if viewport is not None:
+            viewport.begin_frame()
         for firework in self.fireworks:
-            firework.draw(self.screen)
-        
-        # Обновляем дисплей
-        pygame.display.flip()
+            if viewport is not None:
+                # Фейерверк целиком вне области видимости не рисуется вовсе
+                bounds = firework.bounds()
+                if bounds is None or not viewport.overlaps(bounds):
+                    viewport.cull(firework.particle_count())
+                    continue
+            firework.draw(target, alpha, trail_step)
+        if self.blit_batch is not None:
+            self.blit_batch.flush()
+    
+    # Те же круги, что рисует _draw_fireworks, но в список кругов кадра (PointBuffer) для потока отрисовки
+    def _collect_fireworks(self, points, alpha=1.0):
+        trail_step = self.quality.settings['trail_draw_step']
+        viewport = self.viewport
+        if viewport is not None:
+            viewport.begin_frame()
+        for firework in self.fireworks:
+            if viewport is not None:
+                bounds = firework.bounds()
+                if bounds is None or not viewport.overlaps(bounds):
+                    viewport.cull(firework.particle_count())
+                    continue
+            firework.collect_points(points, alpha, trail_step)
+    
+    # Вывод готового кадра на дисплей
+    def present(self):
+        if self.headless:
+            return
+        if self.dirty_renderer is not None and self.dirty_renderer.rects is not None:
+            pygame.display.update(self.dirty_renderer.rects) # Только измененные области
+        else:
+            pygame.display.flip()
     
     # Главный игровой цикл
     def run(self):
+        # Очередь событий работает только при инициализированном дисплее (без окна он еще не запущен)
+        if not pygame.display.get_init():
+            pygame.display.init()
+        elapsed = self.sim_clock.step # Первый кадр сразу выполняет один шаг физики
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(self.fps) 
+            if self.profiler is None:
+                elapsed = self._run_frame(elapsed)
+            else:
+                elapsed = self._run_profiled_frame(elapsed)
+        
+        # Статистика часов симуляции
+        print(f"Симуляция: шагов {self.sim_clock.steps}, пропущено отрисовок {self.sim_clock.total_skipped_draws}, "
+              f"отброшено {self.sim_clock.dropped_time:.2f} с")
+        
+        # Трасса кадров в CSV (если задан файл в разделе 'profiler' конфигурации)
+        if self.profiler is not None:
+            self.profiler.dump_csv()
+        
+        # Статистика кэша спрайтов для подбора шага квантования альфы
+        stats = self.sprite_cache.stats()
+        print(f"Кэш спрайтов: {stats['size']}/{stats['max_size']} спрайтов, попаданий {stats['hits']}, "
+              f"промахов {stats['misses']}, вытеснений {stats['evictions']} (доля попаданий {stats['hit_rate']:.1%})")
+        
+        # Заполненность пулов для подбора их размеров под самое большое шоу
+        for pool in (self.firework_pool, self.particle_pool):
+            stats = pool.stats()
+            print(f"Пул {stats['name']}: занято {stats['in_use']}, свободно {stats['free']}, максимум {stats['high_water']}, "
+                  f"создано {stats['created']}, повторно использовано {stats['reused']}")
+        
+        # Отсечение невидимых частиц
+        if self.viewport is not None:
+            print(f"Отсечение: не нарисовано частиц {self.viewport.total_culled}, удалено досрочно {self.viewport.retired}")
+        
+        # Доля перерисованной площади экрана
+        if self.dirty_renderer is not None:
+            stats = self.dirty_renderer.stats()
+            print(f"Перерисовка областей: частичных кадров {stats['partial_frames']}, полных {stats['full_frames']}, "
+                  f"в среднем {stats['mean_coverage']:.1%} экрана")
+        
+        # Растеризация: сколько кругов и пикселей в среднем за кадр
+        if self.rasterizer is not None:
+            stats = self.rasterizer.stats()
+            print(f"Растеризация: кадров {stats['frames']}, масок радиусов {stats['kernels']}, в среднем кругов "
+                  f"{stats['mean_circles']:.0f}, пикселей {stats['mean_pixels']:.0f}")
+        
+        # Поток отрисовки: остановка и задержка от ввода до экрана
+        if self.render_thread is not None:
+            self.render_thread.close()
+            stats = self.render_thread.stats()
+            print(f"Поток отрисовки: кадров {stats['frames']}, заменено снимков {stats['dropped']}, задержка ввод-экран "
+                  f"{latency_text(stats, 1)}")
+        
+        # Остановка рабочих процессов и освобождение общей памяти
+        if self.shards is not None:
+            self.shards.close()
+        
+        # Сокет команд: остановка сервера и статистика очереди
+        if self.command_server is not None:
+            self.command_server.close()
+            stats = self.commands.stats()
+            print(f"Команды: принято {stats['received']}, запущено {stats['launched']}, отброшено {stats['dropped']}, "
+                  f"ошибок {self.command_server.errors}")
+        
+        # Запись ввода: отметка конца прогона
+        if self.recorder is not None:
+            self.recorder.close(self.steps)
+            print(f'Ввод записан в {self.recorder.path}: событий {self.recorder.count}, зерно {self.seed}')
         
         # Завершение работы pygame при выходе из цикла
         pygame.quit()
+    
+    # Один кадр главного цикла: физика догоняет прошедшее время фиксированными шагами,
+    # отрисовка интерполирует между двумя последними состояниями. Возвращает длительность кадра
+    def _run_frame(self, elapsed):
+        start = time.perf_counter()
+        self.handle_events()
+        for _ in range(self.sim_clock.advance(elapsed)):
+            self.update()
+        if self.sim_clock.should_draw():
+            self.draw(self.sim_clock.alpha, start)
+        self._record_work_time(time.perf_counter() - start)
+        return self.clock.tick(self.fps) / 1000
+    
+    # Передача времени работы кадра регулятору качества.
+    # При воспроизведении уровень меняется только по записи - время кадра на другой машине другое
+    def _record_work_time(self, work_time):
+        if self.replay is None and self.quality.record(work_time):
+            self._update_spawn_spec()
+            if self.recorder is not None:
+                self.recorder.quality(self.steps, self.quality.level)
+    
+    # Новые фейерверки создаются с параметрами текущего уровня качества
+    def _update_spawn_spec(self):
+        self.command_specs.clear()
+        self.spawn_spec = scale_spec(self.spec.firework, self.quality.settings) if self.quality.level > 0 else self.spec.firework
+    
+    # Тот же кадр с замером каждой фазы
+    def _run_profiled_frame(self, elapsed):
+        profiler = self.profiler
+        profiler.begin_frame()
+        profiler.measure('events', self.handle_events)
+        for _ in range(self.sim_clock.advance(elapsed)):
+            profiler.measure('spawn', self.update_spawn)
+            profiler.measure('physics', self.update_physics)
+            profiler.measure('trails', self.update_trails)
+        if self.sim_clock.should_draw():
+            alpha = self.sim_clock.alpha
+            if self.render_thread is not None:
+                # Кадр только собирается в снимок: рисует и выводит его поток отрисовки (без HUD - экран принадлежит потоку)
+                profiler.measure('render', lambda: self.publish_frame(alpha, profiler.frame_start))
+            else:
+                profiler.measure('render', lambda: self.render(alpha))
+                if profiler.hud_visible:
+                    hud_rect = profiler.draw_hud(self.screen)
+                    if self.dirty_renderer is not None:
+                        self.dirty_renderer.mark(hud_rect)
+                profiler.measure('present', self.present)
+        self._record_work_time(time.perf_counter() - profiler.frame_start)
+        start = time.perf_counter()
+        elapsed = self.clock.tick(self.fps) / 1000
+        profiler.record('tick', time.perf_counter() - start)
+        profiler.end_frame(self.fireworks)
+        return elapsed
+    
+    # Экспорт шоу: симуляция быстрее реального времени, кодирование и запись кадров в фоновых потоках.
+    # fmt - 'png' (папка с кадрами) или 'raw' (один файл RGB), size - выходное разрешение
+    # При ошибке записи экспорт прерывается, ошибка (FrameWriteError) сообщается и передается вызывающему
+    def export(self, output, frames, fmt='png', size=None, workers=2, queue_size=32, report_every=1.0):
+        if frames < 1:
+            raise ValueError(f'frames: ожидается хотя бы один кадр, получено {frames}')
+        writer = FrameWriter(output, fmt, workers, queue_size)
+        frame = self.screen
+        target = None
+        if size is not None and tuple(size) != self.screen.get_size():
+            frame = target = pygame.Surface(size) # Кадр масштабируется до выходного разрешения
+    
+        start = time.perf_counter()
+        last_report = start
+        try:
+            for index in range(frames):
+                self.update()
+                self.render()
+                if target is not None:
+                    pygame.transform.smoothscale(self.screen, size, target)
+                writer.submit(index, frame)
+    
+                now = time.perf_counter()
+                if now - last_report >= report_every:
+                    print(f'Кадр {index + 1}/{frames}: {(index + 1) / (now - start):.1f} кадр/с, '
+                          f'записано {writer.written}, в очереди {writer.pending()}')
+                    last_report = now
+        except FrameWriteError as error:
+            writer.abort()
+            print(f'Экспорт прерван: {error}')
+            raise
+    
+        simulated = time.perf_counter()
+        try:
+            writer.close()
+        except FrameWriteError as error:
+            print(f'Экспорт прерван: {error}')
+            raise
+        finished = time.perf_counter()
+    
+        width, height = frame.get_size()
+        result = {
+            'frames': frames,
+            'simulation_fps': frames / (simulated - start),
+            'total_fps': frames / (finished - start),
+            'queue_wait': writer.wait_time,
+            'bytes': writer.bytes_written,
+        }
+        print(f"Экспорт завершен: {frames} кадров {width}x{height}, симуляция и отрисовка {result['simulation_fps']:.1f} кадр/с, "
+              f"с записью {result['total_fps']:.1f} кадр/с, ожидание очереди {writer.wait_time:.2f} с, "
+              f"записано {writer.bytes_written / 2 ** 20:.1f} МБ")
+        if fmt == 'raw':
+            print(f'Воспроизведение: ffplay -f rawvideo -pixel_format rgb24 -video_size {width}x{height} '
+                  f'-framerate {self.sim_fps} {output}')
+        return result
+    
+    # Прогон заданного числа кадров без ограничения FPS (для замера производительности)
+    def run_headless(self, frames, render=True):
+        update_time = 0.0
+        draw_time = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            self.update()
+            update_time += time.perf_counter() - start
+            
+            if render:
+                start = time.perf_counter()
+                self.draw()
+                draw_time += time.perf_counter() - start
+        
+        # Кадров в секунду только для симуляции и для симуляции вместе с отрисовкой
+        result = {
+            'frames': frames,
+            'seed': self.seed,
+            'simulation_fps': frames / update_time if update_time > 0 else float('inf'),
+        }
+        if render:
+            total_time = update_time + draw_time
+            result['total_fps'] = frames / total_time if total_time > 0 else float('inf')
+            print(f"Без окна: {frames} кадров, симуляция {result['simulation_fps']:.1f} кадр/с, "
+                  f"симуляция и отрисовка {result['total_fps']:.1f} кадр/с")
+        else:
+            print(f"Без окна: {frames} кадров, симуляция {result['simulation_fps']:.1f} кадр/с")
+        return result
 
 if __name__ == "__main__":   
     game = Game()
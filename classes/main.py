@@ -1,41 +1,53 @@
-from game import Game
-import json
-
-# Загружает конфигурацию из JSON файла
-def load_config(name):
-    try:
-        # Попытка открыть и прочитать конфигурационный файл
-        with open(name, 'r', encoding='UTF-8') as f:
-            config = json.load(f)
-        print(f'Конфигурация загружена из {name}')
-        return config
-    except FileNotFoundError:
-        # Обработка случая, когда файл не найден
-        print(f'Файл {name} не найден. Используются значения по умолчанию.')
-        return None
-    except Exception as e:
-        # Обработка всех других ошибок (невалидный JSON, и т.д.)
-        print(f'Ошибка при чтении {name}: {e}')
-        print('Используются значения по умолчанию.')
-        return None
-
-# Загрузка конфигурации из файла
-config = load_config('config/config_base.json')
-
-# Создание экземпляра игры с параметрами из конфигурации или значениями по умолчанию
-if config:
-    # Если конфигурация загружена, используем значения из нее (учитываем, что может не оказаться ключа в json)
-    game = Game(width=config.get('width', 1000),
-                height=config.get('height', 800),
-                background=tuple(config.get('background', [0, 0, 0])),
-                firework_interval=config.get('firework_interval', 30),
-                diagonal=config.get('diagonal', False),
-                margin_x=config.get('margin_x', 20),
-                fps=config.get('fps', 60),
-                config=config)
-else:
-    # Если конфигурация не загружена, используем все значения по умолчанию
-    game = Game()
-
-# Запуск основного цикла игры
-game.run()
\ No newline at end of file
+import sys
+import argparse
+import importlib
+from .config_loader import add_config_arguments, load_config_from_args, find_presets
+
+# Инструменты, которые запускаются через ту же точку входа: python -m classes <команда> ...
+COMMANDS = {
+    'bench': ('benchmark', 'замер производительности на пресетах'),
+    'cues': ('commands', 'клиент сокета команд и замер его пропускной способности'),
+    'export': ('exporter', 'экспорт шоу в PNG или сырой RGB'),
+    'render': ('render_thread', 'отрисовка в потоке: кадры в секунду и задержка ввод-экран'),
+    'replay': ('replay', 'воспроизведение записи ввода без окна'),
+    'seek': ('ballistics', 'точность и скорость перемотки шоу'),
+    'shards': ('sharded', 'масштабирование симуляции по процессам'),
+}
+
+# Единая точка входа: без команды запускает игру в окне, с командой - передает ей остальные аргументы
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        module = importlib.import_module(f'.{COMMANDS[argv[0]][0]}', __package__)
+        return module.main(argv[1:])
+
+    commands = '\n'.join(f'  {name:<8} {description}' for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(prog='python -m classes', description='Фейерверки',
+                                     epilog=f'команды (python -m classes <команда> --help):\n{commands}',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_config_arguments(parser)
+    parser.add_argument('--list-presets', action='store_true', help='Показать доступные пресеты и выйти')
+    parser.add_argument('--seed', type=int, help='Зерно генератора случайных чисел')
+    # Запись ввода для воспроизведения (например, чтобы приложить к отчету о проблеме производительности)
+    parser.add_argument('--record', help='Записать ввод и зерно в файл')
+    parser.add_argument('--replay', help='Воспроизвести запись ввода из файла')
+    args = parser.parse_args(argv)
+
+    if args.list_presets:
+        for name, path in find_presets().items():
+            print(f'{name:<16} {path}')
+        return 0
+
+    # pygame загружается только когда игра действительно запускается (--help и --list-presets не ждут его)
+    from .game import Game
+
+    # Загрузка и проверка конфигурации (None - файл не найден или содержит ошибки, тогда значения по умолчанию)
+    spec = load_config_from_args(args)
+
+    # Создание экземпляра игры и запуск основного цикла
+    game = Game(spec, seed=args.seed, record=args.record, replay=args.replay)
+    game.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
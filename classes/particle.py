@@ -1,168 +1,270 @@
 import pygame
 import random
 import math
+from .sprite_cache import default_cache, line_max_radius, circle_bounds
+from .trail import TrailSchedule, reuse_points
+from .specs import ParticleSpec, PARTICLE_LINE_MAX_ALPHA
+from .ballistics import position, speed_y_at, fade_alpha, trail_period, trail_steps, trail_point
 
-# Класс - частица фейерверка
-class Particle:
+# Максимальная прозрачность точки следа
+LINE_MAX_ALPHA = PARTICLE_LINE_MAX_ALPHA
+
+# Параметры частиц по умолчанию
+DEFAULT_SPEC = ParticleSpec()
+
+# Класс - группа частиц одного взрыва.
+# У всех частиц взрыва общие параметры, время жизни, затухание, цвет и кадры добавления точек следа,
+# поэтому затухание и прозрачность точек следа вычисляются здесь один раз за кадр на всю группу
+class BurstGroup:
+    __slots__ = ('spec', 'gravity', 'x', 'y', 'color', 'age', 'lifetime', 'fading', 'fade_alpha', 'line_counter',
+                 'schedule', 'new_slot')
+    
     # Инициализация
-    def __init__(self, x, y, color, config=None):
-        # Инициализация конфигурации
-        if config is None:
-            config = {}
-        config_particle = config.get('particle', {})
-        
-        # Основные параметры частицы
-        self.x = x
+    # x, y - точка взрыва, spec - проверенные параметры частиц (ParticleSpec), lifetime - общее время жизни
+    # (None - разыгрывается из spec.lifetime_range)
+    def __init__(self, x, y, color, lifetime=None, spec=None):
+        # Параметры по умолчанию, если спецификация не передана
+        if spec is None:
+            spec = DEFAULT_SPEC
+        self.spec = spec
+        self.gravity = spec.gravity # Гравитация (читается каждой частицей на каждом шаге)
+        self.x = x # Точка взрыва - начальное положение всех частиц
         self.y = y
         self.color = color # Цвет наследуется от фейерверка
+        self.age = 0 # Шагов после взрыва
         
-        # Случайное направление движения по кругу
-        angle = random.uniform(0, 2 * math.pi) # Случайный угол от 0 до 360 градусов
-        speed_range = config_particle.get('speed_range', [1.5, 3])
-        speed = random.uniform(speed_range[0], speed_range[1])
-        
-        # Разложение скорости на компоненты по осям
-        self.speed_x = math.cos(angle) * speed
-        self.speed_y = math.sin(angle) * speed
-        
-        # Визуальные параметры
-        size_range = config_particle.get('size_range', [2, 4])
-        self.size = random.randint(size_range[0], size_range[1])
-        
-        # Время жизни частицы
-        lifetime_range = config_particle.get('lifetime_range', [200, 220])
-        self.lifetime = random.randint(lifetime_range[0], lifetime_range[1])
-        self.max_lifetime = self.lifetime  # Сохраняем максимальное время жизни
-        
-        # Параметры следа частицы
-        self.line = [] # Список точек следа (x, y, size, alpha)
-        self.max_line_length = config_particle.get('line_max_length', 15)
-        self.line_counter = 0 # Счетчик для создания точек
-        self.line_spacing = config_particle.get('line_spacing', 2)
-        self.line_fade_speed = config_particle.get('line_fade_speed', 6)
-        self.base_size = config_particle.get('base_size', 2.5)
-        
-        # Физические параметры
-        self.gravity = config_particle.get('gravity', 0.05)
+        # Время жизни всех частиц группы
+        if lifetime is None:
+            lifetime_range = spec.lifetime_range
+            lifetime = random.randint(lifetime_range[0], lifetime_range[1])
+        self.lifetime = lifetime
         
         # Параметры затухания
         self.fading = False # Флаг начала затухания
         self.fade_alpha = 255  # Начальная прозрачность
-        self.fade_start = config_particle.get('fade_start', 30) # Когда начинать затухание
-    
-    # Обновление состояния частицы на каждом кадре
-    def update(self):
-        # Сохраняем предыдущую позицию для создания плавного следа
-        old_x, old_y = self.x, self.y
         
-        # Обновление позиции с учетом гравитации
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.speed_y += self.gravity # Гравитация влияет только на вертикальную скорость
+        # Параметры следов частиц
+        self.line_counter = 0 # Счетчик для создания точек
+        # Общее кольцо следов (кадр добавления и альфа точек), вместимость посчитана в спецификации
+        self.schedule = TrailSchedule(spec.line_capacity, spec.line_fade_speed)
+        self.new_slot = None # Индекс точки следа, добавленной в этом кадре (None - точки нет)
+    
+    # Время жизни и затухание группы (перед движением частиц)
+    def update_physics(self):
         self.lifetime -= 1 # Уменьшаем время жизни
+        self.age += 1
         
         # Активация затухания, когда время жизни подходит к концу
-        if self.lifetime <= self.fade_start and not self.fading:
+        fade_start = self.spec.fade_start
+        if self.lifetime <= fade_start and not self.fading:
             self.fading = True
         
         # Обновление прозрачности при затухании
         if self.fading:
             # Прогресс затухания от 0 до 1
-            fade_progress = (self.fade_start - self.lifetime) / self.fade_start
+            fade_progress = (fade_start - self.lifetime) / fade_start
             self.fade_alpha = max(0, 255 - int(255 * fade_progress))
+    
+    # Общий шаг следов группы (перед следами частиц): новая точка и альфа всех точек
+    def update_trail(self):
+        self.new_slot = None
+        self.line_counter += 1
+        if self.line_counter >= self.spec.line_spacing:
+            # Прозрачность точек следа не превышает общую прозрачность частиц
+            self.new_slot = self.schedule.append(min(LINE_MAX_ALPHA, self.fade_alpha))
+            self.line_counter = 0
         
-        # Добавление новых точек следа
-        self._add_line_point(old_x, old_y)
+        # Учитываем общее затухание частиц
+        if self.fading:
+            self.schedule.alpha_cap = self.fade_alpha
         
-        # Обновление существующих точек следа
-        self._update_line()
+        # Старение точек и удаление полностью прозрачных
+        self.schedule.advance()
     
-    # Добавление новой точки в след частицы
-    def _add_line_point(self, old_x, old_y):
-        self.line_counter += 1
-        if self.line_counter >= self.line_spacing:
+    # Живы ли частицы группы
+    def is_alive(self):
+        return self.lifetime > 0
+    
+    # Состояние группы через age шагов после взрыва, вычисленное сразу (см. ballistics); частицы
+    # затем вызывают Particle.seek. points=False - без точек следа (следы рисует буфер послесвечения)
+    def seek(self, age, points=True):
+        spec = self.spec
+        self.lifetime += self.age - age
+        self.age = age
+        
+        # Затухание начинается только после первого шага
+        self.fading = age > 0 and self.lifetime <= spec.fade_start
+        self.fade_alpha = fade_alpha(self.lifetime, spec.fade_start) if self.fading else 255
+        if not points:
+            return
+        
+        # Точки следа, которые еще лежат в кольце: кадр добавления на шаге m - m - 1 (до старения на этом шаге)
+        launch_lifetime = self.lifetime + age
+        steps = trail_steps(age, spec.line_spacing, self.schedule.capacity)
+        self.schedule.rebuild([(m - 1, min(LINE_MAX_ALPHA, fade_alpha(launch_lifetime - m, spec.fade_start))) for m in steps],
+                              age, self.fade_alpha)
+        self.line_counter = age % trail_period(spec.line_spacing)
+        self.new_slot = len(steps) - 1 if steps and steps[-1] == age else None
+    
+    # Шаги после взрыва, на которых добавлены точки кольца следа после seek (по порядку индексов кольца)
+    def trail_steps(self):
+        return trail_steps(self.age, self.spec.line_spacing, self.schedule.capacity)
+
+# Класс - частица фейерверка.
+# Без __dict__ и только со своим состоянием (положение, скорость, размер, координаты точек следа):
+# время жизни, затухание, цвет и прозрачность следа общие для взрыва и лежат в группе BurstGroup
+class Particle:
+    __slots__ = ('group', 'x', 'y', 'old_x', 'old_y', 'speed_x', 'speed_y', 'speed_y0', 'size', 'line', 'retired')
+    
+    # Инициализация
+    def __init__(self, group, state=None):
+        self.reset(group, state)
+    
+    # Заполнение параметров частицы (вызывается и при повторном использовании объекта из пула)
+    # group - группа взрыва (BurstGroup), частица начинает движение из ее точки взрыва,
+    # state - готовое начальное состояние (speed_x, speed_y, size) из generate_burst
+    # (None - частица разыгрывает его сама через random)
+    def reset(self, group, state=None):
+        self.group = group
+        spec = group.spec
+        
+        # Основные параметры частицы
+        self.x = group.x
+        self.y = group.y
+        self.old_x, self.old_y = self.x, self.y # Позиция до последнего перемещения
+        self.retired = False # Удалена досрочно за пределами области видимости
+        
+        if state is not None:
+            # Состояние уже разыграно пакетом для всего взрыва
+            self.speed_x, self.speed_y, self.size = state
+        else:
+            # Случайное направление движения по кругу
+            angle = random.uniform(0, 2 * math.pi) # Случайный угол от 0 до 360 градусов
+            speed_range = spec.speed_range
+            speed = random.uniform(speed_range[0], speed_range[1])
+            
+            # Разложение скорости на компоненты по осям
+            self.speed_x = math.cos(angle) * speed
+            self.speed_y = math.sin(angle) * speed
+            
+            # Визуальные параметры
+            size_range = spec.size_range
+            self.size = random.randint(size_range[0], size_range[1])
+        self.speed_y0 = self.speed_y # Начальная скорость для вычисления положения через любое число шагов
+        
+        # Координаты точек следа частицы (прозрачность точек - в общем кольце группы)
+        self.line = reuse_points(getattr(self, 'line', None), group.schedule)
+    
+    # Движение частицы (после BurstGroup.update_physics)
+    def update_physics(self):
+        # Сохраняем предыдущую позицию для создания плавного следа
+        self.old_x, self.old_y = self.x, self.y
+        
+        # Обновление позиции с учетом гравитации
+        self.x += self.speed_x
+        self.y += self.speed_y
+        self.speed_y += self.group.gravity # Гравитация влияет только на вертикальную скорость
+    
+    # Точка следа после движения (после BurstGroup.update_trail, который решает, нужна ли точка в этом кадре)
+    def update_trail(self):
+        slot = self.group.new_slot
+        if slot is not None:
             # Длина следа зависит от текущей скорости
             speed_factor = min(1.0, (abs(self.speed_x) + abs(self.speed_y)) / 8)  # Чем быстрее движется частица, тем длиннее след
-            current_line_length = self.max_line_length * (0.5 + 0.5 * speed_factor)
+            current_line_length = self.group.spec.line_max_length * (0.5 + 0.5 * speed_factor)
             
             # Используем среднюю точку между старым и новым положением для плавности
-            mid_x = (old_x + self.x) / 2
-            mid_y = (old_y + self.y) / 2
-            
-            # Прозрачность точек следа не превышает общую прозрачность частицы
-            line_alpha = min(220, self.fade_alpha)
-            self.line.append((mid_x, mid_y, current_line_length, line_alpha))
-            self.line_counter = 0
+            self.line.put(slot, (self.old_x + self.x) / 2, (self.old_y + self.y) / 2, current_line_length)
     
-    # Обновление точек следа (уменьшение альфа-канала)
-    def _update_line(self):
-        # Уменьшение альфа-канала всех точек с учетом общего затухания
-        for i in range(len(self.line)):
-            x, y, size, alpha = self.line[i]
-            # Уменьшаем прозрачность, но не ниже 0
-            new_alpha = max(0, alpha - self.line_fade_speed)
-            # Учитываем общее затухание частицы
-            if self.fading:
-                new_alpha = min(new_alpha, self.fade_alpha)
-            self.line[i] = (x, y, size, new_alpha)
-        
-        # Удаление полностью прозрачных точек
-        self.line = [(x, y, size, alpha) for x, y, size, alpha in self.line if alpha > 0]
+    # Положение и точки следа через group.age шагов после взрыва (после BurstGroup.seek)
+    def seek(self, points=True):
+        group = self.group
+        age = group.age
+        gravity = group.gravity
+        self.x, self.y = position(group.x, group.y, self.speed_x, self.speed_y0, gravity, age)
+        self.old_x, self.old_y = position(group.x, group.y, self.speed_x, self.speed_y0, gravity, max(0, age - 1))
+        self.speed_y = speed_y_at(self.speed_y0, gravity, age)
+        if points:
+            # После BurstGroup.seek точки кольца группы лежат с начала, от старых к новым
+            line_max_length = group.spec.line_max_length
+            for index, step in enumerate(group.trail_steps()):
+                self.line.put(index, *trail_point(group.x, group.y, self.speed_x, self.speed_y0, gravity, step, line_max_length))
     
     # Проверка на время жизни частицы
     def is_alive(self):
-        return self.lifetime > 0
+        return not self.retired and self.group.lifetime > 0
+    
+    # Досрочное удаление частицы, которая уже никогда не вернется в область видимости viewport
+    # и не оставила там видимого следа. Возвращает True, если частица удалена
+    def retire_outside(self, viewport):
+        if not self.is_alive() or not viewport.escaped(self.x, self.y, self.speed_x, self.speed_y, self.group.gravity):
+            return False
+        for x, y, size, alpha in self.line: # Только видимые точки
+            if viewport.contains(x, y):
+                return False # След еще виден
+        self.retired = True
+        return True
     
     # Отрисовка частицы и ее следа
-    def draw(self, screen):
+    # alpha - доля шага физики для интерполяции между предыдущим и текущим положением,
+    # trail_step - рисуется каждая trail_step-я точка следа
+    def draw(self, screen, alpha=1.0, trail_step=1):
         # Отрисовка следа
-        self._draw_line(screen)
+        self._draw_line(screen, trail_step)
         
         # Отрисовка самой частицы (круг)
+        self.draw_head(screen, alpha)
+    
+    # Отрисовка только частицы, без следа
+    def draw_head(self, screen, alpha=1.0):
         if self.is_alive():
-            # Используем fade_alpha для плавного затухания
-            alpha = self.fade_alpha
-            
-            # Создание поверхности с альфа-каналом для частицы
-            particle_surface = pygame.Surface((self.size * 2 + 2, self.size * 2 + 2), pygame.SRCALPHA)
-            particle_color = (*self.color, alpha) # Цвет с учетом прозрачности
-            
-            # Отрисовка круглой частицы
-            pygame.draw.circle(particle_surface, particle_color, (self.size + 1, self.size + 1), self.size)
-            
-            # Размещение частицы на экране
-            screen.blit(particle_surface, (self.x - self.size - 1, self.y - self.size - 1))
+            x = self.old_x + (self.x - self.old_x) * alpha
+            y = self.old_y + (self.y - self.old_y) * alpha
+            # Используем fade_alpha для плавного затухания, готовый спрайт берем из кэша
+            default_cache.draw_circle(screen, self.group.color, self.size, self.group.fade_alpha, x, y)
     
     # Отрисовка следа
-    def _draw_line(self, screen):
-        for x, y, size, alpha in self.line:
-            if alpha > 0: # Рисуем только видимые точки
-                # Расчет размера точки следа
-                circle_size = max(0.5, size / 8)
-                
-                # Создание поверхности с альфа-каналом
-                max_surface_size = int(self.base_size * 2 + 2)
-                circle_surface = pygame.Surface((max_surface_size, max_surface_size), pygame.SRCALPHA)
-                circle_color = (*self.color, int(alpha)) # Цвет с учетом прозрачности
-                
-                # Отрисовка круглой точки следа
-                center_x, center_y = max_surface_size // 2, max_surface_size // 2
-                pygame.draw.circle(circle_surface, circle_color, (center_x, center_y), circle_size)
-                
-                # Размещение точки следа на экране
-                screen.blit(circle_surface, (x - center_x, y - center_y))
+    def _draw_line(self, screen, trail_step=1):
+        # Радиус ограничен размером поверхности следа int(base_size * 2 + 2)
+        max_radius = line_max_radius(self.group.spec.base_size)
+        color = self.group.color
+        for x, y, size, alpha in self.line.points(trail_step): # Только видимые точки
+            # Расчет размера точки следа
+            circle_size = min(max(0.5, size / 8), max_radius)
+            default_cache.draw_circle(screen, color, circle_size, alpha, x, y)
+    
+    # Прямоугольник экрана, который частица закрашивает при отрисовке (None - рисовать нечего)
+    def bounds(self):
+        box = self.line.bounds()
+        if self.is_alive():
+            head = (min(self.x, self.old_x), min(self.y, self.old_y), max(self.x, self.old_x), max(self.y, self.old_y))
+            box = head if box is None else (min(box[0], head[0]), min(box[1], head[1]), max(box[2], head[2]), max(box[3], head[3]))
+        if box is None:
+            return None
+        return circle_bounds(*box, max(self.size, line_max_radius(self.group.spec.base_size)))
+    
+    # Добавление кругов следа и частицы в список кругов кадра (PointBuffer)
+    def collect_points(self, points, alpha=1.0, trail_step=1):
+        max_radius = line_max_radius(self.group.spec.base_size)
+        color = self.group.color
+        for x, y, size, line_alpha in self.line.points(trail_step):
+            points.add(x, y, min(max(0.5, size / 8), max_radius), color, line_alpha)
+        if self.is_alive():
+            x = self.old_x + (self.x - self.old_x) * alpha
+            y = self.old_y + (self.y - self.old_y) * alpha
+            points.add(x, y, self.size, color, self.group.fade_alpha)
 
 if __name__ == "__main__":
     # Инициализация pygame
-    pygame.init()
+    pygame.display.init()
     width, height = 800, 600
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption('Частица')
     background = (0, 0, 0)
     clock = pygame.time.Clock()
 
-    # Список всех частиц
-    particles = []
+    # Список групп частиц: (группа, частицы)
+    bursts = []
 
     # Основной цикл
     running = True
@@ -179,7 +281,7 @@ if __name__ == "__main__":
                     running = False
         
         # Создание групп частиц для тестирования
-        if len(particles) == 0 or random.random() < 0.05:
+        if len(bursts) == 0 or random.random() < 0.05:
             group_size = random.randint(8, 20)
             group_color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
             base_x = random.randint(0, width)
@@ -187,20 +289,21 @@ if __name__ == "__main__":
             group_lifetime = random.randint(60, 100)
             
             # Создание группы частиц с одинаковым временем жизни
-            for _ in range(group_size):
-                particle = Particle(base_x, base_y, group_color)
-                particle.lifetime = group_lifetime
-                particle.max_lifetime = group_lifetime
-                particles.append(particle)
-        
-        # Обновление и отрисовка всех частиц
-        for particle in particles[:]: # Испольуем копию списка, чтобы безопасно удалять частицы
-            particle.update()
-            particle.draw(screen)
+            group = BurstGroup(base_x, base_y, group_color, group_lifetime)
+            bursts.append((group, [Particle(group) for _ in range(group_size)]))
+        
+        # Обновление и отрисовка всех групп: сначала общий шаг группы, потом частицы
+        for group, particles in bursts[:]: # Испольуем копию списка, чтобы безопасно удалять группы
+            group.update_physics()
+            group.update_trail()
+            for particle in particles:
+                particle.update_physics()
+                particle.update_trail()
+                particle.draw(screen)
             
-            # Удаление "мертвых" частиц
-            if not particle.is_alive():
-                particles.remove(particle)
+            # Удаление "мертвых" групп
+            if not group.is_alive():
+                bursts.remove((group, particles))
         
         # Обновление дисплея
         pygame.display.flip()
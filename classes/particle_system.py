@@ -0,0 +1,367 @@
+import math
+import numpy as np
+from .sprite_cache import default_cache, line_max_radius, circle_bounds
+from .particle import LINE_MAX_ALPHA, DEFAULT_SPEC
+from .ballistics import position, speed_y_at, fade_alphas, trail_period, trail_steps, trail_point
+
+# Генератор случайных чисел для взрывов, если игра не передала свой (с зерном)
+default_rng = np.random.default_rng()
+
+# Начальное состояние всех частиц взрыва за несколько векторных вызовов генератора rng.
+# Возвращает массивы скоростей по осям, размеров и времени жизни (lifetime - одно время для всех частиц,
+# тогда случайное время жизни не разыгрывается)
+def generate_burst(rng, spec, count, lifetime=None):
+    angle = rng.uniform(0, 2 * math.pi, count) # Случайное направление движения по кругу
+    speed = rng.uniform(spec.speed_range[0], spec.speed_range[1], count)
+    speed_x = np.cos(angle) * speed
+    speed_y = np.sin(angle) * speed
+    sizes = rng.integers(spec.size_range[0], spec.size_range[1], count, endpoint=True, dtype=np.int32)
+    if lifetime is not None:
+        lifetimes = np.full(count, lifetime, dtype=np.int32)
+    else:
+        lifetimes = rng.integers(spec.lifetime_range[0], spec.lifetime_range[1], count, endpoint=True, dtype=np.int32)
+    return speed_x, speed_y, sizes, lifetimes
+
+# Класс - система частиц одного взрыва.
+# Хранит состояние всех частиц в виде непрерывных массивов NumPy (структура массивов)
+# и обновляет их одним векторизованным шагом с той же физикой, что и Particle.update
+class ParticleSystem:
+    # Инициализация
+    # spec - проверенные параметры частиц (ParticleSpec), rng - генератор NumPy (numpy.random.Generator)
+    def __init__(self, x, y, color, count, lifetime=None, spec=None, rng=None):
+        # Параметры по умолчанию, если спецификация не передана
+        if spec is None:
+            spec = DEFAULT_SPEC
+
+        # Параметры, общие для всех частиц системы (как в Particle)
+        self.max_line_length = spec.line_max_length
+        self.line_spacing = spec.line_spacing
+        self.line_fade_speed = spec.line_fade_speed
+        self.base_size = spec.base_size
+        self.gravity = spec.gravity
+        self.fade_start = spec.fade_start
+        self.line_counter = 0 # Счетчик для создания точек следа (общий, т.к. частицы рождаются одновременно)
+
+        # Случайные параметры частиц - одним пакетом из генератора
+        if rng is None:
+            rng = default_rng
+        speed_x, speed_y, sizes, lifetimes = generate_burst(rng, spec, count, lifetime)
+
+        # Положение и скорость
+        self.x = np.full(count, x, dtype=np.float64)
+        self.y = np.full(count, y, dtype=np.float64)
+        self.speed_x = speed_x
+        self.speed_y = speed_y
+        self.prev_x = self.x.copy() # Положение до последнего шага (для следа и интерполяции)
+        self.prev_y = self.y.copy()
+
+        # Начальное состояние для вычисления положения через любое число шагов (seek)
+        self.origin_x = x
+        self.origin_y = y
+        self.speed_y0 = speed_y.copy()
+        self.age = 0 # Шагов после взрыва
+
+        # Визуальные параметры
+        self.size = sizes
+        self.color = np.empty((count, 3), dtype=np.uint8)
+        self.color[:] = color
+
+        # Время жизни (Firework.explode задает одинаковое время для всего взрыва)
+        self.lifetime = lifetimes
+
+        # Параметры затухания
+        self.fading = np.zeros(count, dtype=bool)
+        self.fade_alpha = np.full(count, 255, dtype=np.int32)
+
+        # След хранится кольцом из фиксированного числа "срезов": один срез - одна точка следа каждой частицы.
+        # Точки следа только рисуются, поэтому хранятся компактно: float32 для координат и размера,
+        # int16 для начальной прозрачности (самая большая часть памяти системы - это именно следы).
+        # Текущая прозрачность считается от начальной и шага добавления тем же выражением, что в TrailSchedule,
+        # и хранится в float64: дробная line_fade_speed не округляется, и значения совпадают со способом 'objects'
+        self.line_capacity = spec.line_capacity
+        self.line_x = np.zeros((self.line_capacity, count), dtype=np.float32)
+        self.line_y = np.zeros((self.line_capacity, count), dtype=np.float32)
+        self.line_size = np.zeros((self.line_capacity, count), dtype=np.float32)
+        self.line_alpha0 = np.zeros((self.line_capacity, count), dtype=np.int16)
+        self.line_alpha = np.zeros((self.line_capacity, count), dtype=np.float64)
+        self.line_added = np.zeros(self.line_capacity, dtype=np.int64) # Шаг после взрыва, на котором добавлен срез
+        self.line_head = 0 # Индекс среза для следующей точки
+        self.line_count = 0 # Количество занятых срезов
+
+    # Количество живых частиц
+    def __len__(self):
+        return len(self.x)
+
+    # Обновление всех частиц одним векторизованным шагом
+    def update(self):
+        self.update_physics()
+        self.update_trails()
+
+    # Движение и затухание всех частиц
+    def update_physics(self):
+        if len(self.x) == 0:
+            return
+
+        # Текущее положение становится предыдущим: массивы меняются местами без выделения памяти
+        self.prev_x, self.x = self.x, self.prev_x
+        self.prev_y, self.y = self.y, self.prev_y
+
+        # Обновление позиции с учетом гравитации
+        np.add(self.prev_x, self.speed_x, out=self.x)
+        np.add(self.prev_y, self.speed_y, out=self.y)
+        self.speed_y += self.gravity
+        self.lifetime -= 1
+        self.age += 1
+
+        # Активация и расчет затухания
+        self.fading |= self.lifetime <= self.fade_start
+        if self.fading.any():
+            fade_progress = (self.fade_start - self.lifetime) / self.fade_start
+            fade_alpha = np.maximum(0, 255 - (255 * fade_progress).astype(np.int32))
+            np.copyto(self.fade_alpha, fade_alpha, where=self.fading)
+
+    # Обслуживание следов и удаление "мертвых" частиц после движения
+    # points=False - следы рисует буфер послесвечения, точки следа не нужны
+    def update_trails(self, points=True):
+        if len(self.x) == 0:
+            return
+
+        # Добавление новых точек следа и обновление существующих
+        if points:
+            self._add_line_point()
+            self._update_line()
+
+        # Удаление "мертвых" частиц
+        alive = self.lifetime > 0
+        if not alive.all():
+            self._compact(alive)
+
+    # Досрочное удаление частиц, которые уже никогда не вернутся в область видимости viewport
+    # и не оставили там видимого следа. Возвращает количество удаленных частиц
+    def retire_outside(self, viewport):
+        if len(self.x) == 0:
+            return 0
+        x, y = self.x, self.y
+        gone = ((x < viewport.left) & (self.speed_x <= 0)) | ((x > viewport.right) & (self.speed_x >= 0))
+        if self.gravity >= 0:
+            gone |= (y > viewport.bottom) & (self.speed_y >= 0)
+        if self.gravity <= 0:
+            gone |= (y < viewport.top) & (self.speed_y <= 0)
+        gone &= self.lifetime > 0
+        if not gone.any():
+            return 0
+
+        # Частица со следом, еще видимым на экране, живет до исчезновения следа
+        slots = self._line_slots()
+        if slots:
+            line_x = self.line_x[slots]
+            line_y = self.line_y[slots]
+            inside = ((self.line_alpha[slots] > 0) & (line_x >= viewport.left) & (line_x <= viewport.right)
+                      & (line_y >= viewport.top) & (line_y <= viewport.bottom))
+            gone &= ~inside.any(axis=0)
+
+        self.lifetime[gone] = 0 # Удаляются при сжатии массивов в update_trails
+        return int(gone.sum())
+
+    # Добавление нового среза в след
+    def _add_line_point(self):
+        self.line_counter += 1
+        if self.line_counter >= self.line_spacing:
+            # Длина следа зависит от текущей скорости
+            speed_factor = np.minimum(1.0, (np.abs(self.speed_x) + np.abs(self.speed_y)) / 8)
+            head = self.line_head
+            # Средняя точка между старым и новым положением для плавности
+            np.add(self.prev_x, self.x, out=self.line_x[head])
+            np.add(self.prev_y, self.y, out=self.line_y[head])
+            self.line_x[head] *= 0.5
+            self.line_y[head] *= 0.5
+            self.line_size[head] = self.max_line_length * (0.5 + 0.5 * speed_factor)
+            np.minimum(self.fade_alpha, LINE_MAX_ALPHA, out=self.line_alpha0[head])
+            self.line_added[head] = self.age
+            self.line_head = (head + 1) % self.line_capacity
+            self.line_count = min(self.line_count + 1, self.line_capacity)
+            self.line_counter = 0
+
+    # Обновление срезов следа (уменьшение альфа-канала): за каждый шаг с добавления - line_fade_speed,
+    # но не больше текущей прозрачности затухающей частицы
+    def _update_line(self):
+        if self.line_count == 0:
+            return
+        # Считается все кольцо на месте: незанятые срезы никто не читает, а выборка занятых обходится дороже
+        alpha = self._line_alpha(self.line_alpha0, self.line_added, self.age, out=self.line_alpha)
+
+        # Удаление самых старых срезов, в которых не осталось видимых точек
+        while self.line_count > 0:
+            oldest = (self.line_head - self.line_count) % self.line_capacity
+            if alpha[oldest].any():
+                break
+            self.line_count -= 1
+
+    # Удаление мертвых частиц из всех массивов
+    def _compact(self, alive):
+        self.x = self.x[alive]
+        self.y = self.y[alive]
+        self.prev_x = self.prev_x[alive]
+        self.prev_y = self.prev_y[alive]
+        self.speed_x = self.speed_x[alive]
+        self.speed_y = self.speed_y[alive]
+        self.speed_y0 = self.speed_y0[alive]
+        self.size = self.size[alive]
+        self.color = self.color[alive]
+        self.lifetime = self.lifetime[alive]
+        self.fading = self.fading[alive]
+        self.fade_alpha = self.fade_alpha[alive]
+        self.line_x = self.line_x[:, alive]
+        self.line_y = self.line_y[:, alive]
+        self.line_size = self.line_size[:, alive]
+        self.line_alpha0 = self.line_alpha0[:, alive]
+        self.line_alpha = self.line_alpha[:, alive]
+
+    # Состояние через age шагов после взрыва, вычисленное сразу по начальному состоянию (см. ballistics):
+    # промежуточные шаги не выполняются, следы восстанавливаются только из последних срезов.
+    # points=False - без точек следа (следы рисует буфер послесвечения)
+    def seek(self, age, points=True):
+        lifetime0 = self.lifetime + self.age # Время жизни при взрыве (у живых частиц)
+        self.age = age
+        if len(self.x) == 0:
+            return
+        gravity = self.gravity
+        self.x, self.y = position(self.origin_x, self.origin_y, self.speed_x, self.speed_y0, gravity, age)
+        self.prev_x, self.prev_y = position(self.origin_x, self.origin_y, self.speed_x, self.speed_y0, gravity, max(0, age - 1))
+        self.speed_y = speed_y_at(self.speed_y0, gravity, age)
+
+        # Затухание начинается только после первого шага
+        self.lifetime = lifetime0 - age
+        if age > 0:
+            self.fading = self.lifetime <= self.fade_start
+            self.fade_alpha = fade_alphas(self.lifetime, self.fade_start).astype(np.int32)
+        else:
+            self.fading[:] = False
+            self.fade_alpha[:] = 255
+
+        alive = self.lifetime > 0
+        if not alive.all():
+            self._compact(alive)
+            lifetime0 = lifetime0[alive]
+        if not points or len(self.x) == 0:
+            return
+
+        # Срезы следа, которые еще лежат в кольце: добавлены на шагах steps после взрыва
+        steps = trail_steps(age, self.line_spacing, self.line_capacity)
+        self.line_counter = age % trail_period(self.line_spacing)
+        self.line_head = len(steps) % self.line_capacity
+        self.line_count = len(steps)
+        if not steps:
+            return
+        added = np.array(steps)[:, None]
+        line = trail_point(self.origin_x, self.origin_y, self.speed_x, self.speed_y0, gravity, added, self.max_line_length)
+        count = len(steps)
+        self.line_x[:count], self.line_y[:count], self.line_size[:count] = line
+        self.line_added[:count] = steps
+        self.line_alpha0[:count] = np.minimum(fade_alphas(lifetime0 - added, self.fade_start), LINE_MAX_ALPHA)
+        self.line_alpha[:count] = self._line_alpha(self.line_alpha0[:count], self.line_added[:count], age)
+
+        # Удаление самых старых срезов, в которых не осталось видимых точек
+        while self.line_count > 0 and not self.line_alpha[(self.line_head - self.line_count) % self.line_capacity].any():
+            self.line_count -= 1
+
+    # Прозрачность срезов с начальной прозрачностью alpha0, добавленных на шагах added, на шаге age:
+    # начальная за вычетом line_fade_speed за каждый шаг с добавления (как TrailSchedule.advance),
+    # у затухающих частиц - не больше их текущей прозрачности
+    def _line_alpha(self, alpha0, added, age, out=None):
+        alpha = np.empty(alpha0.shape) if out is None else out
+        np.multiply((age - added + 1)[:, None], self.line_fade_speed, out=alpha)
+        np.subtract(alpha0, alpha, out=alpha)
+        if self.fading.any():
+            np.minimum(alpha, np.where(self.fading, self.fade_alpha, 255), out=alpha)
+        return np.maximum(alpha, 0, out=alpha)
+
+    # Индексы занятых срезов следа от старых к новым
+    def _line_slots(self):
+        start = self.line_head - self.line_count
+        return [(start + i) % self.line_capacity for i in range(self.line_count)]
+
+    # Видимые точки следа всех частиц от старых срезов к новым: массив N x 4 (x, y, размер, альфа)
+    def trail_points(self):
+        slots = self._line_slots()
+        trail = np.stack([self.line_x[slots], self.line_y[slots], self.line_size[slots], self.line_alpha[slots]], axis=-1)
+        return trail[trail[..., 3] > 0]
+
+    # Положение частиц между предыдущим и текущим шагом (alpha - доля шага)
+    def head_positions(self, alpha=1.0):
+        if alpha < 1.0:
+            return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
+        return self.x, self.y
+
+    # Срезы следа для отрисовки: каждый trail_step-й, самый новый всегда включается
+    def visible_slots(self, trail_step=1):
+        slots = self._line_slots()
+        return slots[(len(slots) - 1) % trail_step::trail_step]
+
+    # Отрисовка всех частиц и их следов
+    # alpha - доля шага физики для интерполяции между предыдущим и текущим положением,
+    # trail_step - рисуется каждый trail_step-й срез следа, viewport - область видимости (None - рисовать все)
+    def draw(self, screen, alpha=1.0, trail_step=1, viewport=None):
+        if len(self.x) == 0:
+            return
+
+        # Отрисовка следов (радиус ограничен размером поверхности следа, как в Particle).
+        # Все срезы следа уходят одним пакетом в порядке от старых к новым
+        slots = self.visible_slots(trail_step)
+        if slots:
+            line_alpha = self.line_alpha[slots]
+            radius = np.minimum(np.maximum(0.5, self.line_size[slots] / 8), line_max_radius(self.base_size))
+            colors = np.broadcast_to(self.color, line_alpha.shape + (3,)).reshape(-1, 3)
+            line = [colors, radius.ravel(), line_alpha.ravel(), self.line_x[slots].ravel(), self.line_y[slots].ravel()]
+            if viewport is not None:
+                inside = self._inside(viewport, line[3], line[4])
+                line = [values[inside] for values in line]
+            default_cache.draw_circles(screen, *line)
+
+        # Отрисовка самих частиц (кругов)
+        self.draw_heads(screen, alpha, viewport)
+
+    # Отрисовка только частиц, без следов
+    def draw_heads(self, screen, alpha=1.0, viewport=None):
+        if len(self.x) == 0:
+            return
+        xs, ys = self.head_positions(alpha)
+        if viewport is None:
+            default_cache.draw_circles(screen, self.color, self.size, self.fade_alpha, xs, ys)
+            return
+        inside = self._inside(viewport, xs, ys)
+        viewport.cull(len(xs) - int(inside.sum()))
+        default_cache.draw_circles(screen, self.color[inside], self.size[inside], self.fade_alpha[inside], xs[inside], ys[inside])
+
+    # Маска точек внутри области видимости
+    def _inside(self, viewport, xs, ys):
+        return (xs >= viewport.left) & (xs <= viewport.right) & (ys >= viewport.top) & (ys <= viewport.bottom)
+
+    # Прямоугольник экрана, который закрашивают частицы и их следы (None - рисовать нечего)
+    def bounds(self):
+        if len(self.x) == 0:
+            return None
+        slots = self._line_slots()
+        xs = [self.x, self.prev_x, self.line_x[slots].ravel()]
+        ys = [self.y, self.prev_y, self.line_y[slots].ravel()]
+        left = min(float(values.min()) for values in xs if len(values))
+        right = max(float(values.max()) for values in xs if len(values))
+        top = min(float(values.min()) for values in ys if len(values))
+        bottom = max(float(values.max()) for values in ys if len(values))
+        return circle_bounds(left, top, right, bottom, max(int(self.size.max()), line_max_radius(self.base_size)))
+
+    # Добавление кругов следов и частиц в список кругов кадра (PointBuffer) векторными операциями
+    def collect_points(self, points, alpha=1.0, trail_step=1):
+        if len(self.x) == 0:
+            return
+        # Все видимые срезы следа одним блоком: массивы (срезы x частицы) -> плоский список видимых точек
+        slots = self.visible_slots(trail_step)
+        line_alpha = self.line_alpha[slots]
+        visible = line_alpha > 0
+        if visible.any():
+            radius = np.minimum(np.maximum(0.5, self.line_size[slots][visible] / 8), line_max_radius(self.base_size))
+            colors = np.broadcast_to(self.color, line_alpha.shape + (3,))[visible]
+            points.extend(self.line_x[slots][visible], self.line_y[slots][visible], radius, colors, line_alpha[visible])
+
+        xs, ys = self.head_positions(alpha)
+        points.extend(xs, ys, self.size, self.color, self.fade_alpha)
@@ -0,0 +1,36 @@
+import pygame
+
+# Множитель затухания за шаг, при котором след живет примерно столько же шагов,
+# сколько точечный след с той же скоростью затухания (до яркости threshold из max_alpha)
+def fade_factor(line_fade_speed, max_alpha, threshold=8):
+    if line_fade_speed <= 0:
+        return 1.0 # След не исчезает
+    steps = max_alpha / line_fade_speed
+    return (threshold / max_alpha) ** (1 / steps)
+
+# Класс - буфер послесвечения для режима следов 'persistence'.
+# Вместо хранения точек следа каждый шаг весь буфер затухает на постоянный множитель,
+# и на него рисуются только сами частицы - следы получаются из затухания прошлых шагов
+class PersistenceBuffer:
+    # Инициализация
+    def __init__(self, size, factor):
+        self.surface = pygame.Surface(size)
+        self.surface.fill((0, 0, 0))
+        self.multiplier = min(255, int(factor * 255)) # Множитель в единицах BLEND_RGB_MULT
+
+    # Шаг: затухание буфера и отпечатки текущих положений всех фейерверков и частиц
+    def stamp(self, fireworks):
+        m = self.multiplier
+        self.surface.fill((m, m, m), special_flags=pygame.BLEND_RGB_MULT)
+        # Умножение округляет вверх и не гасит самые темные пиксели - добиваем их вычитанием
+        self.surface.fill((1, 1, 1), special_flags=pygame.BLEND_RGB_SUB)
+        for firework in fireworks:
+            firework.draw_heads(self.surface)
+
+    # Вывод буфера поверх фона
+    def draw(self, screen):
+        screen.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+    # Очистка буфера
+    def clear(self):
+        self.surface.fill((0, 0, 0))
@@ -0,0 +1,54 @@
+# Класс - пул объектов со списком свободных экземпляров.
+# Объекты класса cls должны уметь переинициализироваться методом reset(...) с аргументами конструктора
+class ObjectPool:
+    # Инициализация
+    def __init__(self, cls, name, size=0):
+        self.cls = cls
+        self.name = name # Имя пула для статистики
+        self.free = [] # Свободные объекты, готовые к повторному использованию
+
+        # Статистика заполненности пула
+        self.in_use = 0 # Сколько объектов выдано сейчас
+        self.high_water = 0 # Максимум одновременно выданных объектов
+        self.created = 0 # Сколько объектов создано всего
+        self.reused = 0 # Сколько раз объект взят из списка свободных
+
+        self.reserve(size)
+
+    # Заранее создать объекты, чтобы в пуле было не меньше size свободных экземпляров.
+    # Объекты создаются без вызова конструктора и заполняются только при выдаче
+    def reserve(self, size):
+        while len(self.free) < size:
+            self.free.append(self.cls.__new__(self.cls))
+            self.created += 1
+
+    # Выдача объекта, заполненного переданными параметрами
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return obj
+
+    # Возврат объекта в пул
+    def release(self, obj):
+        self.in_use -= 1
+        self.free.append(obj)
+
+    # Статистика пула
+    def stats(self):
+        return {
+            'name': self.name,
+            'in_use': self.in_use,
+            'free': len(self.free),
+            'high_water': self.high_water,
+            'created': self.created,
+            'reused': self.reused,
+        }
@@ -0,0 +1,165 @@
+import csv
+import time
+import pygame
+from collections import deque
+
+# Класс - профилировщик фаз кадра.
+# Game вызывает его только когда профилирование включено, поэтому в выключенном состоянии
+# главный цикл платит лишь одну проверку на None за кадр
+class FrameProfiler:
+    # Инициализация
+    def __init__(self, history=300, histogram_bucket_ms=2, histogram_buckets=20, trace_limit=100000, csv_path=None):
+        self.hooks = [] # Подключаемые обработчики: hook(phase, seconds)
+        self.history = history # Сколько последних кадров хранить для скользящей статистики
+        self.histogram_bucket_ms = histogram_bucket_ms # Ширина столбца гистограммы времени кадра
+        self.histogram_buckets = histogram_buckets # Количество столбцов (последний - "и больше")
+        self.csv_path = csv_path # Куда сохранить трассу при выходе (None - не сохранять)
+
+        # Скользящие окна измерений
+        self.frame_times = deque(maxlen=history)
+        self.phase_times = {}
+        self.explode_times = deque(maxlen=history) # Время отдельных вызовов Firework.explode
+
+        # Живые счетчики сцены на последнем кадре
+        self.fireworks = 0
+        self.particles = 0
+        self.trail_points = 0
+
+        # Построчная трасса для CSV (ограничена, чтобы долгое шоу не съело память)
+        self.trace = deque(maxlen=trace_limit)
+        self.frame = 0
+        self.current = {} # Фазы текущего кадра
+        self.frame_start = 0.0
+        self.frame_explode_time = 0.0
+
+        # Экранная панель
+        self.hud_visible = False
+        self.font = None
+
+    # Подключение обработчика, который получает время каждой фазы
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    # Начало кадра
+    def begin_frame(self):
+        self.current = {}
+        self.frame_explode_time = 0.0
+        self.frame_start = time.perf_counter()
+
+    # Выполнение фазы кадра с замером времени
+    def measure(self, phase, step):
+        start = time.perf_counter()
+        step()
+        self.record(phase, time.perf_counter() - start)
+
+    # Запись времени фазы
+    def record(self, phase, seconds):
+        self.current[phase] = self.current.get(phase, 0.0) + seconds
+        times = self.phase_times.get(phase)
+        if times is None:
+            times = self.phase_times[phase] = deque(maxlen=self.history)
+        times.append(seconds)
+        for hook in self.hooks:
+            hook(phase, seconds)
+
+    # Замер отдельного взрыва (вызывается из Firework)
+    def record_explode(self, seconds):
+        self.explode_times.append(seconds)
+        self.frame_explode_time += seconds
+        for hook in self.hooks:
+            hook('explode', seconds)
+
+    # Конец кадра: время кадра и счетчики сцены
+    def end_frame(self, fireworks):
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame_times.append(frame_time)
+        for hook in self.hooks:
+            hook('frame', frame_time)
+
+        self.fireworks = len(fireworks)
+        self.particles = sum(firework.particle_count() for firework in fireworks)
+        self.trail_points = sum(firework.trail_point_count() for firework in fireworks)
+
+        row = {'frame': self.frame, 'frame_ms': frame_time * 1000}
+        for phase, seconds in self.current.items():
+            row[phase + '_ms'] = seconds * 1000
+        row['explode_ms'] = self.frame_explode_time * 1000
+        row['fireworks'] = self.fireworks
+        row['particles'] = self.particles
+        row['trail_points'] = self.trail_points
+        self.trace.append(row)
+        self.frame += 1
+
+    # Гистограмма времени кадра по скользящему окну
+    def histogram(self):
+        counts = [0] * self.histogram_buckets
+        for frame_time in self.frame_times:
+            bucket = min(int(frame_time * 1000 / self.histogram_bucket_ms), self.histogram_buckets - 1)
+            counts[bucket] += 1
+        return counts
+
+    # Среднее время фазы в миллисекундах по скользящему окну
+    def mean_ms(self, phase):
+        times = self.frame_times if phase == 'frame' else self.phase_times.get(phase)
+        if not times:
+            return 0.0
+        return sum(times) / len(times) * 1000
+
+    # Перцентиль времени кадра в миллисекундах
+    def frame_percentile_ms(self, percent):
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index] * 1000
+
+    # Показать или скрыть экранную панель
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+
+    # Отрисовка панели со статистикой поверх кадра, возвращает занятый панелью прямоугольник
+    def draw_hud(self, screen):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+
+        lines = [
+            f'кадр {self.mean_ms("frame"):.2f} мс  p95 {self.frame_percentile_ms(95):.2f}  p99 {self.frame_percentile_ms(99):.2f}',
+            '  '.join(f'{phase} {self.mean_ms(phase):.2f}' for phase in self.phase_times),
+            f'взрыв max {max(self.explode_times, default=0) * 1000:.2f} мс',
+            f'фейерверков {self.fireworks}  частиц {self.particles}  точек следа {self.trail_points}',
+        ]
+        y = 5
+        width = 0
+        for line in lines:
+            text = self.font.render(line, True, (255, 255, 255), (0, 0, 0))
+            screen.blit(text, (5, y))
+            y += text.get_height() + 2
+            width = max(width, text.get_width())
+
+        # Гистограмма времени кадра: один столбец - histogram_bucket_ms миллисекунд
+        counts = self.histogram()
+        peak = max(counts) or 1
+        bar_width = 6
+        bar_height = 40
+        for i, count in enumerate(counts):
+            height = int(bar_height * count / peak)
+            pygame.draw.rect(screen, (0, 200, 0), (5 + i * (bar_width + 1), y + bar_height - height, bar_width, height))
+        width = max(width, len(counts) * (bar_width + 1))
+        return pygame.Rect(5, 5, width, y + bar_height - 5)
+
+    # Сохранение трассы кадров в CSV
+    def dump_csv(self, path=None):
+        path = path or self.csv_path
+        if path is None or not self.trace:
+            return
+        fieldnames = []
+        for row in self.trace:
+            for key in row:
+                if key not in fieldnames:
+                    fieldnames.append(key)
+        with open(path, 'w', newline='', encoding='UTF-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval=0)
+            writer.writeheader()
+            writer.writerows(self.trace)
+        print(f'Трасса кадров сохранена в {path}')
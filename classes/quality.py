@@ -0,0 +1,80 @@
+import dataclasses
+
+# Уровни качества по умолчанию: 0 - полное качество, дальше - все дешевле
+DEFAULT_LEVELS = [
+    {'particles': 1.0, 'line_length': 1.0, 'line_spacing': 1.0, 'trail_draw_step': 1},
+    {'particles': 0.75, 'line_length': 0.8, 'line_spacing': 1.5, 'trail_draw_step': 1},
+    {'particles': 0.5, 'line_length': 0.6, 'line_spacing': 2.0, 'trail_draw_step': 2},
+    {'particles': 0.35, 'line_length': 0.5, 'line_spacing': 3.0, 'trail_draw_step': 3},
+]
+
+# Параметры новых фейерверков (FireworkSpec) с учетом уровня качества
+def scale_spec(spec, level):
+    # Короче и реже точки следа частиц
+    particle = dataclasses.replace(spec.particle,
+                                   line_max_length=spec.particle.line_max_length * level['line_length'],
+                                   line_spacing=spec.particle.line_spacing * level['line_spacing'])
+    # Меньше частиц во взрыве, короче и реже точки следа самого фейерверка
+    return dataclasses.replace(spec,
+                               particles_count_range=tuple(max(1, int(count * level['particles'])) for count in spec.particles_count_range),
+                               line_max_length=spec.line_max_length * level['line_length'],
+                               line_spacing=spec.line_spacing * level['line_spacing'],
+                               particle=particle)
+
+# Класс - регулятор качества, удерживающий время кадра в бюджете целевого FPS.
+# При нехватке времени ступенчато снижает качество, при появлении запаса - возвращает
+class QualityGovernor:
+    # Инициализация (параметры берутся из раздела 'quality' конфигурации)
+    def __init__(self, fps, enabled=True, levels=None, degrade_above=0.9, restore_below=0.6, window=30, cooldown=60):
+        self.enabled = enabled
+        self.budget = 1 / fps # Бюджет времени на кадр
+        # Недостающие в уровне параметры берутся из полного качества
+        self.levels = [dict(DEFAULT_LEVELS[0], **level) for level in levels] if levels else DEFAULT_LEVELS
+        self.degrade_above = degrade_above # Доля бюджета, выше которой качество снижается
+        self.restore_below = restore_below # Доля бюджета, ниже которой качество восстанавливается
+        self.window = window # Сколько кадров усреднять перед решением
+        self.cooldown = cooldown # Сколько кадров ждать после смены уровня
+
+        self.level = 0 # Текущий уровень (индекс в levels)
+        self.frame_times = []
+        self.cooldown_left = 0
+
+    # Параметры текущего уровня
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    # Учет времени работы кадра (без ожидания clock.tick), возвращает True при смене уровня
+    def record(self, work_time):
+        if not self.enabled:
+            return False
+        if self.cooldown_left > 0:
+            self.cooldown_left -= 1
+            return False
+
+        self.frame_times.append(work_time)
+        if len(self.frame_times) < self.window:
+            return False
+
+        load = sum(self.frame_times) / len(self.frame_times) / self.budget
+        self.frame_times.clear()
+        if load > self.degrade_above and self.level < len(self.levels) - 1:
+            return self._set_level(self.level + 1, load)
+        if load < self.restore_below and self.level > 0:
+            return self._set_level(self.level - 1, load)
+        return False
+
+    # Установка уровня извне (воспроизведение записи ввода)
+    def set_level(self, level):
+        self.level = min(max(level, 0), len(self.levels) - 1)
+        self.frame_times.clear()
+        self.cooldown_left = self.cooldown
+
+    # Смена уровня с записью в журнал
+    def _set_level(self, level, load):
+        direction = 'снижено' if level > self.level else 'восстановлено'
+        print(f'Качество {direction}: уровень {self.level} -> {level} '
+              f'(кадр занимает {load:.0%} бюджета {self.budget * 1000:.1f} мс)')
+        self.level = level
+        self.cooldown_left = self.cooldown
+        return True
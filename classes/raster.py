@@ -0,0 +1,94 @@
+import numpy as np
+import pygame
+
+# Класс - программный растеризатор кругов на NumPy.
+# Все круги кадра (PointBuffer) раскладываются в пиксели заранее посчитанными масками по радиусу и
+# накапливаются в кадре одним проходом np.bincount на канал, готовый кадр выводится на экран одним blit.
+# Стоимость кадра зависит от числа закрашенных пикселей, а не от числа вызовов blit из Python.
+# Наложение не зависит от порядка кругов: доля фона - произведение (1 - альфа) всех кругов пикселя,
+# остальное делит средний цвет кругов с весами по альфе. Для одного круга на пикселе это обычное
+# наложение blit (с точностью до округления), для перекрытий одного цвета - тоже; разные цвета смешиваются
+class Rasterizer:
+    # Инициализация
+    # size - размер кадра, background - цвет фона
+    def __init__(self, size, background):
+        self.width, self.height = size
+        self.background = np.array(background, dtype=np.float64)
+        # Кадр RGB в раскладке строк экрана (высота x ширина x 3): из него без копирования получается
+        # поверхность pygame.image.frombuffer, а ее вывод в разы быстрее pygame.surfarray.blit_array
+        self.frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.frame[:] = background
+        self.surface = pygame.image.frombuffer(self.frame, size, 'RGB')
+        self.touched = np.zeros(0, dtype=np.int64) # Пиксели, закрашенные в прошлом кадре (возвращаются к фону)
+        self.kernels = {} # Радиус -> смещения пикселей круга (dx, dy) от левого верхнего угла спрайта
+
+        # Статистика
+        self.frames = 0
+        self.circles = 0 # Всего нарисовано кругов
+        self.pixels = 0 # Всего закрашено пикселей (с повторами)
+
+    # Маска круга радиуса radius - те же пиксели, что у спрайта кэша (pygame.draw.circle в квадрате 2r + 2)
+    def kernel(self, radius):
+        kernel = self.kernels.get(radius)
+        if kernel is None:
+            sprite = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (255, 255, 255, 255), (radius + 1, radius + 1), radius)
+            dx, dy = np.nonzero(pygame.surfarray.array_alpha(sprite))
+            kernel = self.kernels[radius] = (dx.astype(np.int64), dy.astype(np.int64))
+        return kernel
+
+    # Индексы пикселей (y * ширина + x) и номера кругов для всех видимых пикселей всех кругов
+    def _splat(self, xs, ys, radii):
+        pixels = []
+        owners = []
+        for radius in np.unique(radii).tolist():
+            members = np.flatnonzero(radii == radius)
+            dx, dy = self.kernel(radius)
+            # Позиция спрайта как у blit: левый верхний угол (центр - (r + 1)), дробная часть отбрасывается
+            left = (xs[members] - (radius + 1)).astype(np.int64)
+            top = (ys[members] - (radius + 1)).astype(np.int64)
+            px = (left[:, None] + dx).ravel()
+            py = (top[:, None] + dy).ravel()
+            owner = np.repeat(members, len(dx))
+            inside = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            pixels.append(py[inside] * self.width + px[inside])
+            owners.append(owner[inside])
+        return np.concatenate(pixels), np.concatenate(owners)
+
+    # Растеризация списка кругов (массив POINT_DTYPE) в кадр и вывод кадра на screen
+    def render(self, screen, points):
+        flat = self.frame.reshape(-1, 3)
+        flat[self.touched] = self.background # Весь кадр заново не заливается - только следы прошлого
+        self.touched = self.touched[:0]
+        radii = points['radius'].astype(np.int64)
+        visible = (radii >= 1) & (points['a'] > 0)
+        if visible.any():
+            points = points[visible]
+            pixels, owners = self._splat(points['x'], points['y'], radii[visible])
+            self.frames += 1
+            self.circles += len(points)
+            self.pixels += len(pixels)
+
+            # Закрашенные пиксели и номер каждого среди них - накопление идет только по ним, а не по всему кадру
+            touched, slots = np.unique(pixels, return_inverse=True)
+            count = len(touched)
+            weight = (points['a'].astype(np.float64) / 255)[owners]
+            # Доля фона: произведение (1 - альфа) через сумму логарифмов (непрозрачный круг - доля 0)
+            transmit = np.exp(np.bincount(slots, np.log(np.maximum(1 - weight, 1e-6)), count))
+            total = np.bincount(slots, weight, count)
+            for channel, name in enumerate('rgb'):
+                color = np.bincount(slots, weight * points[name][owners], count) / total
+                value = self.background[channel] * transmit + color * (1 - transmit)
+                flat[touched, channel] = np.minimum(255, value + 0.5).astype(np.uint8)
+            self.touched = touched
+        # Один вывод всего кадра
+        screen.blit(self.surface, (0, 0))
+
+    # Статистика
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'kernels': len(self.kernels),
+            'mean_circles': self.circles / self.frames if self.frames else 0.0,
+            'mean_pixels': self.pixels / self.frames if self.frames else 0.0,
+        }
@@ -0,0 +1,178 @@
+import sys
+import time
+import argparse
+import threading
+import pygame
+from .scene_points import PointBuffer, blit_points
+
+# Класс - снимок кадра: неизменяемый после публикации список кругов (PointBuffer) и время его создания
+class Snapshot:
+    __slots__ = ('points', 'step', 'stamp')
+
+    def __init__(self, capacity):
+        self.points = PointBuffer(capacity)
+        self.step = 0 # Шаг симуляции, который показывает снимок
+        self.stamp = 0.0 # Момент опроса ввода в кадре снимка (time.perf_counter) - для задержки до экрана
+
+# Класс - поток отрисовки.
+# Симуляция собирает кадр в свободный снимок и публикует его, поток рисует самый свежий опубликованный снимок
+# и выводит его на дисплей, пока главный поток считает следующий шаг (blits, fill и flip отпускают GIL).
+# Снимков 2 (двойная буферизация) или 3 (тройная): пока один рисуется, симуляция пишет в другой;
+# если поток не успел забрать снимок, новый заменяет его, и симуляция никогда не ждет отрисовку
+class RenderThread:
+    # Инициализация (параметры берутся из раздела 'render_thread' конфигурации)
+    # present - вывод готового кадра на дисплей (pygame.display.flip),
+    # rasterizer - программный растеризатор кадра (Rasterizer, None - спрайты через Surface.blits)
+    def __init__(self, screen, background, present, buffers=3, capacity=4096, rasterizer=None):
+        if buffers not in (2, 3):
+            raise ValueError(f'buffers: ожидается 2 или 3 снимка, получено {buffers}')
+        self.screen = screen
+        self.background = background
+        self.present = present
+        self.rasterizer = rasterizer
+
+        self.snapshots = [Snapshot(capacity) for _ in range(buffers)]
+        self.free = list(self.snapshots) # Снимки, в которые можно писать
+        self.latest = None # Опубликованный, но еще не взятый на отрисовку снимок
+        self.condition = threading.Condition()
+        self.stopping = False
+
+        # Статистика
+        self.frames = 0 # Выведено кадров
+        self.dropped = 0 # Снимков заменено новыми до отрисовки
+        self.latencies = [] # Задержка от опроса ввода до вывода на дисплей, с
+        self.draw_time = 0.0 # Время отрисовки и вывода, с
+
+        self.thread = threading.Thread(target=self._run, name='firework-render', daemon=True)
+
+    # Запуск потока
+    def start(self):
+        self.thread.start()
+        return self
+
+    # Снимок для заполнения следующего кадра (очищенный)
+    def acquire(self):
+        with self.condition:
+            if self.free:
+                snapshot = self.free.pop()
+            else:
+                # Все снимки заняты: неотрисованный заменяется новым
+                snapshot = self.latest
+                self.latest = None
+                self.dropped += 1
+        snapshot.points.clear()
+        return snapshot
+
+    # Публикация заполненного снимка (после этого симуляция его не меняет)
+    def publish(self, snapshot):
+        with self.condition:
+            if self.latest is not None:
+                self.free.append(self.latest)
+                self.dropped += 1
+            self.latest = snapshot
+            self.condition.notify()
+
+    # Главный цикл потока: ожидание снимка, отрисовка, вывод, возврат снимка в свободные
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.latest is None and not self.stopping:
+                    self.condition.wait()
+                # При остановке последний опубликованный снимок еще выводится, затем поток завершается
+                if self.latest is None:
+                    return
+                snapshot = self.latest
+                self.latest = None
+
+            start = time.perf_counter()
+            if self.rasterizer is not None:
+                self.rasterizer.render(self.screen, snapshot.points.view())
+            else:
+                self.screen.fill(self.background)
+                blit_points(self.screen, snapshot.points.view())
+            self.present()
+            finished = time.perf_counter()
+            self.draw_time += finished - start
+            self.latencies.append(finished - snapshot.stamp)
+            self.frames += 1
+
+            with self.condition:
+                self.free.append(snapshot)
+
+    # Остановка потока (неотрисованный снимок выводится перед завершением)
+    def close(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    # Статистика
+    def stats(self):
+        return {'frames': self.frames, 'dropped': self.dropped, **latency_stats(self.latencies)}
+
+# Средняя и процентили задержки в миллисекундах (None, если не выведено ни одного кадра)
+def latency_stats(latencies):
+    if not latencies:
+        return {'latency_mean_ms': None, 'latency_p50_ms': None, 'latency_p95_ms': None}
+    ordered = sorted(latencies)
+    return {
+        'latency_mean_ms': sum(ordered) / len(ordered) * 1000,
+        'latency_p50_ms': ordered[len(ordered) // 2] * 1000,
+        'latency_p95_ms': ordered[int(len(ordered) * 0.95)] * 1000,
+    }
+
+# Текст задержки для вывода ('нет данных', если кадров не было)
+def latency_text(stats, digits=2):
+    if stats['latency_mean_ms'] is None:
+        return 'нет данных'
+    return (f"среднее {stats['latency_mean_ms']:.{digits}f} мс, p50 {stats['latency_p50_ms']:.{digits}f} мс, "
+            f"p95 {stats['latency_p95_ms']:.{digits}f} мс")
+
+# Замер пропускной способности и задержки от ввода до экрана в обоих режимах: отрисовка в главном потоке
+# и в потоке отрисовки. Каждый кадр - опрос ввода, один шаг физики, отрисовка и вывод (с ограничением FPS, как в игре)
+def main(argv=None):
+    from .game import Game
+    from .config_loader import add_config_arguments, load_config_from_args
+
+    parser = argparse.ArgumentParser(description='Отрисовка в главном потоке и в потоке отрисовки: кадры в секунду и задержка')
+    add_config_arguments(parser)
+    parser.add_argument('--frames', type=int, default=600, help='Количество кадров в каждом режиме')
+    parser.add_argument('--warmup', type=int, default=300, help='Шагов до начала замера (шоу успевает заполниться)')
+    parser.add_argument('--buffers', type=int, default=3, choices=(2, 3), help='Снимков в потоке отрисовки')
+    parser.add_argument('--fps', type=float, help='Ограничение частоты кадров (по умолчанию fps конфигурации, 0 - без ограничения)')
+    parser.add_argument('--seed', type=int, default=1, help='Зерно генератора случайных чисел')
+    args = parser.parse_args(argv)
+
+    spec = load_config_from_args(args)
+    fps = spec.fps if args.fps is None else args.fps
+    for threaded in (False, True):
+        sections = dict(spec.sections, render_thread={'enabled': threaded, 'buffers': args.buffers})
+        game = Game(spec.replace(sections=sections), seed=args.seed)
+        game.seek(args.warmup)
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            frame_start = time.perf_counter()
+            game.handle_events()
+            game.update()
+            game.draw(1.0, frame_start)
+            if game.render_thread is None:
+                latencies.append(time.perf_counter() - frame_start)
+            if fps:
+                game.clock.tick(fps) # Ожидание отпускает GIL - в это время работает поток отрисовки
+        elapsed = time.perf_counter() - start
+        if game.render_thread is not None:
+            game.render_thread.close()
+            stats = game.render_thread.stats()
+        else:
+            stats = {'frames': args.frames, 'dropped': 0, **latency_stats(latencies)}
+        name = 'поток отрисовки' if threaded else 'главный поток'
+        print(f'{name:<16} шагов {args.frames / elapsed:6.1f}/с, на экране {stats["frames"] / elapsed:6.1f} кадр/с '
+              f'(заменено снимков {stats["dropped"]}), задержка ввод-экран: {latency_text(stats)}')
+        pygame.quit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+
+# Заголовок файла записи: сигнатура, версия формата, зерно генераторов случайных чисел
+MAGIC = b'FWRP'
+VERSION = 2 # Версия 2 добавила запуски по командам; записи версии 1 читаются как прежде
+HEADER = struct.Struct('<4sBq')
+
+# Запись события: номер шага симуляции, вид события, кнопка мыши, два параметра
+# (клик - координаты x, y; клавиша - код клавиши; качество - номер уровня; команда - длина ее JSON,
+# который записан сразу за событием)
+EVENT = struct.Struct('<IBBii')
+
+# Виды событий
+CLICK = 0 # Нажатие кнопки мыши
+KEY = 1 # Нажатие клавиши
+QUALITY = 2 # Смена уровня качества регулятором (зависит от времени кадра, поэтому тоже записывается)
+END = 3 # Конец записи (количество шагов всего прогона)
+COMMAND = 4 # Запуск по команде внешнего пульта (точка, пресет и цвет - в JSON после события)
+
+# Новое зерно для записи, если игра запущена без него
+def new_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+# Класс - запись ввода в компактный двоичный файл.
+# Каждое событие привязано к номеру шага симуляции, перед которым оно выполняется
+class InputRecorder:
+    # Инициализация: файл создается сразу, события дописываются по мере поступления
+    def __init__(self, path, seed):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+        self.count = 0 # Количество записанных событий
+
+    # Нажатие кнопки мыши в точке pos
+    def click(self, step, button, pos):
+        self._write(step, CLICK, button, pos[0], pos[1])
+
+    # Нажатие клавиши
+    def key(self, step, key):
+        self._write(step, KEY, 0, key, 0)
+
+    # Смена уровня качества
+    def quality(self, step, level):
+        self._write(step, QUALITY, 0, level, 0)
+
+    # Запуск фейерверка по команде: точка, имя пресета (None - параметры игры) и цвет (None - случайный)
+    def command(self, step, x, y, preset=None, color=None):
+        payload = json.dumps({'x': x, 'y': y, 'preset': preset, 'color': color}).encode()
+        self._write(step, COMMAND, 0, len(payload), 0, payload)
+
+    # Запись одного события (сразу на диск: запись падения игры тоже должна сохраниться)
+    def _write(self, step, kind, button, a, b, payload=b''):
+        self.file.write(EVENT.pack(step, kind, button, a, b) + payload)
+        self.file.flush()
+        self.count += 1
+
+    # Завершение записи: отметка конца прогона на шаге step
+    def close(self, step):
+        if self.file.closed:
+            return
+        self._write(step, END, 0, 0, 0)
+        self.file.close()
+
+# Класс - воспроизведение записи ввода.
+# Выдает события по номеру шага симуляции в том же порядке, в котором они были записаны
+class InputReplay:
+    # Инициализация: чтение и проверка всего файла
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f'{path}: файл слишком короткий для записи ввода')
+        magic, version, self.seed = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: не является записью ввода')
+        if version not in (1, VERSION):
+            raise ValueError(f'{path}: неподдерживаемая версия записи {version}, ожидается {VERSION}')
+
+        self.path = path
+        # Команда заменяет в событии длину JSON на сами параметры команды (словарь)
+        self.events = []
+        offset = HEADER.size
+        while offset < len(data):
+            if len(data) - offset < EVENT.size:
+                raise ValueError(f'{path}: запись обрезана')
+            event = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            if event[1] == COMMAND:
+                size = event[3]
+                if len(data) - offset < size:
+                    raise ValueError(f'{path}: запись обрезана')
+                event = (event[0], COMMAND, 0, json.loads(data[offset:offset + size]), 0)
+                offset += size
+            self.events.append(event)
+        self.index = 0 # Следующее невыданное событие
+        # Длина прогона в шагах (без отметки конца - шаг последнего события)
+        self.length = self.events[-1][0] if self.events else 0
+
+    # События, которые нужно выполнить перед шагом step
+    def due(self, step):
+        events = self.events
+        start = self.index
+        while self.index < len(events) and events[self.index][0] <= step:
+            self.index += 1
+        return events[start:self.index]
+
+    # Все ли события выданы
+    def finished(self):
+        return self.index >= len(self.events)
+
+    # Возврат к началу записи (перемотка шоу назад)
+    def rewind(self):
+        self.index = 0
+
+# Воспроизведение записи без окна с замером времени каждого шага (для поиска пиков времени кадра)
+def main(argv=None):
+    from .game import Game
+    from .config_loader import add_config_arguments, load_config_from_args
+
+    parser = argparse.ArgumentParser(description='Воспроизведение записи ввода без окна с замером времени кадров')
+    parser.add_argument('replay', help='Файл записи ввода')
+    add_config_arguments(parser)
+    parser.add_argument('--frames', type=int, help='Количество кадров (по умолчанию - длина записи)')
+    parser.add_argument('--worst', type=int, default=5, help='Сколько самых медленных кадров показать')
+    args = parser.parse_args(argv)
+
+    spec = load_config_from_args(args)
+    game = Game.from_config(spec, headless=True, replay=args.replay)
+    frames = args.frames if args.frames is not None else game.replay.length
+    print(f'Воспроизведение {args.replay}: зерно {game.seed}, событий {len(game.replay.events)}, кадров {frames}')
+
+    frame_times = []
+    for _ in range(frames):
+        if not game.running:
+            break
+        start = time.perf_counter()
+        game.update()
+        game.render()
+        frame_times.append(time.perf_counter() - start)
+
+    if frame_times:
+        ordered = sorted(frame_times)
+        print(f'Кадров {len(frame_times)}: среднее {sum(frame_times) / len(frame_times) * 1000:.2f} мс, '
+              f'p95 {ordered[int(len(ordered) * 0.95)] * 1000:.2f} мс, максимум {ordered[-1] * 1000:.2f} мс')
+        worst = sorted(range(len(frame_times)), key=frame_times.__getitem__, reverse=True)[:args.worst]
+        print('Самые медленные кадры: ' + ', '.join(f'{index} ({frame_times[index] * 1000:.2f} мс)' for index in worst))
+    # Контрольная сумма последнего кадра: одинаковая у всех прогонов одной записи
+    print(f'Контрольная сумма кадра: {zlib.crc32(game.screen.get_buffer().raw):08x}')
+    if game.shards is not None:
+        game.shards.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
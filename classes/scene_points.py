@@ -0,0 +1,87 @@
+import numpy as np
+from .sprite_cache import default_cache
+
+# Компактное описание одного круга сцены: центр, радиус, цвет и прозрачность
+POINT_DTYPE = np.dtype([
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('radius', '<f4'),
+    ('r', 'u1'),
+    ('g', 'u1'),
+    ('b', 'u1'),
+    ('a', 'u1'),
+])
+
+# Класс - список кругов кадра в одном массиве NumPy.
+# Может расти сам или работать поверх готового массива фиксированного размера (например, в общей памяти)
+class PointBuffer:
+    # Инициализация
+    def __init__(self, capacity=4096, array=None):
+        if array is None:
+            array = np.zeros(capacity, dtype=POINT_DTYPE)
+            self.growable = True
+        else:
+            self.growable = False # Чужой массив расширять нельзя - лишние точки отбрасываются
+        self.points = array
+        self.count = 0
+        self.dropped = 0 # Сколько точек не поместилось
+
+    # Очистка перед новым кадром
+    def clear(self):
+        self.count = 0
+        self.dropped = 0
+
+    # Резервирование места под n точек, возвращает сколько реально поместится
+    def _reserve(self, n):
+        free = len(self.points) - self.count
+        if n <= free:
+            return n
+        if self.growable:
+            capacity = max(len(self.points) * 2, self.count + n)
+            points = np.zeros(capacity, dtype=POINT_DTYPE)
+            points[:self.count] = self.points[:self.count]
+            self.points = points
+            return n
+        self.dropped += n - free
+        return free
+
+    # Добавление одного круга
+    def add(self, x, y, radius, color, alpha):
+        if self._reserve(1) == 0:
+            return
+        self.points[self.count] = (x, y, radius, color[0], color[1], color[2], alpha)
+        self.count += 1
+
+    # Добавление массива кругов (color - один цвет или массив N x 3)
+    def extend(self, xs, ys, radii, colors, alphas):
+        n = self._reserve(len(xs))
+        if n == 0:
+            return
+        colors = np.asarray(colors)
+        if colors.ndim == 2:
+            colors = colors[:n]
+        block = self.points[self.count:self.count + n]
+        block['x'] = xs[:n]
+        block['y'] = ys[:n]
+        block['radius'] = radii[:n] if np.ndim(radii) else radii
+        block['r'] = colors[..., 0]
+        block['g'] = colors[..., 1]
+        block['b'] = colors[..., 2]
+        block['a'] = alphas[:n]
+        self.count += n
+
+    # Заполненная часть буфера (без копирования)
+    def view(self):
+        return self.points[:self.count]
+
+# Отрисовка списка кругов через кэш спрайтов
+def draw_points(screen, points, cache=default_cache):
+    for x, y, radius, r, g, b, alpha in points.tolist():
+        cache.draw_circle(screen, (r, g, b), radius, alpha, x, y)
+
+# Отрисовка списка кругов одним вызовом Surface.blits (тот же результат, что draw_points)
+def blit_points(screen, points, cache=default_cache):
+    if len(points) == 0:
+        return
+    colors = np.stack([points['r'], points['g'], points['b']], axis=1)
+    cache.draw_circles(screen, colors, points['radius'], points['a'], points['x'], points['y'])
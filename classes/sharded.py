@@ -0,0 +1,253 @@
+import sys
+import time
+import random
+import argparse
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from .firework import Firework
+from .particle import Particle
+from .pool import ObjectPool
+from .scene_points import POINT_DTYPE, PointBuffer, draw_points
+
+# Заголовок буфера в общей памяти: количество точек, частиц, фейерверков и номер шага
+HEADER_FIELDS = 4
+HEADER_SIZE = HEADER_FIELDS * np.dtype(np.int64).itemsize
+
+# Массивы заголовка и точек поверх блока общей памяти (без копирования)
+def _map_block(block, capacity):
+    header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=block.buf)
+    points = np.ndarray(capacity, dtype=POINT_DTYPE, buffer=block.buf, offset=HEADER_SIZE)
+    return header, points
+
+# Главная функция рабочего процесса: своя часть фейерверков, результат шага - круги кадра в общей памяти.
+# Буферы чередуются по четности шага: пока процесс пишет в один, главный процесс рисует из другого.
+# Зерно каждого фейерверка выбирает главный процесс, поэтому разыгранное не зависит от числа процессов
+def _worker_main(conn, block_names, capacity, particle_backend):
+    blocks = [shared_memory.SharedMemory(name=name) for name in block_names]
+    headers = []
+    buffers = []
+    for block in blocks:
+        header, points = _map_block(block, capacity)
+        headers.append(header)
+        buffers.append(PointBuffer(array=points))
+
+    firework_pool = ObjectPool(Firework, 'fireworks')
+    particle_pool = ObjectPool(Particle, 'particles')
+    fireworks = []
+    specs = {} # Номер -> параметры фейерверков (FireworkSpec); каждые параметры пересылаются один раз
+    while True:
+        message = conn.recv()
+        if message[0] == 'stop':
+            break
+        if message[0] == 'spec': # Новые параметры фейерверков (пресет команды или уровень качества)
+            specs[message[1]] = message[2]
+            continue
+
+        _, frame, launches, trail_step = message
+        for x, y, diagonal, color, seed, spec_id in launches:
+            firework = firework_pool.acquire(x, y, diagonal, specs[spec_id], particle_backend, particle_pool, random.Random(seed))
+            firework.rng = np.random.default_rng(seed)
+            if color is not None:
+                firework.color = color
+            fireworks.append(firework)
+
+        # Тот же шаг, что Game.update_physics + Game.update_trails
+        for firework in fireworks:
+            firework.update_physics()
+        alive_count = 0
+        for firework in fireworks:
+            firework.update_trails()
+            if firework.is_alive():
+                fireworks[alive_count] = firework
+                alive_count += 1
+            else:
+                firework_pool.release(firework)
+        del fireworks[alive_count:]
+
+        # Круги кадра - в буфер общей памяти текущей четности
+        parity = frame % 2
+        buffer = buffers[parity]
+        buffer.clear()
+        for firework in fireworks:
+            firework.collect_points(buffer, 1.0, trail_step)
+        particles = sum(firework.particle_count() for firework in fireworks)
+        headers[parity][:] = (buffer.count, particles, len(fireworks), frame)
+        conn.send((len(fireworks), particles, buffer.count, buffer.dropped))
+
+    # Представления NumPy держат память блока - освобождаем их до закрытия
+    headers = buffers = header = points = buffer = None
+    for block in blocks:
+        block.close()
+    conn.close()
+
+# Класс - один рабочий процесс и его два буфера кругов в общей памяти
+class Shard:
+    # Инициализация
+    def __init__(self, index, capacity, particle_backend):
+        self.index = index
+        self.capacity = capacity # Сколько кругов помещается в буфер одного шага
+        size = HEADER_SIZE + capacity * POINT_DTYPE.itemsize
+        self.blocks = [shared_memory.SharedMemory(create=True, size=size) for _ in range(2)]
+        self.views = [_map_block(block, capacity) for block in self.blocks]
+
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=_worker_main, name=f'firework-shard-{index}', daemon=True,
+                                  args=(child_conn, [block.name for block in self.blocks], capacity, particle_backend))
+        self.process.start()
+        child_conn.close()
+
+        # Нагрузка по последнему ответу процесса и новые фейерверки, еще не отправленные ему
+        self.fireworks = 0
+        self.particles = 0
+        self.points = 0
+        self.dropped = 0
+        self.launches = []
+        self.waiting = False # Отправлен шаг, ответ на который еще не получен
+
+    # Оценка нагрузки для выбора процесса под новый фейерверк
+    def load(self):
+        return self.fireworks + len(self.launches)
+
+    # Отправка шага
+    def send_step(self, frame, trail_step):
+        self.conn.send(('step', frame, self.launches, trail_step))
+        self.launches = []
+        self.waiting = True
+
+    # Ожидание результата шага
+    def receive(self):
+        if self.waiting:
+            self.fireworks, self.particles, self.points, self.dropped = self.conn.recv()
+            self.waiting = False
+
+    # Круги готового шага с заданной четностью (представление общей памяти, без копирования)
+    def view(self, parity):
+        header, points = self.views[parity]
+        return points[:header[0]]
+
+    # Остановка процесса и освобождение общей памяти
+    def close(self):
+        if self.process.is_alive():
+            self.receive()
+            self.conn.send(('stop',))
+            self.process.join(timeout=5)
+        self.conn.close()
+        self.views = []
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+# Класс - симуляция, распределенная по рабочим процессам.
+# Каждый процесс ведет свою часть фейерверков; главный процесс только раздает новые фейерверки
+# и рисует круги из общей памяти, пока процессы считают следующий шаг
+class ShardedSimulation:
+    # Инициализация (параметры берутся из раздела 'sharding' конфигурации)
+    def __init__(self, workers=2, capacity=262144, seed=None, particle_backend='numpy'):
+        self.shards = [Shard(index, capacity, particle_backend) for index in range(workers)]
+        self.seeds = random.Random(seed) # Зерна фейерверков (свой генератор - общий модуль random игры не затрагивается)
+        self.frame = 0 # Номер последнего отправленного шага
+        self.spec_ids = {} # Параметры фейерверков (FireworkSpec), уже отправленные процессам -> их номер
+
+    # Новый фейерверк достается наименее загруженному процессу (color - цвет, None - случайный)
+    # Параметры передаются номером: у фейерверков одного шага они могут быть разными (пресеты команд, качество)
+    def launch(self, x, y, diagonal, spec, color=None):
+        spec_id = self.spec_ids.get(spec)
+        if spec_id is None:
+            spec_id = self.spec_ids[spec] = len(self.spec_ids)
+            for shard in self.shards:
+                shard.conn.send(('spec', spec_id, spec))
+        shard = min(self.shards, key=Shard.load)
+        shard.launches.append((x, y, diagonal, color, self.seeds.getrandbits(64), spec_id))
+
+    # Шаг симуляции: дожидаемся предыдущего шага и сразу запускаем следующий.
+    # Отрисовка тем временем читает результат предыдущего шага из буфера другой четности
+    def step(self, trail_step=1):
+        for shard in self.shards:
+            shard.receive()
+        self.frame += 1
+        for shard in self.shards:
+            shard.send_step(self.frame, trail_step)
+
+    # Ожидание всех отправленных шагов (для замеров и перед остановкой)
+    def wait(self):
+        for shard in self.shards:
+            shard.receive()
+
+    # Отрисовка последнего готового шага
+    def draw(self, screen):
+        parity = (self.frame - 1) % 2
+        for shard in self.shards:
+            draw_points(screen, shard.view(parity))
+
+    # Круги последнего готового шага всех процессов одним массивом (для растеризатора)
+    def points(self):
+        parity = (self.frame - 1) % 2
+        return np.concatenate([shard.view(parity) for shard in self.shards])
+
+    # Суммарные счетчики по последнему ответу процессов
+    def stats(self):
+        return {
+            'workers': len(self.shards),
+            'fireworks': [shard.fireworks for shard in self.shards],
+            'particles': sum(shard.particles for shard in self.shards),
+            'points': sum(shard.points for shard in self.shards),
+            'dropped': sum(shard.dropped for shard in self.shards),
+        }
+
+    # Остановка всех процессов
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+# Замер масштабирования: одна и та же нагрузка на 0 (без процессов), 1, 2, 4 и 8 процессах.
+# При любом числе процессов нагрузка одинаковая (зерна фейерверков выбирает главный процесс), без процессов
+# фейерверки разыгрываются из общего генератора игры и нагрузка другая - поэтому ускорение считается
+# по частице-шагам в секунду, а не по шагам
+def main(argv=None):
+    from .game import Game
+    from .config_loader import add_config_arguments, load_config_from_args
+
+    parser = argparse.ArgumentParser(description='Масштабирование симуляции по рабочим процессам')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4, 8], help='Количество процессов (0 - без процессов)')
+    add_config_arguments(parser)
+    parser.add_argument('--frames', type=int, default=600, help='Количество шагов')
+    parser.add_argument('--interval', type=int, default=2, help='Интервал запуска фейерверков в шагах')
+    parser.add_argument('--seed', type=int, default=1, help='Зерно генератора случайных чисел')
+    parser.add_argument('--render', action='store_true', help='Замерять и отрисовку')
+    args = parser.parse_args(argv)
+
+    spec = load_config_from_args(args)
+    results = []
+    for workers in args.workers:
+        game = Game.from_config(spec, headless=True, seed=args.seed, firework_interval=args.interval, workers=workers)
+        particle_steps = 0 # Сумма частиц по всем шагам - объем выполненной работы
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            game.update()
+            if args.render:
+                game.draw()
+            if game.shards is not None:
+                # Процессы отвечают на шаг с опозданием на один: здесь - частицы предыдущего шага
+                particle_steps += sum(shard.particles for shard in game.shards.shards)
+            else:
+                particle_steps += sum(firework.particle_count() for firework in game.fireworks)
+        if game.shards is not None:
+            game.shards.wait()
+            stats = game.shards.stats()
+            particle_steps += stats['particles'] # Последний шаг
+            game.shards.close()
+        else:
+            stats = {'particles': sum(firework.particle_count() for firework in game.fireworks)}
+        elapsed = time.perf_counter() - start
+        results.append((workers, args.frames / elapsed, particle_steps / elapsed, stats['particles']))
+
+    print(f"{'процессов':>10} {'шагов/с':>10} {'частице-шагов/с':>16} {'ускорение':>10} {'частиц':>8}")
+    base = results[0][2]
+    for workers, steps_per_second, particle_rate, particles in results:
+        print(f'{workers:>10} {steps_per_second:>10.1f} {particle_rate:>16.0f} {particle_rate / base:>9.2f}x {particles:>8}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
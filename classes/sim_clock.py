@@ -0,0 +1,47 @@
+# Класс - часы симуляции с фиксированным шагом.
+# Реальное время кадра копится в аккумуляторе и расходуется целыми шагами физики,
+# поэтому скорость шоу не зависит ни от FPS отрисовки, ни от пропущенных кадров
+class FixedStepClock:
+    # Инициализация
+    def __init__(self, step_rate=60, max_steps=5, max_skipped_draws=5):
+        self.step = 1 / step_rate # Длительность одного шага физики в секундах
+        self.max_steps = max_steps # Сколько шагов можно догнать за один кадр
+        self.max_skipped_draws = max_skipped_draws # Сколько отрисовок подряд можно пропустить ради догоняющей физики
+        self.accumulator = 0.0 # Накопленное, но еще не просимулированное время
+
+        # Статистика
+        self.steps = 0 # Всего выполнено шагов физики
+        self.skipped_draws = 0 # Пропущено отрисовок подряд
+        self.total_skipped_draws = 0 # Пропущено отрисовок всего
+        self.dropped_time = 0.0 # Отброшено времени, которое не удалось догнать
+
+    # Добавление прошедшего времени, возвращает количество шагов физики для выполнения
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = min(int(self.accumulator / self.step), self.max_steps)
+        self.accumulator -= steps * self.step
+        self.steps += steps
+        return steps
+
+    # Отстает ли симуляция больше чем на шаг
+    def behind(self):
+        return self.accumulator >= self.step
+
+    # Нужно ли рисовать кадр: при отставании отрисовка пропускается, чтобы физика догнала время
+    def should_draw(self):
+        if self.behind():
+            if self.skipped_draws < self.max_skipped_draws:
+                self.skipped_draws += 1
+                self.total_skipped_draws += 1
+                return False
+            # Догнать не получается - отбрасываем лишнее время, чтобы не уйти в бесконечное отставание
+            backlog = self.accumulator - self.accumulator % self.step
+            self.dropped_time += backlog
+            self.accumulator -= backlog
+        self.skipped_draws = 0
+        return True
+
+    # Доля шага между предыдущим и текущим состоянием для интерполяции отрисовки
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator / self.step)
@@ -0,0 +1,222 @@
+import dataclasses
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from .trail import trail_capacity
+
+# Максимальная прозрачность точки следа частицы (та же, что particle.LINE_MAX_ALPHA)
+PARTICLE_LINE_MAX_ALPHA = 220
+
+# Дополнительные разделы конфигурации, которые передаются подсистемам игры как есть
+SECTIONS = ('pools', 'sprite_cache', 'timestep', 'quality', 'profiler', 'culling', 'blit_batch', 'dirty_rects', 'sharding', 'commands', 'render_thread', 'raster')
+
+# Ошибка в конфигурации (сообщение содержит путь к параметру и причину)
+class ConfigError(ValueError):
+    pass
+
+# Проверка числа (bool числом не считается)
+def _number(name, value, minimum=None, above=None, integer=False):
+    kind = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kind):
+        raise ConfigError(f'{name}: ожидается {"целое " if integer else ""}число, получено {value!r}')
+    if minimum is not None and value < minimum:
+        raise ConfigError(f'{name}: значение {value} меньше допустимого {minimum}')
+    if above is not None and value <= above:
+        raise ConfigError(f'{name}: значение {value} должно быть больше {above}')
+    return value
+
+# Проверка диапазона [минимум, максимум]
+def _range(name, value, minimum=None, integer=False):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ConfigError(f'{name}: ожидается диапазон [минимум, максимум], получено {value!r}')
+    low = _number(f'{name}[0]', value[0], minimum, integer=integer)
+    high = _number(f'{name}[1]', value[1], minimum, integer=integer)
+    if low > high:
+        raise ConfigError(f'{name}: минимум {low} больше максимума {high}')
+    return (low, high)
+
+# Проверка значения из списка допустимых
+def _choice(name, value, choices):
+    if value not in choices:
+        raise ConfigError(f'{name}: ожидается одно из {", ".join(map(repr, choices))}, получено {value!r}')
+    return value
+
+# Словарь раздела без неизвестных ключей (опечатка в имени параметра - тоже ошибка)
+def _section(path, data, known):
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ConfigError(f'{path}: ожидается объект JSON, получено {data!r}')
+    unknown = sorted(set(data) - set(known))
+    if unknown:
+        raise ConfigError(f'{path}: неизвестные параметры {", ".join(unknown)}')
+    return data
+
+# Имена параметров спецификации, которые можно задать в JSON
+def _keys(cls, exclude=()):
+    return [spec_field.name for spec_field in dataclasses.fields(cls) if spec_field.init and spec_field.name not in exclude]
+
+# Создание спецификации с путем раздела в тексте ошибки
+def _build(path, cls, values):
+    try:
+        return cls(**values)
+    except ConfigError as error:
+        raise ConfigError(f'{path}.{error}') from None
+
+# Класс - проверенные неизменяемые параметры частиц (раздел 'particle')
+@dataclass(frozen=True, slots=True)
+class ParticleSpec:
+    speed_range: tuple = (1.5, 3)
+    size_range: tuple = (2, 4)
+    lifetime_range: tuple = (200, 220)
+    gravity: float = 0.05
+    line_max_length: float = 15
+    line_spacing: float = 2
+    line_fade_speed: float = 6
+    base_size: float = 2.5
+    fade_start: int = 30
+    line_capacity: int = field(init=False, repr=False) # Вместимость следа, считается один раз
+
+    # Проверка и нормализация значений
+    def __post_init__(self):
+        checked = {
+            'speed_range': _range('speed_range', self.speed_range, 0),
+            'size_range': _range('size_range', self.size_range, 0, integer=True),
+            'lifetime_range': _range('lifetime_range', self.lifetime_range, 1, integer=True),
+            'gravity': _number('gravity', self.gravity),
+            'line_max_length': _number('line_max_length', self.line_max_length, 0),
+            'line_spacing': _number('line_spacing', self.line_spacing, 0),
+            'line_fade_speed': _number('line_fade_speed', self.line_fade_speed, 0),
+            'base_size': _number('base_size', self.base_size, above=0),
+            'fade_start': _number('fade_start', self.fade_start, above=0),
+        }
+        for name, value in checked.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'line_capacity', trail_capacity(PARTICLE_LINE_MAX_ALPHA, self.line_fade_speed,
+                                                                 self.line_spacing, self.line_max_length))
+
+    # Создание из раздела JSON
+    @classmethod
+    def from_dict(cls, data, path='particle'):
+        return _build(path, cls, _section(path, data, _keys(cls)))
+
+# Класс - проверенные неизменяемые параметры фейерверка (раздел 'firework') и его частиц
+@dataclass(frozen=True, slots=True)
+class FireworkSpec:
+    initial_speed_y_range: tuple = (-7, -2)
+    diagonal_speed_x_range: tuple = (1, 3)
+    min_explosion_height: int = 50
+    max_explosion_height_offset: int = 50
+    line_max_length: float = 30
+    line_spacing: float = 2.5
+    line_fade_speed: float = 8
+    base_size: float = 2.6
+    particles_count_range: tuple = (100, 200)
+    particles_lifetime_range: tuple = (40, 80)
+    particle: ParticleSpec = ParticleSpec()
+    line_capacity: int = field(init=False, repr=False) # Вместимость следа, считается один раз
+
+    # Проверка и нормализация значений
+    def __post_init__(self):
+        checked = {
+            'initial_speed_y_range': _range('initial_speed_y_range', self.initial_speed_y_range),
+            'diagonal_speed_x_range': _range('diagonal_speed_x_range', self.diagonal_speed_x_range, 0),
+            'min_explosion_height': _number('min_explosion_height', self.min_explosion_height, 0, integer=True),
+            'max_explosion_height_offset': _number('max_explosion_height_offset', self.max_explosion_height_offset, 0, integer=True),
+            'line_max_length': _number('line_max_length', self.line_max_length, 0),
+            'line_spacing': _number('line_spacing', self.line_spacing, 0),
+            'line_fade_speed': _number('line_fade_speed', self.line_fade_speed, 0),
+            'base_size': _number('base_size', self.base_size, above=0),
+            'particles_count_range': _range('particles_count_range', self.particles_count_range, 1, integer=True),
+            'particles_lifetime_range': _range('particles_lifetime_range', self.particles_lifetime_range, 1, integer=True),
+        }
+        # Фейерверк должен лететь вверх, иначе он никогда не долетит до высоты взрыва
+        if checked['initial_speed_y_range'][1] >= 0:
+            raise ConfigError(f'initial_speed_y_range: скорость должна быть отрицательной (вверх), '
+                              f'получено {list(checked["initial_speed_y_range"])}')
+        if not isinstance(self.particle, ParticleSpec):
+            raise ConfigError(f'particle: ожидается ParticleSpec, получено {self.particle!r}')
+        for name, value in checked.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'line_capacity', trail_capacity(255, self.line_fade_speed, self.line_spacing, self.line_max_length))
+
+    # Создание из разделов JSON 'firework' и 'particle'
+    @classmethod
+    def from_dict(cls, data, particle=None, path='firework'):
+        values = dict(_section(path, data, _keys(cls, ('particle',))))
+        values['particle'] = ParticleSpec.from_dict(particle)
+        return _build(path, cls, values)
+
+# Класс - проверенные неизменяемые параметры игры (вся конфигурация)
+@dataclass(frozen=True, slots=True)
+class GameSpec:
+    width: int = 1000
+    height: int = 800
+    background: tuple = (0, 0, 0)
+    firework_interval: int = 30
+    diagonal: bool = False
+    margin_x: int = 20
+    fps: float = 60
+    sim_fps: float = 60
+    particle_backend: str = 'numpy'
+    workers: int = 0
+    trail_mode: str = 'points'
+    firework: FireworkSpec = FireworkSpec()
+    sections: MappingProxyType = field(default_factory=dict, compare=False) # Разделы SECTIONS как есть (только чтение)
+
+    # Проверка и нормализация значений
+    def __post_init__(self):
+        background = self.background
+        if not isinstance(background, (list, tuple)) or len(background) != 3:
+            raise ConfigError(f'background: ожидается цвет [r, g, b], получено {background!r}')
+        checked = {
+            'width': _number('width', self.width, above=0, integer=True),
+            'height': _number('height', self.height, above=0, integer=True),
+            'background': tuple(_number(f'background[{i}]', channel, 0, integer=True) for i, channel in enumerate(background)),
+            'firework_interval': _number('firework_interval', self.firework_interval, 1, integer=True),
+            'margin_x': _number('margin_x', self.margin_x, 0, integer=True),
+            'fps': _number('fps', self.fps, above=0),
+            'sim_fps': _number('sim_fps', self.sim_fps, above=0),
+            'particle_backend': _choice('particle_backend', self.particle_backend, ('numpy', 'objects')),
+            'workers': _number('workers', self.workers, 0, integer=True),
+            'trail_mode': _choice('trail_mode', self.trail_mode, ('points', 'persistence')),
+        }
+        if not isinstance(self.diagonal, bool):
+            raise ConfigError(f'diagonal: ожидается true или false, получено {self.diagonal!r}')
+        if max(checked['background']) > 255:
+            raise ConfigError(f'background: компоненты цвета должны быть от 0 до 255, получено {list(background)}')
+        if checked['margin_x'] * 2 > checked['width']:
+            raise ConfigError(f'margin_x: отступ {checked["margin_x"]} не оставляет места для запуска при ширине {checked["width"]}')
+        if not isinstance(self.firework, FireworkSpec):
+            raise ConfigError(f'firework: ожидается FireworkSpec, получено {self.firework!r}')
+        for name, value in checked.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'sections', MappingProxyType(dict(self.sections)))
+
+    # Создание из словаря JSON
+    @classmethod
+    def from_dict(cls, data):
+        values = dict(_section('конфигурация', data, _keys(cls, ('firework', 'sections')) + ['firework', 'particle', *SECTIONS]))
+        values['firework'] = FireworkSpec.from_dict(values.get('firework'), values.pop('particle', None))
+        sections = {}
+        for name in SECTIONS:
+            if name in values:
+                section = values.pop(name)
+                if not isinstance(section, dict):
+                    raise ConfigError(f'{name}: ожидается объект JSON, получено {section!r}')
+                sections[name] = section
+        values['sections'] = sections
+        return cls(**values)
+
+    # Копия с измененными параметрами (значения проверяются так же, как при загрузке)
+    def replace(self, **changes):
+        return dataclasses.replace(self, **changes)
+
+    # Дополнительный раздел конфигурации (пустой словарь, если его нет)
+    def section(self, name):
+        return dict(self.sections.get(name, {}))
+
+# Компиляция словаря конфигурации в проверенную спецификацию
+def compile_config(config):
+    if isinstance(config, GameSpec):
+        return config
+    return GameSpec.from_dict(config if config is not None else {})
@@ -0,0 +1,133 @@
+import math
+import pygame
+import numpy as np
+from collections import OrderedDict
+
+# Класс - кэш заранее отрисованных полупрозрачных кругов (спрайтов).
+# Вместо создания новой поверхности на каждую точку следа берем готовый спрайт по ключу
+# (цвет, радиус, квантованная альфа). При переполнении вытесняется давно не использованный спрайт (LRU)
+class SpriteCache:
+    # Инициализация
+    def __init__(self, max_size=4096, alpha_step=8):
+        self.max_size = max_size # Максимальное количество спрайтов в кэше
+        self.alpha_step = alpha_step # Шаг квантования прозрачности
+        self.sprites = OrderedDict() # Спрайты в порядке последнего использования
+
+        # Счетчики для настройки шага квантования
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Изменение параметров кэша (например, из раздела 'sprite_cache' конфигурации)
+    def configure(self, max_size=None, alpha_step=None):
+        if max_size is not None:
+            self.max_size = max_size
+        if alpha_step is not None and alpha_step != self.alpha_step:
+            self.alpha_step = alpha_step
+            self.clear() # Старые спрайты квантованы с другим шагом
+        while len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+
+    # Очистка кэша и счетчиков
+    def clear(self):
+        self.sprites.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Квантование прозрачности до ближайшего шага
+    def quantize_alpha(self, alpha):
+        step = self.alpha_step
+        return min(255, int(alpha + step / 2) // step * step)
+
+    # Получение спрайта круга (None, если круг не будет виден)
+    def get(self, color, radius, alpha):
+        radius = int(radius) # pygame.draw.circle все равно отбрасывает дробную часть радиуса
+        if radius < 1:
+            return None
+        alpha = self.quantize_alpha(alpha)
+        if alpha <= 0:
+            return None
+
+        key = (color, radius, alpha)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        # Промах - рисуем спрайт один раз и запоминаем
+        self.misses += 1
+        sprite = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*color, alpha), (radius + 1, radius + 1), radius)
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha() # Формат экрана ускоряет blit
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+
+    # Отрисовка круга с центром в точке (x, y)
+    def draw_circle(self, screen, color, radius, alpha, x, y):
+        sprite = self.get(color, radius, alpha)
+        if sprite is not None:
+            offset = int(radius) + 1
+            screen.blit(sprite, (x - offset, y - offset))
+
+    # Отрисовка набора кругов одним вызовом blits.
+    # colors - массив N x 3, radii, alphas, xs, ys - массивы длины N; результат тот же, что у draw_circle по очереди
+    def draw_circles(self, screen, colors, radii, alphas, xs, ys):
+        radii = radii.astype(np.int64)
+        step = self.alpha_step
+        alphas = np.minimum(255, (alphas + step / 2).astype(np.int64) // step * step)
+        visible = (radii >= 1) & (alphas > 0)
+        if not visible.any():
+            return
+        radii = radii[visible]
+        offsets = radii + 1
+
+        sprites = self.sprites
+        items = []
+        hits = 0
+        for color, radius, alpha, x, y in zip(map(tuple, colors[visible].tolist()), radii.tolist(), alphas[visible].tolist(),
+                                              (xs[visible] - offsets).tolist(), (ys[visible] - offsets).tolist()):
+            key = (color, radius, alpha)
+            sprite = sprites.get(key)
+            if sprite is None:
+                sprite = self.get(color, radius, alpha) # Промах - спрайт рисуется и учитывается в get
+            else:
+                hits += 1
+                sprites.move_to_end(key)
+            items.append((sprite, (x, y)))
+        self.hits += hits
+        screen.blits(items, doreturn=False)
+
+    # Статистика кэша
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'size': len(self.sprites),
+            'max_size': self.max_size,
+            'alpha_step': self.alpha_step,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / requests if requests else 0.0,
+        }
+
+# Прямоугольник экрана, который закрашивают круги радиусом не больше radius с центрами
+# в пределах [left, right] x [top, bottom] (с запасом на округление позиции blit)
+def circle_bounds(left, top, right, bottom, radius):
+    margin = int(radius) + 2
+    x = math.floor(left) - margin
+    y = math.floor(top) - margin
+    return pygame.Rect(x, y, math.ceil(right) + margin - x, math.ceil(bottom) + margin - y)
+
+# Радиус, который еще помещается в поверхность следа размера int(base_size * 2 + 2)
+def line_max_radius(base_size):
+    return (int(base_size * 2 + 2) - 1) // 2
+
+# Общий кэш для всех фейерверков и частиц
+default_cache = SpriteCache()
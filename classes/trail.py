@@ -0,0 +1,256 @@
+import math
+from array import array
+
+# Количество точек следа, которые могут быть видны одновременно.
+# Точка добавляется раз в ceil(line_spacing) кадров и исчезает через ceil(max_alpha / line_fade_speed) кадров
+def trail_capacity(max_alpha, line_fade_speed, line_spacing, line_max_length):
+    frames_per_point = max(1, math.ceil(line_spacing))
+    if line_fade_speed <= 0:
+        # След не исчезает - храним столько точек, сколько позволяет длина хвоста
+        return max(1, int(line_max_length))
+    frames_visible = math.ceil(max_alpha / line_fade_speed)
+    return frames_visible // frames_per_point + 1
+
+# Поля одной точки в плоском массиве следа: x, y, размер, начальная альфа, кадр добавления
+POINT_FIELDS = 5
+
+# Класс - след фиксированной вместимости (кольцевой буфер).
+# Прозрачность точки не уменьшается на месте, а вычисляется по ее возрасту,
+# поэтому добавление и удаление точек выполняются за O(1) без создания новых списков.
+# Все точки лежат в одном массиве float32 (по POINT_FIELDS чисел на точку): 20 байт на точку
+# вместо пяти массивов double и одного объекта на каждый
+class TrailBuffer:
+    __slots__ = ('capacity', 'fade_speed', 'alpha_cap', 'data', 'head', 'count', 'frame')
+
+    # Инициализация
+    def __init__(self, capacity, fade_speed):
+        self.capacity = capacity
+        self.fade_speed = fade_speed # На сколько уменьшается альфа точки за кадр
+        self.alpha_cap = 255 # Верхняя граница альфы (общее затухание владельца следа)
+
+        # Данные точек хранятся в плоском массиве фиксированного размера.
+        # Кадр добавления в float32 точен до 2**24 кадров - след столько не живет
+        self.data = array('f', bytes(4 * POINT_FIELDS * capacity))
+
+        self.head = 0 # Индекс для следующей точки
+        self.count = 0 # Количество точек в буфере
+        self.frame = 0 # Номер текущего кадра следа
+
+    # Количество точек в следе
+    def __len__(self):
+        return self.count
+
+    # Добавление новой точки (при переполнении заменяет самую старую)
+    def append(self, x, y, size, alpha):
+        head = self.head
+        offset = head * POINT_FIELDS
+        data = self.data
+        data[offset] = x
+        data[offset + 1] = y
+        data[offset + 2] = size
+        data[offset + 3] = alpha
+        data[offset + 4] = self.frame
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    # Прозрачность точки с индексом index в текущем кадре
+    def alpha_at(self, index):
+        offset = index * POINT_FIELDS
+        alpha = self.data[offset + 3] - (self.frame - self.data[offset + 4]) * self.fade_speed
+        return max(0, min(alpha, self.alpha_cap))
+
+    # Переход к следующему кадру и удаление полностью прозрачных старых точек
+    def advance(self):
+        self.frame += 1
+        while self.count > 0:
+            oldest = (self.head - self.count) % self.capacity
+            if self.alpha_at(oldest) > 0:
+                break
+            self.count -= 1
+
+    # Очистка следа
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.frame = 0
+        self.alpha_cap = 255
+
+    # Обход точек от старых к новым: (x, y, size, alpha)
+    def __iter__(self):
+        return self.points()
+    
+    # Обход каждой step-й точки от старых к новым (самая новая точка всегда включается)
+    def points(self, step=1):
+        capacity = self.capacity
+        data = self.data
+        skip = (self.count - 1) % step
+        index = (self.head - self.count + skip) % capacity
+        for _ in range(skip, self.count, step):
+            offset = index * POINT_FIELDS
+            yield data[offset], data[offset + 1], data[offset + 2], self.alpha_at(index)
+            index = (index + step) % capacity
+
+    # Границы центров точек следа: (left, top, right, bottom) или None для пустого следа
+    def bounds(self):
+        return ring_bounds(self.data, POINT_FIELDS, self.head, self.count, self.capacity)
+
+# Границы центров count последних точек кольца из плоского массива data (fields чисел на точку,
+# x и y - первые два): (left, top, right, bottom) или None для пустого кольца
+def ring_bounds(data, fields, head, count, capacity):
+    if count == 0:
+        return None
+    start = (head - count) % capacity
+    end = start + count
+    if end <= capacity:
+        xs = data[start * fields:end * fields:fields]
+        ys = data[start * fields + 1:end * fields:fields]
+    else:
+        wrapped = (end - capacity) * fields
+        xs = data[start * fields::fields] + data[:wrapped:fields]
+        ys = data[start * fields + 1::fields] + data[1:wrapped:fields]
+    return min(xs), min(ys), max(xs), max(ys)
+
+# Буфер следа для объекта из пула: старый буфер очищается, новый создается только при смене вместимости
+def reuse_trail(trail, capacity, fade_speed):
+    if trail is None or trail.capacity != capacity:
+        return TrailBuffer(capacity, fade_speed)
+    trail.clear()
+    trail.fade_speed = fade_speed
+    return trail
+
+# Класс - общее кольцо следов группы частиц, которые добавляют точки в одни и те же кадры
+# (частицы одного взрыва). Кадр добавления и начальная альфа точки хранятся один раз на группу,
+# а прозрачность всех точек вычисляется один раз за кадр в advance, а не в каждой частице
+class TrailSchedule:
+    __slots__ = ('capacity', 'fade_speed', 'alpha_cap', 'born', 'alpha0', 'alphas', 'head', 'count', 'frame',
+                 'cached_step', 'cached_slots')
+
+    # Инициализация
+    def __init__(self, capacity, fade_speed):
+        self.capacity = capacity
+        self.fade_speed = fade_speed # На сколько уменьшается альфа точки за кадр
+        self.alpha_cap = 255 # Верхняя граница альфы (общее затухание группы)
+
+        self.born = [0] * capacity # Кадр добавления точки
+        self.alpha0 = [0] * capacity # Начальная альфа точки
+        self.alphas = [0] * capacity # Альфа точки в текущем кадре
+
+        self.head = 0 # Индекс для следующей точки
+        self.count = 0 # Количество точек в кольце
+        self.frame = 0 # Номер текущего кадра следа
+
+        # Последний результат slots (одинаковый для всех частиц группы в кадре)
+        self.cached_step = 0
+        self.cached_slots = None
+
+    # Количество точек в следе каждой частицы группы
+    def __len__(self):
+        return self.count
+
+    # Новая точка следа с альфой alpha (при переполнении заменяет самую старую).
+    # Возвращает индекс, под которым частицы группы записывают свои координаты
+    def append(self, alpha):
+        head = self.head
+        self.born[head] = self.frame
+        self.alpha0[head] = alpha
+        self.alphas[head] = max(0, min(alpha, self.alpha_cap))
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.cached_slots = None
+        return head
+
+    # Переход к следующему кадру: новая альфа всех точек и удаление полностью прозрачных старых
+    def advance(self):
+        self.frame += 1
+        frame = self.frame
+        fade_speed = self.fade_speed
+        alpha_cap = self.alpha_cap
+        born, alpha0, alphas = self.born, self.alpha0, self.alphas
+        capacity = self.capacity
+        index = (self.head - self.count) % capacity
+        for _ in range(self.count):
+            alpha = alpha0[index] - (frame - born[index]) * fade_speed
+            alphas[index] = max(0, min(alpha, alpha_cap))
+            index = (index + 1) % capacity
+        while self.count > 0 and alphas[(self.head - self.count) % capacity] <= 0:
+            self.count -= 1
+        self.cached_slots = None
+
+    # Кольцо, заполненное заново точками points [(кадр добавления, начальная альфа)] от старых к новым,
+    # в кадре frame с ограничением альфы alpha_cap (перемотка без пошагового старения)
+    def rebuild(self, points, frame, alpha_cap):
+        self.frame = frame
+        self.alpha_cap = alpha_cap
+        self.head = 0
+        self.count = 0
+        for born, alpha in points:
+            self.append(alpha)
+            self.born[self.head - 1] = born
+        self.frame -= 1
+        self.advance()
+
+    # Видимые точки из каждой step-й от старых к новым (самая новая всегда рассматривается): [(index, alpha)]
+    def slots(self, step=1):
+        if self.cached_slots is None or self.cached_step != step:
+            capacity = self.capacity
+            alphas = self.alphas
+            skip = (self.count - 1) % step
+            start = self.head - self.count + skip
+            visible = []
+            for offset in range(0, self.count - skip, step):
+                index = (start + offset) % capacity
+                if alphas[index] > 0:
+                    visible.append((index, alphas[index]))
+            self.cached_step = step
+            self.cached_slots = visible
+        return self.cached_slots
+
+# Поля одной точки в массиве частицы группы: x, y, размер
+GROUP_POINT_FIELDS = 3
+
+# Класс - след одной частицы группы: только координаты и размер своих точек,
+# порядок и прозрачность точек берутся из общего TrailSchedule группы
+class TrailPoints:
+    __slots__ = ('schedule', 'data')
+
+    # Инициализация
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.data = array('f', bytes(4 * GROUP_POINT_FIELDS * schedule.capacity))
+
+    # Количество точек в следе
+    def __len__(self):
+        return self.schedule.count
+
+    # Запись координат и размера точки с индексом index из TrailSchedule.append
+    def put(self, index, x, y, size):
+        offset = index * GROUP_POINT_FIELDS
+        data = self.data
+        data[offset] = x
+        data[offset + 1] = y
+        data[offset + 2] = size
+
+    # Обход видимых точек от старых к новым: (x, y, size, alpha)
+    def __iter__(self):
+        return self.points()
+
+    # Обход видимых точек из каждой step-й от старых к новым
+    def points(self, step=1):
+        data = self.data
+        for index, alpha in self.schedule.slots(step):
+            offset = index * GROUP_POINT_FIELDS
+            yield data[offset], data[offset + 1], data[offset + 2], alpha
+
+    # Границы центров точек следа: (left, top, right, bottom) или None для пустого следа
+    def bounds(self):
+        schedule = self.schedule
+        return ring_bounds(self.data, GROUP_POINT_FIELDS, schedule.head, schedule.count, schedule.capacity)
+
+# След частицы из пула для группы schedule: массив точек переиспользуется при той же вместимости
+def reuse_points(trail, schedule):
+    if trail is None or len(trail.data) != GROUP_POINT_FIELDS * schedule.capacity:
+        return TrailPoints(schedule)
+    trail.schedule = schedule
+    return trail
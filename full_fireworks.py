@@ -2,15 +2,22 @@ import pygame
 import random
 import math
 import json
+# Спецификации конфигурации и кэш спрайтов - общие с модульной версией (classes/), без копий
+from classes.specs import ConfigError, GameSpec, FireworkSpec, ParticleSpec
+from classes.sprite_cache import default_cache, line_max_radius
+
+# Спецификации по умолчанию (если конфигурация не передана)
+DEFAULT_PARTICLE_SPEC = ParticleSpec()
+DEFAULT_FIREWORK_SPEC = FireworkSpec()
+
 
 # Класс - частица фейерверка
 class Particle:
     # Инициализация
-    def __init__(self, x, y, color, config=None):
-        # Инициализация конфигурации
-        if config is None:
-            config = {}
-        config_particle = config.get('particle', {})
+    def __init__(self, x, y, color, spec=None):
+        # Параметры частиц (проверенная спецификация)
+        if spec is None:
+            spec = DEFAULT_PARTICLE_SPEC
         
         # Основные параметры частицы
         self.x = x
@@ -19,7 +26,7 @@ class Particle:
         
         # Случайное направление движения по кругу
         angle = random.uniform(0, 2 * math.pi) # Случайный угол от 0 до 360 градусов
-        speed_range = config_particle.get('speed_range', [1.5, 3])
+        speed_range = spec.speed_range
         speed = random.uniform(speed_range[0], speed_range[1])
         
         # Разложение скорости на компоненты по осям
@@ -27,29 +34,29 @@ class Particle:
         self.speed_y = math.sin(angle) * speed
         
         # Визуальные параметры
-        size_range = config_particle.get('size_range', [2, 4])
+        size_range = spec.size_range
         self.size = random.randint(size_range[0], size_range[1])
         
         # Время жизни частицы
-        lifetime_range = config_particle.get('lifetime_range', [200, 220])
+        lifetime_range = spec.lifetime_range
         self.lifetime = random.randint(lifetime_range[0], lifetime_range[1])
         self.max_lifetime = self.lifetime  # Сохраняем максимальное время жизни
         
         # Параметры следа частицы
         self.line = [] # Список точек следа (x, y, size, alpha)
-        self.max_line_length = config_particle.get('line_max_length', 15)
+        self.max_line_length = spec.line_max_length
         self.line_counter = 0 # Счетчик для создания точек
-        self.line_spacing = config_particle.get('line_spacing', 2)
-        self.line_fade_speed = config_particle.get('line_fade_speed', 6)
-        self.base_size = config_particle.get('base_size', 2.5)
+        self.line_spacing = spec.line_spacing
+        self.line_fade_speed = spec.line_fade_speed
+        self.base_size = spec.base_size
         
         # Физические параметры
-        self.gravity = config_particle.get('gravity', 0.05)
+        self.gravity = spec.gravity
         
         # Параметры затухания
         self.fading = False # Флаг начала затухания
         self.fade_alpha = 255  # Начальная прозрачность
-        self.fade_start = config_particle.get('fade_start', 30) # Когда начинать затухание
+        self.fade_start = spec.fade_start # Когда начинать затухание
     
     # Обновление состояния частицы на каждом кадре
     def update(self):
@@ -121,47 +128,27 @@ class Particle:
         
         # Отрисовка самой частицы (круг)
         if self.is_alive():
-            # Используем fade_alpha для плавного затухания
-            alpha = self.fade_alpha
-            
-            # Создание поверхности с альфа-каналом для частицы
-            particle_surface = pygame.Surface((self.size * 2 + 2, self.size * 2 + 2), pygame.SRCALPHA)
-            particle_color = (*self.color, alpha) # Цвет с учетом прозрачности
-            
-            # Отрисовка круглой частицы
-            pygame.draw.circle(particle_surface, particle_color, (self.size + 1, self.size + 1), self.size)
-            
-            # Размещение частицы на экране
-            screen.blit(particle_surface, (self.x - self.size - 1, self.y - self.size - 1))
+            # Используем fade_alpha для плавного затухания, готовый спрайт берем из кэша
+            default_cache.draw_circle(screen, self.color, self.size, self.fade_alpha, self.x, self.y)
     
     # Отрисовка следа
     def _draw_line(self, screen):
+        # Радиус ограничен размером поверхности следа int(base_size * 2 + 2)
+        max_radius = line_max_radius(self.base_size)
         for x, y, size, alpha in self.line:
             if alpha > 0: # Рисуем только видимые точки
                 # Расчет размера точки следа
-                circle_size = max(0.5, size / 8)
-                
-                # Создание поверхности с альфа-каналом
-                max_surface_size = int(self.base_size * 2 + 2)
-                circle_surface = pygame.Surface((max_surface_size, max_surface_size), pygame.SRCALPHA)
-                circle_color = (*self.color, int(alpha)) # Цвет с учетом прозрачности
-                
-                # Отрисовка круглой точки следа
-                center_x, center_y = max_surface_size // 2, max_surface_size // 2
-                pygame.draw.circle(circle_surface, circle_color, (center_x, center_y), circle_size)
-                
-                # Размещение точки следа на экране
-                screen.blit(circle_surface, (x - center_x, y - center_y))
+                circle_size = min(max(0.5, size / 8), max_radius)
+                default_cache.draw_circle(screen, self.color, circle_size, alpha, x, y)
 
 
 # Класс - фейерверк
 class Firework:
     # Инициализация
-    def __init__(self, x, y, diagonal=False, config=None):
-        # Инициализация конфигурации
-        if config is None:
-            config = {}
-        config_firework = config.get('firework', {})
+    def __init__(self, x, y, diagonal=False, spec=None):
+        # Параметры фейерверка (проверенная спецификация)
+        if spec is None:
+            spec = DEFAULT_FIREWORK_SPEC
         
         # Позиция и движение
         self.x = x
@@ -174,14 +161,14 @@ class Firework:
         self.line = []  # След фейерверка (x, y, size, alpha)
         
         # Параметры следа
-        self.max_line_length = config_firework.get('line_max_length', 30) # Максимальная длина хвоста
+        self.max_line_length = spec.line_max_length # Максимальная длина хвоста
         self.line_counter = 0 # Счетчик для создания новых точек следа
-        self.line_spacing = config_firework.get('line_spacing', 2.5) # Интервал между точками следа
-        self.line_fade_speed = config_firework.get('line_fade_speed', 8) # Скорость исчезновения точек
-        self.base_size = config_firework.get('base_size', 2.6) # Базовый размер точек следа
+        self.line_spacing = spec.line_spacing # Интервал между точками следа
+        self.line_fade_speed = spec.line_fade_speed # Скорость исчезновения точек
+        self.base_size = spec.base_size # Базовый размер точек следа
         
         # Физические параметры
-        initial_speed_y_range = config_firework.get('initial_speed_y_range', [-7, -2])
+        initial_speed_y_range = spec.initial_speed_y_range
         self.initial_speed_y = random.uniform(initial_speed_y_range[0], initial_speed_y_range[1])
         self.speed_y = self.initial_speed_y
         
@@ -190,7 +177,7 @@ class Firework:
         if self.diagonal:
             # Случайное направление: влево (-1) или вправо (1)
             self.direction = random.choice([-1, 1])
-            diagonal_speed_x_range = config_firework.get('diagonal_speed_x_range', [1, 3])
+            diagonal_speed_x_range = spec.diagonal_speed_x_range
             self.initial_speed_x = random.uniform(diagonal_speed_x_range[0], diagonal_speed_x_range[1]) * self.direction
             self.speed_x = self.initial_speed_x # Горизонтальная скорость для диагонального движения
         else:
@@ -198,8 +185,8 @@ class Firework:
             self.speed_x = 0
         
         # Определение высоты взрыва
-        min_explosion_height = config_firework.get('min_explosion_height', 50) # Минимальная высота взрыва
-        max_explosion_height_offset = config_firework.get('max_explosion_height_offset', 50) # Отступ от верха
+        min_explosion_height = spec.min_explosion_height # Минимальная высота взрыва
+        max_explosion_height_offset = spec.max_explosion_height_offset # Отступ от верха
         max_explosion_height = self.initial_y - max_explosion_height_offset # Максимальная высота взрыва
 
         # Если исходная позиция слишком низкая, то взрываемся посередине
@@ -213,8 +200,7 @@ class Firework:
         # Визуальные параметры
         self.color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
         self.exploded = False # Флаг на взрыв
-        self.config = config # Полная конфигурация
-        self.config_firework = config_firework # Конфигурация конкретно для фейерверков
+        self.spec = spec # Параметры фейерверка и его частиц
     
     # Основное обновление состояния фейерверка на каждом кадре
     def update(self):
@@ -290,17 +276,17 @@ class Firework:
         self.exploded = True
         
         # Выбираем кол-во частиц
-        particles_count_range = self.config_firework.get('particles_count_range', [100, 200])
+        particles_count_range = self.spec.particles_count_range
         number_particles = random.randint(particles_count_range[0], particles_count_range[1])
         
         # Создание частиц взрыва с одинаковым временем жизни
-        particles_lifetime_range = self.config_firework.get('particles_lifetime_range', [40, 80])
+        particles_lifetime_range = self.spec.particles_lifetime_range
         particle_lifetime = random.randint(particles_lifetime_range[0], particles_lifetime_range[1])
         
         # Создаем указанное количество частиц
         for _ in range(number_particles):
-            # Передаем полный конфиг, Particle сам выберет нужные настройки
-            particle = Particle(self.x, self.y, self.color, self.config)
+            # Передаем параметры частиц из спецификации фейерверка
+            particle = Particle(self.x, self.y, self.color, self.spec.particle)
             # Устанавливаем одинаковое время жизни для всех частиц этого взрыва
             particle.lifetime = particle_lifetime
             particle.max_lifetime = particle_lifetime
@@ -321,22 +307,13 @@ class Firework:
     
     # Отрисовка следа (хвоста) фейерверка
     def _draw_line(self, screen):
+        # Радиус ограничен размером поверхности следа int(base_size * 2 + 2)
+        max_radius = line_max_radius(self.base_size)
         for x, y, size, alpha in self.line:
             if alpha > 0: # Рисуем только видимые точки
-                # Расчет размера и прозрачности точки
-                circle_size = max(1, size / 8)
-                
-                # Создание поверхности с альфа-каналом для прозрачности
-                max_surface_size = int(self.base_size * 2 + 2)
-                circle_surface = pygame.Surface((max_surface_size, max_surface_size), pygame.SRCALPHA)
-                # Цвет точки с учетом текущей прозрачности
-                circle_color = (*self.color, int(alpha))
-                
-                # Отрисовка точки на временной поверхности
-                center_x, center_y = max_surface_size // 2, max_surface_size // 2
-                pygame.draw.circle(circle_surface, circle_color, (center_x, center_y), circle_size)
-                # Копируем точку на основной экран с правильными координатами
-                screen.blit(circle_surface, (x - center_x, y - center_y))
+                # Расчет размера точки и отрисовка готового спрайта из кэша
+                circle_size = min(max(1, size / 8), max_radius)
+                default_cache.draw_circle(screen, self.color, circle_size, alpha, x, y)
     
     # Отрисовка взрыва - отрисовка всех частиц
     def _draw_explosion(self, screen):
@@ -347,20 +324,20 @@ class Firework:
 # Класс - Игра
 class Game:
     # Инициализация параметров игры
-    def __init__(self, width=1000, height=800, caption='Фейерверки', background=(0, 0, 0), firework_interval=30, diagonal=False, margin_x=20, fps=60, config=None):
-        # Устанавливаем конфиг по умолчанию если не передан
-        if config is None:
-            config = {} 
+    def __init__(self, spec=None, caption='Фейерверки'):
+        # Устанавливаем параметры по умолчанию если не переданы
+        if spec is None:
+            spec = GameSpec()
         
-        # Инициализация pygame
-        pygame.init()
+        # Инициализация pygame (нужен только дисплей: звук и джойстики игра не использует)
+        pygame.display.init()
         
         # Настройки графического окна
-        self.width = width
-        self.height = height
+        self.width = spec.width
+        self.height = spec.height
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption(caption)
-        self.background = background
+        self.background = spec.background
         self.clock = pygame.time.Clock()
         
         # Список активных фейерверков
@@ -368,18 +345,22 @@ class Game:
         
         # Таймер для фейерверков
         self.firework_timer = 0
-        self.firework_interval = firework_interval
+        self.firework_interval = spec.firework_interval
         
         # Режим движения фейерверков (диагональный или вертикальный)
-        self.diagonal = diagonal
+        self.diagonal = spec.diagonal
         
         # Флаг работы главного цикла
         self.running = True
         
         # Дополнительные настройки
-        self.margin_x = margin_x
-        self.fps = fps
-        self.config = config # Конфигурация из файл
+        self.margin_x = spec.margin_x
+        self.fps = spec.fps
+        self.spec = spec # Проверенная конфигурация
+        
+        # Кэш спрайтов кругов (размер и шаг квантования альфы настраиваются в конфигурации)
+        self.sprite_cache = default_cache
+        self.sprite_cache.configure(**spec.section('sprite_cache'))
     
     # Обработка всех событий
     def handle_events(self):
@@ -401,12 +382,12 @@ class Game:
     # Создание фейерверка в указанной позиции
     def create_firework_at_pos(self, pos):
         x, y = pos
-        new_firework = Firework(x, y, self.diagonal, self.config)
+        new_firework = Firework(x, y, self.diagonal, self.spec.firework)
         self.fireworks.append(new_firework)
     
     # Создание случайного фейерверка
     def spawn_random_firework(self):
-        new_firework = Firework(random.randint(self.margin_x, self.width - self.margin_x), self.height, self.diagonal, self.config)
+        new_firework = Firework(random.randint(self.margin_x, self.width - self.margin_x), self.height, self.diagonal, self.spec.firework)
         self.fireworks.append(new_firework)
     
     # Обновление состояния игры на каждом кадре
@@ -444,45 +425,46 @@ class Game:
             self.draw()
             self.clock.tick(self.fps) 
         
+        # Статистика кэша спрайтов для подбора шага квантования альфы
+        stats = self.sprite_cache.stats()
+        print(f"Кэш спрайтов: {stats['size']}/{stats['max_size']} спрайтов, попаданий {stats['hits']}, "
+              f"промахов {stats['misses']}, вытеснений {stats['evictions']} (доля попаданий {stats['hit_rate']:.1%})")
+        
         # Завершение работы pygame при выходе из цикла
         pygame.quit()
 
 
-# Загружает конфигурацию из JSON файла
+# Загружает конфигурацию из JSON файла и проверяет ее
 def load_config(name):
     try:
         # Попытка открыть и прочитать конфигурационный файл
         with open(name, 'r', encoding='UTF-8') as f:
             config = json.load(f)
+        spec = GameSpec.from_dict(config)
         print(f'Конфигурация загружена из {name}')
-        return config
+        return spec
     except FileNotFoundError:
         # Обработка случая, когда файл не найден
         print(f'Файл {name} не найден. Используются значения по умолчанию.')
         return None
+    except ConfigError as e:
+        # Значения в файле не прошли проверку
+        print(f'Ошибка в конфигурации {name}: {e}')
+        print('Используются значения по умолчанию.')
+        return None
     except Exception as e:
         # Обработка всех других ошибок (невалидный JSON, и т.д.)
         print(f'Ошибка при чтении {name}: {e}')
         print('Используются значения по умолчанию.')
         return None
 
-# Загрузка конфигурации из файла
-config = load_config('config/config_base.json')
+# Запуск игры только при запуске файла, а не при импорте
+if __name__ == "__main__":
+    # Загрузка и проверка конфигурации из файла
+    spec = load_config('config/config_base.json')
 
-# Создание экземпляра игры с параметрами из конфигурации или значениями по умолчанию
-if config:
-    # Если конфигурация загружена, используем значения из нее (учитываем, что может не оказаться ключа в json)
-    game = Game(width=config.get('width', 1000),
-                height=config.get('height', 800),
-                background=tuple(config.get('background', [0, 0, 0])),
-                firework_interval=config.get('firework_interval', 30),
-                diagonal=config.get('diagonal', False),
-                margin_x=config.get('margin_x', 20),
-                fps=config.get('fps', 60),
-                config=config)
-else:
-    # Если конфигурация не загружена, используем все значения по умолчанию
-    game = Game()
+    # Создание экземпляра игры (без конфигурации используются значения по умолчанию)
+    game = Game(spec)
 
-# Запуск основного цикла игры
-game.run()
\ No newline at end of file
+    # Запуск основного цикла игры
+    game.run()
\ No newline at end of file
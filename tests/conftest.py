@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Тесты запускаются без окна и из любой папки: python -m pytest tests
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
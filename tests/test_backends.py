@@ -0,0 +1,42 @@
+import dataclasses
+import numpy as np
+import pytest
+from classes.game import Game
+from classes.config_loader import find_presets, load_config
+from classes.ballistics import snapshot
+
+STEPS = (60, 120, 240) # Шаги, на которых сравниваются способы хранения частиц
+
+# Пресет с другой скоростью исчезновения следа частиц
+def with_line_fade_speed(spec, line_fade_speed):
+    particle = dataclasses.replace(spec.firework.particle, line_fade_speed=line_fade_speed)
+    return spec.replace(firework=dataclasses.replace(spec.firework, particle=particle))
+
+# Точки следа фейерверка в одном порядке для обоих способов (частицы хранят их в разном порядке)
+def sorted_trail(trail):
+    return trail[np.lexsort(trail.T[::-1])]
+
+# Состояния шоу на шагах STEPS (игры используют общий модуль random, поэтому проходятся по очереди)
+def stepped_states(spec, backend):
+    game = Game.from_config(spec, headless=True, seed=1, particle_backend=backend)
+    states = []
+    for target in STEPS:
+        while game.steps < target:
+            game.update()
+        states.append(snapshot(game)[0])
+    return states
+
+# Способы 'numpy' и 'objects' дают одинаковые частицы и следы, в том числе при дробной скорости
+# исчезновения следа: прозрачность частиц и точек следа - точно, положения - в пределах округления float32
+@pytest.mark.parametrize('line_fade_speed', [6, 5.5, 0.3])
+def test_backends_match(line_fade_speed):
+    spec = with_line_fade_speed(load_config(find_presets()['base']), line_fade_speed)
+    for target, expected, actual in zip(STEPS, stepped_states(spec, 'numpy'), stepped_states(spec, 'objects')):
+        assert len(expected) == len(actual), f'шаг {target}: разное число фейерверков'
+        for (positions, fades, trail), (other_positions, other_fades, other_trail) in zip(expected, actual):
+            assert np.abs(positions - other_positions).max(initial=0) <= 1e-6, f'шаг {target}: разные положения частиц'
+            assert np.array_equal(fades, other_fades), f'шаг {target}: разная прозрачность частиц'
+            assert trail.shape == other_trail.shape, f'шаг {target}: разное число точек следа'
+            trail, other_trail = sorted_trail(trail), sorted_trail(other_trail)
+            assert np.array_equal(trail[:, 3], other_trail[:, 3]), f'шаг {target}: разная прозрачность точек следа'
+            assert np.abs(trail[:, :3] - other_trail[:, :3]).max(initial=0) <= 1e-3, f'шаг {target}: разные точки следа'
@@ -0,0 +1,35 @@
+import pytest
+from classes.game import Game
+from classes.config_loader import find_presets, load_config
+from classes.ballistics import snapshot, compare
+
+TOLERANCE = 1e-6 # Допустимая ошибка положения частиц и точек следа, пиксели
+TARGETS = (120, 600) # Шаги, к которым выполняется перемотка
+
+# Состояния шоу, пройденного по шагам, на шагах TARGETS
+def stepped_snapshots(spec, backend):
+    game = Game.from_config(spec, headless=True, seed=1, particle_backend=backend)
+    snapshots = {}
+    for target in TARGETS:
+        while game.steps < target:
+            game.update()
+        snapshots[target] = snapshot(game)
+    return snapshots
+
+# Перемотка вперед по шагам TARGETS и назад к первому совпадает с пошаговой симуляцией:
+# положения частиц и точек следа - в пределах TOLERANCE, прозрачность частиц и следов - точно
+@pytest.mark.parametrize('backend', ['numpy', 'objects'])
+@pytest.mark.parametrize('preset', ['base', 'zero_gravity'])
+def test_seek_matches_stepped(preset, backend):
+    spec = load_config(find_presets()[preset])
+    expected = stepped_snapshots(spec, backend)
+
+    game = Game.from_config(spec, headless=True, seed=1, particle_backend=backend)
+    for target in TARGETS + TARGETS[:1]:
+        assert expected[target][0], f'шаг {target}: в шоу нет фейерверков - сравнивать нечего'
+        game.seek(target)
+        assert game.steps == target
+        position_error, trail_error, mismatches, _ = compare(expected[target], snapshot(game))
+        assert position_error <= TOLERANCE, f'шаг {target}: ошибка положения {position_error}'
+        assert trail_error <= TOLERANCE, f'шаг {target}: ошибка точек следа {trail_error}'
+        assert mismatches == 0, f'шаг {target}: несовпадений прозрачности или числа частиц {mismatches}'